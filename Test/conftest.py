@@ -0,0 +1,31 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# Keep files written on server shutdown (reference snapshot, unsent logs) out of the working tree
+os.environ.setdefault("MCP_SNAPSHOT_PATH", os.path.join(tempfile.mkdtemp(), "reference_snapshot.bin"))
+os.environ.setdefault("MCP_COMMLOG_SPILL", os.path.join(tempfile.mkdtemp(), "commlog_spill.jsonl"))
+
+
+@pytest.fixture
+def dbops_transport():
+    """
+    Swaps the transport of the global DBOps client for one test: call it with an httpx
+    transport (e.g. FakeDBOps().transport()). The original client is put back and the
+    clients built for the test are closed afterwards.
+    """
+    from dependencies import dbops
+
+    original, built = dbops._client, []
+
+    def use(transport):
+        dbops.use_transport(transport)
+        built.append(dbops._client)
+        return dbops._client
+
+    yield use
+    dbops._client = original
+    for client in built:
+        asyncio.run(client.aclose())
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastmcp import Client
+
+import admission as admission_module
+import main  # noqa: F401 - registers every tool family on `mcp`
+from admission import AdmissionController, Rejected
+from server import mcp
+
+
+def test_token_bucket_rejects_after_burst_but_not_emergencies():
+    controller = AdmissionController(rate=1, burst=2)
+    controller.check_rate("c1", "standard")
+    controller.check_rate("c1", "standard")
+    with pytest.raises(Rejected) as exc:
+        controller.check_rate("c1", "standard")
+    assert 0 < exc.value.retry_after <= 1
+    controller.check_rate("c1", "emergency")
+    controller.check_rate(None, "standard")  # In-process callers are not rate limited
+    controller.check_rate("c2", "standard")  # Buckets are per client
+
+
+def test_queue_grants_by_priority_then_sheds_on_deadline(monkeypatch):
+    monkeypatch.setitem(admission_module.PRIORITY_CLASSES, "analytics", (3, 0.05))
+
+    async def scenario():
+        controller = AdmissionController(concurrency=1, queue_size=10, reserved=0)
+        await controller.acquire("standard")
+        order = []
+
+        async def call(cls):
+            await controller.acquire(cls)
+            order.append(cls)
+
+        analytics = asyncio.create_task(controller.acquire("analytics"))
+        booking = asyncio.create_task(call("booking"))
+        emergency = asyncio.create_task(call("emergency"))
+        await asyncio.sleep(0.1)
+        with pytest.raises(Rejected):
+            await analytics                # Waited past its deadline
+        controller.release()
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(booking, emergency)
+        return order, controller.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["emergency", "booking"]
+    assert stats["rejected"] == {"deadline": 1} and stats["queued"] == 0
+
+
+def test_full_queue_displaces_lower_priority_waiter():
+    async def scenario():
+        controller = AdmissionController(concurrency=1, queue_size=1, reserved=0)
+        await controller.acquire("standard")
+        analytics = asyncio.create_task(controller.acquire("analytics"))
+        await asyncio.sleep(0)
+        booking = asyncio.create_task(controller.acquire("booking"))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected):
+            await analytics
+        with pytest.raises(Rejected):
+            await controller.acquire("standard")   # Queue full of higher priority work
+        controller.release()
+        await booking
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == {"displaced": 1, "queue_full": 1} and stats["in_flight"] == 1
+
+
+def test_rate_limited_call_returns_retry_after_hint(monkeypatch):
+    monkeypatch.setattr(admission_module, "admission", AdmissionController(rate=0.1, burst=1))
+    monkeypatch.setattr(admission_module, "client_key", lambda ctx: "agent-1")
+
+    async def scenario():
+        async with Client(mcp) as client:
+            first = await client.call_tool("search_staff_tools", {"query": "doctors"}, raise_on_error=False)
+            second = await client.call_tool("search_staff_tools", {"query": "doctors"}, raise_on_error=False)
+            return first, second
+
+    first, second = asyncio.run(scenario())
+    assert not first.is_error
+    assert second.is_error and "retry after" in second.content[0].text
@@ -0,0 +1,53 @@
+import asyncio
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from benchmarks.fake_dbops import FakeDBOps
+from benchmarks.run_suite import CALL_PLAN, compare, save_baseline
+from dependencies import DBOpsClient
+from server import mcp
+
+
+def test_call_plan_covers_every_registered_tool():
+    planned = {target for entries in CALL_PLAN.values() for kind, target, _ in entries if kind == "tool"}
+    registered = set(asyncio.run(mcp.get_tools()))
+    assert registered - planned == set()
+
+
+def test_fake_dbops_serves_client_requests():
+    fake = FakeDBOps(list_size=3, seed=1)
+    client = DBOpsClient(transport=fake.transport())
+
+    async def go():
+        doctors = await client.get("/doctors")
+        created = await client.post("/appointments", {"doctor_id": "doc-0"})
+        return doctors, created
+
+    doctors, created = asyncio.run(go())
+    assert len(doctors) == 3
+    assert created
+    assert sum(fake.calls.values()) == 2
+
+
+def test_compare_flags_p95_regressions_only_over_threshold():
+    baseline = {"calls": {"a": {"p95_ms": 10.0}, "b": {"p95_ms": 10.0}}}
+    current = {"calls": {"a": {"p95_ms": 11.0}, "b": {"p95_ms": 13.0}}}
+    regressions = compare(current, baseline, threshold=0.15)
+    assert len(regressions) == 1 and regressions[0].startswith("b:")
+
+
+def test_baseline_is_saved_into_a_missing_directory(tmp_path):
+    import json
+
+    path = tmp_path / "baselines" / "local.json"
+    save_baseline({"calls": {}}, str(path))
+    assert json.loads(path.read_text()) == {"calls": {}}
+
+
+def test_sse_load_generator_opens_sessions_and_probes_server():
+    from benchmarks.load_sse import run_load
+
+    report = run_load(sessions=3, calls=2, ramp_s=0, think_ms=0)
+    assert report["sessions"]["opened"] == 3 and report["sessions"]["failed"] == 0
+    assert report["throughput"]["calls"] == 6
+    assert report["server"]["pool"]["max_connections"] == 50
+    assert report["server"]["dbops_requests"] > 0
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import caches
+from caches import CountingTTLCache, SQLiteCache, async_cached
+
+
+def _shared_pair(tmp_path, **kwargs):
+    """Two caches on one file through separate connections, like two worker processes."""
+    path = str(tmp_path / "cache.sqlite3")
+    first = SQLiteCache("patients", path=path, **kwargs)
+    caches._connections.pop(path)
+    second = SQLiteCache("patients", path=path, **kwargs)
+    return first, second
+
+
+def test_sqlite_cache_is_shared_and_invalidated_across_connections(tmp_path):
+    first, second = _shared_pair(tmp_path, maxsize=10, ttl=60)
+    first["k"] = {"id": "pat-1"}
+    assert second.get("k") == {"id": "pat-1"}
+    second.clear()
+    assert "k" not in first and len(first) == 0
+
+
+def test_sqlite_cache_honours_ttl_and_maxsize(tmp_path):
+    cache = SQLiteCache("doctors", path=str(tmp_path / "c.sqlite3"), maxsize=2, ttl=0.05)
+    cache["a"], cache["b"], cache["c"] = 1, 2, 3
+    assert "a" not in cache and cache["c"] == 3 and len(cache) == 2
+    time.sleep(0.06)
+    assert cache.get("c") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_sqlite_cache_gives_up_quickly_on_another_writers_lock(tmp_path):
+    import sqlite3
+
+    first, second = _shared_pair(tmp_path, maxsize=10, ttl=60)
+    first["k"] = 1
+    blocker = sqlite3.connect(first.path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")           # Another worker holding the write lock
+    started = time.perf_counter()
+    second["j"] = 2                              # Skipped, not raised
+    assert time.perf_counter() - started < 1 and second.stats()["busy"] == 1
+    assert second.get("k") == 1                  # WAL: readers are not blocked by the writer
+    blocker.execute("ROLLBACK")
+    assert "j" not in second
+
+
+def test_async_cached_stores_results_not_coroutines():
+    calls = []
+    cache = CountingTTLCache(maxsize=10, ttl=60)
+
+    @async_cached(cache)
+    async def fetch(clinic_id):
+        calls.append(clinic_id)
+        return {"id": clinic_id}
+
+    async def go():
+        return [await fetch("c1"), await fetch("c1"), await fetch("c2")]
+
+    assert asyncio.run(go()) == [{"id": "c1"}, {"id": "c1"}, {"id": "c2"}]
+    assert calls == ["c1", "c2"]
@@ -0,0 +1,88 @@
+import asyncio
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from capabilities import BM25Index, CapabilityIndex, expand_query, tokenize
+from server import mcp
+
+
+def _search(query: str, top_k: int = 5):
+    index = CapabilityIndex()
+    asyncio.run(index.refresh(mcp))
+    return [cap.key for cap, _ in index.search(query, top_k=top_k)]
+
+
+def test_tokenize_splits_identifiers_and_stems():
+    assert tokenize("resolve_patient_by_phone") == ["resolve", "patient", "phone"]
+    assert tokenize("medicationName") == ["medication", "name"]
+    assert tokenize("Appointments") == ["appointment"]
+
+
+def test_expand_query_adds_weighted_synonyms():
+    terms = expand_query("pills")
+    assert terms["pill"] == 1.0
+    assert terms["medication"] < 1.0
+
+
+def test_bm25_prefers_rarer_terms():
+    index = BM25Index()
+    index.build([["doctor", "list"], ["doctor", "availability"], ["revenue", "list"]])
+    scores = index.score({"availability": 1.0, "doctor": 1.0})
+    assert max(scores, key=scores.get) == 1
+
+
+def test_index_covers_every_registered_capability():
+    index = CapabilityIndex()
+    asyncio.run(index.refresh(mcp))
+    keys = {c.key for c in index.capabilities}
+    assert {"book_appointment", "doctors://list", "analytics://revenue/comprehensive/{start_date}/{end_date}"} <= keys
+
+
+def test_search_routes_common_intents():
+    assert _search("book appointment")[0] == "book_appointment"
+    assert "add_medication_refill" in _search("refill my pills", 3)
+    assert "doctors://availability/{doctor_name}/{date}" in _search("check availability for Dr. Smith", 3)
+    assert _search("report an emergency")[0] == "report_emergency"
+
+
+def test_index_rebuilds_when_tools_are_registered():
+    index = CapabilityIndex()
+    asyncio.run(index.refresh(mcp))
+    assert asyncio.run(index.refresh(mcp)) is False
+
+    @mcp.tool()
+    async def export_xray_images(patient_id: str) -> str:
+        """Tool: Exports radiograph images for a patient."""
+        return ""
+
+    try:
+        assert asyncio.run(index.refresh(mcp)) is True
+        assert _search("xray images")[0] == "export_xray_images"
+    finally:
+        mcp.remove_tool("export_xray_images")
+
+
+def test_semantic_index_tolerates_morphology():
+    from capabilities import SemanticIndex
+
+    index = SemanticIndex()
+    index.build(["medication refill pharmacy", "doctor availability calendar", "revenue analytics"])
+    assert index.score("refills", top_k=1)[0][0] == 0
+    assert index.score("availabilities", top_k=1)[0][0] == 1
+
+
+def test_hybrid_mode_routes_paraphrases_and_caches_results():
+    index = CapabilityIndex()
+    asyncio.run(index.refresh(mcp))
+    first = index.search("who can see my kid Tuesday", top_k=3, mode="hybrid")
+    assert {"doctors://availability/{doctor_name}/{date}", "book_appointment"} & {c.key for c, _ in first}
+    assert index.search("who can  see my kid tuesday", top_k=3, mode="hybrid") is first
+
+
+def test_bm25_mode_builds_no_semantic_index_until_a_semantic_search(monkeypatch):
+    import capabilities
+
+    monkeypatch.setattr(capabilities, "SEARCH_MODE", "bm25")
+    index = CapabilityIndex()
+    asyncio.run(index.refresh(mcp))
+    assert index.search("book an appointment", top_k=1) and index._semantic.matrix is None
+    assert index.search("refills", top_k=1, mode="semantic") and index._semantic.matrix is not None
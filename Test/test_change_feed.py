@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+import change_feed as change_feed_module
+import main  # noqa: F401 - registers every tool family on `mcp`
+from benchmarks.fake_dbops import FakeDBOps
+from change_feed import ChangeFeed, sign
+from reference_data import reference_store
+from server import mcp
+from tools.clinic_management import _fetch_clinic
+
+
+def _post_event(event, secret: str = None, signature: str = None, peer=("127.0.0.1", 5000)) -> httpx.Response:
+    body = json.dumps(event).encode()
+    headers = {"Content-Type": "application/json"}
+    if secret or signature:
+        headers["X-DBOps-Signature"] = signature or sign(body, secret)
+
+    async def go():
+        transport = httpx.ASGITransport(app=mcp.http_app(), client=peer)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/events/dbops", content=body, headers=headers)
+    return asyncio.run(go())
+
+
+def _warm(fake: FakeDBOps, use_transport) -> None:
+    async def go():
+        _fetch_clinic.cache.clear()                      # Clinics cached by earlier tests
+        reference_store.invalidate("clinics")
+        await reference_store.refresh("clinics")
+        await _fetch_clinic("clinic-1")
+    use_transport(fake.transport())
+    asyncio.run(go())
+
+
+def test_signed_webhook_patches_reference_data_without_refetch(monkeypatch, dbops_transport):
+    monkeypatch.setattr(change_feed_module, "FEED_SECRET", "s3cret")
+    fake = FakeDBOps()
+    _warm(fake, dbops_transport)
+    fetches = sum(fake.calls.values())
+    renamed = {"id": "clinic-1", "name": "Clinic One", "city": "Sharjah", "address": "2 Side St",
+               "phone": "0400000001", "email": "one@example.com"}
+    event = {"id": "evt-patch-1", "entity": "clinic", "op": "updated", "entity_id": "clinic-1", "data": renamed}
+
+    assert _post_event(event, signature="sha256=forged").status_code == 401
+    assert _post_event(event, secret="s3cret").json() == {"applied": 1, "duplicates": 0}
+    assert _post_event(event, secret="s3cret").json() == {"applied": 0, "duplicates": 1}
+
+    clinics = reference_store.entries["clinics"].value
+    assert [c["name"] for c in clinics] == ["Clinic 0", "Clinic One", "Clinic 2"]
+    assert sum(fake.calls.values()) == fetches           # Patched in place, no DBOps round-trip
+    assert len(_fetch_clinic.cache) == 0                  # Clinic details dropped by the tool's handler
+
+
+def test_unsigned_events_only_invalidate(monkeypatch, dbops_transport):
+    monkeypatch.setattr(change_feed_module, "FEED_SECRET", "")
+    _warm(FakeDBOps(), dbops_transport)
+    event = {"id": "evt-unsigned-1", "entity": "clinic", "op": "updated", "entity_id": "clinic-1",
+             "data": {"id": "clinic-1", "name": "Injected"}}
+    assert _post_event(event).status_code == 200
+    # Re-fetched from DBOps (or dropped), never patched with the unauthenticated record
+    entry = reference_store.entries.get("clinics")
+    assert entry is None or "Injected" not in [c["name"] for c in entry.value]
+    assert _post_event({"entity": "clinic", "op": "exploded"}).status_code == 400
+
+
+def test_stream_subscription_applies_events_and_resumes(monkeypatch, dbops_transport):
+    monkeypatch.setattr(change_feed_module, "STREAM_RECONNECT_S", 0.01)
+    fake = FakeDBOps(list_size=3)
+    dbops_transport(fake.transport())
+    feed = ChangeFeed()
+
+    async def wait_for(applied: int):
+        deadline = time.monotonic() + 5
+        while feed.applied < applied and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        reference_store.invalidate("doctors")
+        await reference_store.refresh("doctors")
+        fake.emit("doctor", "deleted", "doc-0")
+        feed.start("/events/stream")
+        await wait_for(1)
+        fake.emit("doctor", "created", "doc-9", {"id": "doc-9", "first_name": "New"})
+        await wait_for(2)
+        await feed.stop()
+        return [d["id"] for d in reference_store.entries["doctors"].value]
+
+    ids = asyncio.run(scenario())
+    assert ids == ["doc-1", "doc-2", "doc-9"]
+    assert feed.stats()["applied"] == 2 and feed.stats()["duplicates"] == 0 and feed.gaps == 0
+
+
+def test_unsigned_webhook_is_local_only_and_patient_events_sync_incrementally(monkeypatch, dbops_transport):
+    from change_feed import ChangeEvent, change_feed
+    from patient_registry import patient_registry
+
+    monkeypatch.setattr(change_feed_module, "FEED_SECRET", "")
+    fake = FakeDBOps(list_size=3)
+    dbops_transport(fake.transport())
+    event = {"entity": "waitlist", "op": "created", "entity_id": "w-1"}
+    assert _post_event(event, peer=("203.0.113.5", 5000)).status_code == 403
+    assert _post_event(event).status_code == 200
+
+    patient_registry.load(fake._many(fake.patient))
+    loads, syncs = patient_registry.loads, patient_registry.syncs
+
+    async def scenario():
+        for _ in range(3):
+            change_feed.apply(ChangeEvent("patient", "deleted", "pat-1", trusted=False))
+        while patient_registry._syncing is not None:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert patient_registry.get("pat-1") is not None                       # Unsigned: re-read, not removed
+    assert patient_registry.loads == loads and patient_registry.syncs == syncs + 2   # Three events, coalesced
+
+
+def test_stream_skips_payloads_that_are_not_events():
+    class Lines:
+        async def aiter_lines(self):
+            for line in ["data: [1, 2]", "", 'data: {"entity": "waitlist", "op": "created", "entity_id": "w-1"}', ""]:
+                yield line
+
+    feed = ChangeFeed()
+    asyncio.run(feed._read_events(Lines()))
+    assert feed.rejected == 1 and feed.applied == 1
@@ -0,0 +1,44 @@
+import importlib
+import json
+
+import pytest
+from pydantic import ValidationError
+
+import fast_json
+from benchmarks.fake_dbops import FakeDBOps
+from tools.models import DoctorBase, validate_list, validate_registry
+
+
+def test_fast_json_matches_stdlib():
+    payload = {"doctors": FakeDBOps(list_size=3)._many(FakeDBOps().doctor), "name": "Clínica", 1: None}
+    text = fast_json.dumps(payload)
+    assert fast_json.loads(text.encode()) == json.loads(text) == json.loads(json.dumps(payload))
+    assert fast_json.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+    assert fast_json.loads(fast_json.dumps({"big": 2 ** 70})) == {"big": 2 ** 70}  # Beyond orjson: stdlib path
+
+
+def test_non_ascii_text_is_the_same_on_both_backends(monkeypatch):
+    payload = {"name": "José Núñez", "clinic": "Clínica São João", "note": "🦷"}
+    expected = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    assert fast_json.dumps(payload) == expected
+    assert fast_json.dumps({**payload, "big": 2 ** 70}) == expected[:-1] + f',"big":{2 ** 70}}}'  # stdlib path
+    monkeypatch.setenv("MCP_JSON_BACKEND", "stdlib")
+    stdlib = importlib.reload(fast_json)
+    try:
+        assert stdlib.BACKEND == "stdlib" and stdlib.dumps(payload) == expected
+    finally:
+        monkeypatch.delenv("MCP_JSON_BACKEND")
+        importlib.reload(fast_json)
+
+
+def test_batch_validation_and_trusted_registry():
+    rows = FakeDBOps(list_size=4)._many(FakeDBOps().doctor)
+    doctors = validate_list(DoctorBase, rows)
+    assert [d.id for d in doctors] == ["doc-0", "doc-1", "doc-2", "doc-3"]
+    with pytest.raises(ValidationError):
+        validate_list(DoctorBase, [{"id": "doc-x"}])
+
+    first = validate_registry("doctors-test", DoctorBase, rows)
+    assert validate_registry("doctors-test", DoctorBase, rows) is first       # Same cached list: no re-validation
+    changed = rows[:2]
+    assert [d.id for d in validate_registry("doctors-test", DoctorBase, changed)] == ["doc-0", "doc-1"]
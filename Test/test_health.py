@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+from fastmcp import Client
+
+import health
+import main  # noqa: F401 - registers every tool family on `mcp`
+from benchmarks.fake_dbops import FakeDBOps
+from caches import CountingTTLCache
+from health import HealthMonitor, ProbeResult
+from server import mcp
+
+
+def _get(path: str) -> httpx.Response:
+    async def go():
+        transport = httpx.ASGITransport(app=mcp.http_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+    return asyncio.run(go())
+
+
+def test_counting_cache_tracks_hit_rate():
+    cache = CountingTTLCache(maxsize=4, ttl=60)
+    cache["a"] = 1
+    assert cache.get("a") == 1 and cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["hit_rate"] == 0.5
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    monitor = HealthMonitor()
+    for _ in range(health.FAILURE_THRESHOLD):
+        monitor._record(ProbeResult(False, 1.0, error="down"))
+    assert monitor.breaker == "open" and not monitor.ready
+    monitor._record(ProbeResult(True, 1.0, status=200))
+    assert monitor.breaker == "half_open" and monitor.status() == "degraded"
+    monitor._record(ProbeResult(True, 1.0, status=200))
+    assert monitor.breaker == "closed" and monitor.status() == "ok"
+
+
+def test_probes_are_answered_from_memory(monkeypatch, dbops_transport):
+    monkeypatch.setattr(health, "health_monitor", HealthMonitor())
+    fake = FakeDBOps()
+    dbops_transport(fake.transport())
+    assert _get("/livez").status_code == 200
+    assert _get("/readyz").json()["status"] == "starting"
+
+    asyncio.run(health.health_monitor.probe())
+    ready = _get("/readyz")
+    assert ready.status_code == 200 and ready.json()["dbops"]["reachable"]
+    assert "caches" in ready.json() and "pool" in ready.json()
+
+    async def go():
+        async with Client(mcp) as client:
+            return (await client.call_tool("check_system_health", {})).content[0].text
+    assert "ONLINE" in asyncio.run(go())
+    # Only health pings reached DBOps, never a full data endpoint
+    assert set(fake.calls) == {"GET /health"}
@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+from fastmcp import Client
+
+import dependencies
+import main  # noqa: F401 - registers every tool family on `mcp`
+from benchmarks.fake_dbops import FakeDBOps
+from dependencies import DBOpsClient, dbops
+from idempotency import IdempotentWrites
+from server import mcp
+
+
+def test_repeated_writes_share_one_dbops_request(monkeypatch):
+    monkeypatch.setattr(dependencies, "idempotent_writes", IdempotentWrites(window_s=60))
+    seen = []
+    fail = {"next": True}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.02)
+        seen.append((request.url.path, request.headers.get("Idempotency-Key")))
+        if request.url.path == "/flaky" and fail.pop("next", False):
+            return httpx.Response(500, json={"message": "down"})
+        return httpx.Response(200, json={"id": len(seen)})
+
+    client = DBOpsClient(transport=httpx.MockTransport(handler))
+    payload = {"patientId": "p1", "date": "2026-01-05"}
+
+    async def scenario():
+        concurrent = await asyncio.gather(*[client.post("/appointments", data=dict(payload)) for _ in range(3)])
+        repeat = await client.post("/appointments", data=dict(payload))
+        other = await client.post("/appointments", data={**payload, "date": "2026-01-06"})
+        try:
+            await client.post("/flaky", data=payload)
+        except httpx.HTTPStatusError:
+            pass
+        retried = await client.post("/flaky", data=payload)  # Failures are not replayed
+        return concurrent, repeat, other, retried
+
+    concurrent, repeat, other, retried = asyncio.run(scenario())
+    assert concurrent == [{"id": 1}] * 3 and repeat == {"id": 1}
+    assert other == {"id": 2} and retried == {"id": 4}
+    assert [path for path, _ in seen] == ["/appointments", "/appointments", "/flaky", "/flaky"]
+    assert all(key for _, key in seen) and seen[0][1] != seen[1][1]
+
+
+def test_client_supplied_key_deduplicates_tool_calls(monkeypatch, dbops_transport):
+    monkeypatch.setattr(dependencies, "idempotent_writes", IdempotentWrites(window_s=60))
+    fake = FakeDBOps()
+    dbops_transport(fake.transport())
+    args = {"clinic_id": "clinic-0", "patient_id": "pat-0", "description": "Chest pain", "priority": "critical"}
+
+    async def scenario():
+        async with Client(mcp) as client:
+            first = await client.call_tool("report_emergency", args, meta={"idempotencyKey": "retry-1"})
+            again = await client.call_tool("report_emergency", args, meta={"idempotencyKey": "retry-1"})
+            # Same key, different body: a different write, not a replay of the first one's response
+            other = await client.call_tool("report_emergency", {**args, "patient_id": "pat-1"},
+                                           meta={"idempotencyKey": "retry-1"})
+            return first, again, other
+
+    first, again, other = asyncio.run(scenario())
+    assert first.content[0].text == again.content[0].text
+    assert sum(n for route, n in fake.calls.items() if route.startswith("POST")) == 2
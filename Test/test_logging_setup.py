@@ -0,0 +1,82 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+
+from logging_setup import (ContextFilter, Deferred, JsonFormatter, LazyQueueHandler, SamplingFilter,
+                           parse_sample_rates)
+from tracing import start_span
+
+
+def _record(name="dbops-mcp.clinics", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_records_are_formatted_as_json_off_the_calling_thread():
+    formatted_on = []
+
+    class RecordingFormatter(JsonFormatter):
+        def format(self, record):
+            formatted_on.append(threading.current_thread().name)
+            return super().format(record)
+
+    handler = LazyQueueHandler(queue.Queue())
+    handler.addFilter(ContextFilter())
+    out = io.StringIO()
+    output = logging.StreamHandler(out)
+    output.setFormatter(RecordingFormatter())
+    listener = logging.handlers.QueueListener(handler.queue, output)
+
+    logger = logging.getLogger("test.pipeline")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    pending = ["pat-1"]
+    try:
+        with start_span("tool demo", "tool") as span:
+            logger.info("sent %s", pending, extra={"endpoint": "/clinics"})
+        pending.append("pat-2")  # Mutated before the writer runs: the log keeps the value it was called with
+        listener.start()
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+
+    entry = json.loads(out.getvalue())
+    assert entry["msg"] == "sent ['pat-1']" and entry["endpoint"] == "/clinics"
+    assert entry["trace_id"] == span.trace_id and entry["span_id"] == span.span_id
+    assert formatted_on and formatted_on[0] != threading.current_thread().name
+
+
+def test_deferred_and_immutable_arguments_are_rendered_by_the_writer():
+    rendered_on = []
+
+    class Tree(Deferred):
+        def __str__(self):
+            rendered_on.append(threading.current_thread().name)
+            return "tree"
+
+    handler = LazyQueueHandler(queue.Queue())
+    handler.handle(_record(msg="trace %s %s", args=("abc", Tree())))
+    assert rendered_on == []                                    # Left to the listener
+    assert handler.queue.get_nowait().getMessage() == "trace abc tree"
+    handler.handle(_record(args=(["pat-1"],)))
+    assert handler.queue.get_nowait().args is None             # Mutable: merged by the caller
+
+
+def test_sampling_only_drops_low_severity_records_of_configured_loggers():
+    sampler = SamplingFilter(parse_sample_rates("dbops-mcp.clinics=0,bogus=x"))
+    assert not sampler.filter(_record())
+    assert sampler.filter(_record(level=logging.WARNING))
+    assert sampler.filter(_record(name="dbops-mcp.doctors"))
+    assert sampler.dropped == 1
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = LazyQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.dropped == 1
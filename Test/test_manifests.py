@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from manifests import full_manifest
+from server import mcp
+
+
+def _get(path: str, headers: dict = None) -> httpx.Response:
+    async def go():
+        transport = httpx.ASGITransport(app=mcp.http_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers or {})
+    return asyncio.run(go())
+
+
+def test_manifest_is_reused_until_registry_changes():
+    first = asyncio.run(full_manifest(mcp, "tools"))
+    assert asyncio.run(full_manifest(mcp, "tools")) is first
+
+    @mcp.tool()
+    async def temporary_probe() -> str:
+        """Tool: Test-only probe."""
+        return ""
+
+    try:
+        changed = asyncio.run(full_manifest(mcp, "tools"))
+        assert changed is not first and changed.etag != first.etag
+        assert "temporary_probe" in {t.name for t in changed.items}
+    finally:
+        mcp.remove_tool("temporary_probe")
+
+
+def test_manifest_route_supports_conditional_get():
+    res = _get("/manifest/templates")
+    assert res.status_code == 200
+    assert any(t["uriTemplate"] == "doctors://availability/{doctor_name}/{date}" for t in res.json()["templates"])
+    assert _get("/manifest/templates", {"If-None-Match": res.headers["etag"]}).status_code == 304
+    assert _get("/manifest/prompts").status_code == 404
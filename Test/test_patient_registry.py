@@ -0,0 +1,229 @@
+import asyncio
+
+from benchmarks.fake_dbops import FakeDBOps
+from change_feed import ChangeEvent, change_feed
+from patient_registry import PatientRegistry, patient_registry
+import tools.patients  # noqa: F401 - registers the patient change handler
+
+
+def test_compact_rows_and_updates():
+    registry = PatientRegistry()
+    rows = FakeDBOps(list_size=3)._many(FakeDBOps().patient)
+    rows[2]["first_name"] = "".join(["Pat", "0"])   # Equal to row 0's name, but a separate string object
+    registry.load(rows)
+
+    ref = registry.get("pat-1")
+    assert (ref.full_name, ref.phone, ref.email) == ("Pat1 Doe1", "971500000001", "pat1@example.com")
+    assert registry.first_names[2] is registry.first_names[0]             # Interned
+    assert not hasattr(ref, "__dict__")
+
+    registry.upsert({"id": "pat-9", "firstName": "New", "lastName": "Patient", "phoneNumber": "0501234567"})
+    registry.upsert({**rows[1], "last_name": "Renamed"})
+    registry.remove("pat-0")
+    assert [p.full_name for p in registry] == ["Pat1 Renamed", "Pat0 Doe2", "New Patient"]
+    assert registry.get("pat-0") is None and len(registry) == 3
+
+
+def test_registry_loads_once_and_follows_the_change_feed(dbops_transport):
+    fake = FakeDBOps(list_size=5)
+    dbops_transport(fake.transport())
+    patient_registry.invalidate()
+
+    async def scenario():
+        await asyncio.gather(*[patient_registry.ensure_loaded() for _ in range(5)])
+        change_feed.apply(ChangeEvent("patient", "updated", "pat-2", {"id": "pat-2", "first_name": "Renamed"}))
+        change_feed.apply(ChangeEvent("patient", "deleted", "pat-3"))
+
+    asyncio.run(scenario())
+    assert fake.calls["GET /patients"] == 1
+    assert patient_registry.get("pat-2").first_name == "Renamed" and patient_registry.get("pat-3") is None
+
+
+def test_multi_key_index():
+    registry = PatientRegistry()
+    registry.load([
+        {"id": "p1", "first_name": "Aisha", "last_name": "Khan", "phoneNumber": "+971 50 123 4567", "email": "Aisha@Example.com"},
+        {"id": "p2", "first_name": "Omar", "last_name": "Khan", "phoneNumber": "0509990000", "email": "omar@example.com"},
+        {"id": "p3", "first_name": "Sara", "last_name": "Khan", "phoneNumber": "0509990000", "email": ""},  # Family phone
+    ])
+    assert registry.find("0501234567").id == registry.find("501234567").id == registry.find("00971501234567").id == "p1"
+    assert registry.find("aisha@example.COM").id == "p1"
+    assert registry.find("omar khan").id == "p2" and registry.find("p3").id == "p3"
+    assert registry.find("Khan") is None and registry.find("0509990000") is None   # Ambiguous: left to DBOps
+    registry.upsert({"id": "p2", "first_name": "Omar", "last_name": "Said", "phoneNumber": "0501110000"})
+    assert registry.find("0509990000").id == "p3" and registry.find("omar khan") is None
+
+
+def test_incremental_sync_and_local_resolution(dbops_transport):
+    fake = FakeDBOps(list_size=5)
+    dbops_transport(fake.transport())
+    registry = PatientRegistry()
+
+    async def scenario():
+        await registry.ensure_loaded()
+        fake.update_patient({**fake.patient(2), "phoneNumber": "0507770000"})
+        fake.update_patient({"id": "pat-new", "first_name": "Layla", "last_name": "Haddad", "phoneNumber": "0508880000"})
+        fake.update_patient({"id": "pat-3", "deleted": True})
+        first = await registry.sync()
+        again = await registry.sync()
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert (first, again) == (3, 0)
+    assert registry.find("0507770000").id == "pat-2" and registry.find("971500000002") is None
+    assert registry.find("layla haddad").id == "pat-new" and registry.get("pat-3") is None
+    assert fake.calls["GET /patients"] == 3       # One full load, then two small incremental reads
+
+
+def test_single_upserts_do_not_move_the_sync_cursor(dbops_transport):
+    fake = FakeDBOps(list_size=5)
+    dbops_transport(fake.transport())
+    registry = PatientRegistry()
+
+    async def scenario():
+        await registry.ensure_loaded()
+        cursor = registry.cursor
+        fake.update_patient({**fake.patient(1), "phoneNumber": "0501110000"})             # A changes ...
+        b = fake.update_patient({**fake.patient(2), "phoneNumber": "0502220000"})         # ... then B
+        registry.upsert(b)                                                                 # B written back alone
+        assert registry.cursor == cursor
+        return await registry.sync()
+
+    assert asyncio.run(scenario()) == 2
+    assert registry.find("0501110000").id == "pat-1" and registry.find("0502220000").id == "pat-2"
+
+
+def test_undated_records_move_the_cursor_with_every_sync(monkeypatch, dbops_transport):
+    from types import SimpleNamespace
+
+    import httpx
+    import patient_registry as module
+
+    asked = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        asked.append(request.url.params.get("updatedSince"))
+        return httpx.Response(200, json=[{"id": "pat-1", "first_name": "Noor", "last_name": "Ali"}])
+
+    dbops_transport(httpx.MockTransport(handler))
+    clock = iter([1_700_000_000 + 30 * i for i in range(100)])
+    monkeypatch.setattr(module, "time", SimpleNamespace(time=lambda: next(clock)))
+    registry = PatientRegistry()
+
+    async def scenario():
+        await registry.ensure_loaded()
+        await registry.sync()
+        await registry.sync()
+
+    asyncio.run(scenario())
+    assert asked[0] is None and asked[1] < asked[2]                # Each sync starts near the previous one
+    assert registry.cursor > asked[2]
+
+
+def test_resolver_answers_locally_and_writes_through(dbops_transport):
+    from fastmcp import Client
+    import main  # noqa: F401 - registers every tool family on `mcp`
+    from server import mcp
+
+    fake = FakeDBOps(list_size=5)
+    dbops_transport(fake.transport())
+    patient_registry.load(fake._many(fake.patient))
+
+    async def scenario():
+        async with Client(mcp) as client:
+            by_phone = await client.call_tool("resolve_patient_by_phone", {"phone_number": "050 000 0004"})
+            await client.call_tool("create_patient_tool", {"first_name": "Noor", "last_name": "Ali", "email": "noor@example.com",
+                                                           "phone": "0506660000", "dob": "1990-05-05"})
+            created = await client.call_tool("resolve_patient_by_phone", {"phone_number": "noor@example.com"})
+        return by_phone.content[0].text, created.content[0].text
+
+    by_phone, created = asyncio.run(scenario())
+    assert by_phone == "Found: Pat4 (ID: pat-4)" and created == "Found: Noor (ID: pat-new)"
+    assert not any("by-phone" in route for route in fake.calls)
+
+
+def test_fuzzy_name_search_across_spellings_and_scripts():
+    registry = PatientRegistry()
+    registry.load([
+        {"id": "p1", "first_name": "Mohammed", "last_name": "Al-Hashimi"},
+        {"id": "p2", "first_name": "Muhammad", "last_name": "Khan"},
+        {"id": "p3", "first_name": "Hussein", "last_name": "Ali"},
+        {"id": "p4", "first_name": "Hassan", "last_name": "Ali"},
+        {"id": "p5", "first_name": "Abd al-Rahman", "last_name": "Saeed"},
+        {"id": "p6", "first_name": "عائشة", "last_name": "خالد"},
+    ])
+    assert registry.resolve("Muhamad Hashimi").id == "p1"
+    assert registry.resolve("محمد خان").id == "p2"
+    assert registry.resolve("Husain Ali").id == "p3" and registry.resolve("Hasan Ali").id == "p4"
+    assert registry.resolve("Abdulrahman Saeed").id == registry.resolve("abdul rahman saeed").id == "p5"
+    assert registry.resolve("Aisha Khaled").id == "p6"
+    assert registry.resolve("Ali") is None                                  # Ambiguous
+    assert [ref.id for ref, _ in registry.search("Ali")] == ["p3", "p4"]    # ... but ranked for the caller
+    registry.remove("p6")
+    assert registry.search("Aisha Khaled") == [] and "عائشة" not in registry.names.keys
+
+
+def test_name_driven_tools_resolve_patient_ids(dbops_transport):
+    from fastmcp import Client
+    import main  # noqa: F401 - registers every tool family on `mcp`
+    from server import mcp
+    from tools.patients import resolve_patient_id
+
+    fake = FakeDBOps(list_size=3)
+    dbops_transport(fake.transport())
+    patient_registry.load([*fake._many(fake.patient), {"id": "pat-7", "first_name": "Youssef", "last_name": "Haddad"}])
+
+    async def scenario():
+        ids = [await resolve_patient_id(q) for q in ("Yusuf Hadad", "pat-1", "Nobody Known")]
+        async with Client(mcp) as client:
+            meds = await client.read_resource("medications://all/Yousef Haddad")
+            found = await client.call_tool("search_patients", {"name": "yosef"})
+            booked = await client.call_tool("book_appointment", {"patient_name": "Yusuf Hadad", "doctor_name": "Doc1",
+                                                                 "date": "2026-01-05", "start_time": "10:00",
+                                                                 "end_time": "10:30", "clinic_id": "clinic-0"})
+            unknown = await client.call_tool("book_appointment", {"patient_name": "Nobody Known", "doctor_name": "Doc1",
+                                                                  "date": "2026-01-05", "start_time": "10:00",
+                                                                  "end_time": "10:30", "clinic_id": "clinic-0"})
+        return ids, meds[0].text, found.content[0].text, booked.content[0].text, unknown.content[0].text
+
+    ids, meds, found, booked, unknown = asyncio.run(scenario())
+    assert ids == ["pat-7", "pat-1", None]
+    assert meds.startswith("Full Medication List for Yousef Haddad")
+    assert "Youssef Haddad (ID: pat-7)" in found
+    assert "Appointment confirmed" in booked and unknown.startswith("Error: Could not resolve IDs")
+    assert fake.calls["POST /appointments"] == 1
+    assert not any("by-phone" in route for route in fake.calls)
+
+
+def test_full_load_is_built_off_the_event_loop_and_keeps_writes_made_meanwhile(monkeypatch, dbops_transport):
+    import time
+
+    fake = FakeDBOps(list_size=20)
+    dbops_transport(fake.transport())
+    registry = PatientRegistry(sync_s=0)
+    registry.load([{"id": "pat-old", "first_name": "Old", "last_name": "Row"}])
+    build = PatientRegistry._build
+
+    def slow_build(records):
+        time.sleep(0.3)
+        return build(records)
+
+    monkeypatch.setattr(PatientRegistry, "_build", staticmethod(slow_build))
+
+    async def scenario():
+        registry.invalidate()
+        loading = registry.load_in_background()
+        ticks = 0
+        while not loading.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+            if ticks == 3:
+                assert registry.get("pat-old") is not None       # Old contents serve until the swap
+                registry.upsert({"id": "pat-new", "first_name": "Noor", "last_name": "Ali"})
+                registry.remove("pat-3")
+        return ticks
+
+    assert asyncio.run(scenario()) > 10                           # The loop kept running during the build
+    assert registry.get("pat-old") is None and registry.get("pat-0") is not None
+    assert registry.get("pat-new").full_name == "Noor Ali" and registry.get("pat-3") is None
+    assert registry.loads == 1 and registry._pending is None
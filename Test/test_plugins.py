@@ -0,0 +1,62 @@
+import asyncio
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from capabilities import collect_capabilities
+from plugins import FAMILIES, _parse_family_list, import_report, static_manifest
+from server import mcp
+
+
+def test_parse_family_list():
+    assert _parse_family_list(None, ["a"]) == ["a"]
+    assert _parse_family_list("all", list(FAMILIES)) == list(FAMILIES)
+    assert _parse_family_list(" Doctors, revenue ,nope", []) == ["doctors", "revenue"]
+
+
+def test_static_manifest_matches_registered_components():
+    registered = asyncio.run(collect_capabilities(mcp))
+    for family in FAMILIES:
+        expected = {(c.key, c.kind) for c in registered if c.family == family}
+        assert {(c.key, c.kind) for c in static_manifest(family)} == expected, family
+
+
+def test_import_report_covers_every_family():
+    rows = {r.family: r for r in import_report()}
+    assert set(rows) == {"core", *FAMILIES}
+    assert all(r.status == "loaded" for r in rows.values())
+    assert rows["clinical"].components > 0
+
+
+LAZY_SCRIPT = """
+import asyncio
+from fastmcp import Client
+from benchmarks.fake_dbops import FakeDBOps
+from dependencies import dbops
+import main
+import plugins
+from server import mcp
+
+dbops.use_transport(FakeDBOps().transport())
+
+async def scenario():
+    async with Client(mcp) as client:
+        before = [plugins.is_loaded(f) for f in ("waitlist", "revenue")]
+        tool = await client.call_tool("join_waitlist", {"clinic_id": "c-1", "patient_id": "pat-1",
+                                                        "preferred_date": "2025-01-02"})
+        resource = await client.read_resource("analytics://revenue/raw/2025-01-01/2025-01-31")
+        after = [plugins.is_loaded(f) for f in ("waitlist", "revenue")]
+    print(before, after, tool.is_error, bool(resource[0].text))
+
+asyncio.run(scenario())
+"""
+
+
+def test_direct_calls_load_deferred_families():
+    import os
+    import subprocess
+    import sys
+
+    env = {**os.environ, "MCP_LAZY_FAMILIES": "waitlist,revenue", "MCP_TOOL_EXPOSURE": "full"}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    done = subprocess.run([sys.executable, "-c", LAZY_SCRIPT], cwd=root, env=env, capture_output=True, text=True,
+                          timeout=120)
+    assert done.stdout.strip().splitlines()[-1] == "[False, False] [True, True] False True", done.stderr[-2000:]
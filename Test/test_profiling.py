@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from fastmcp import Client
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+import profiling
+from benchmarks.fake_dbops import FakeDBOps
+from server import mcp
+from reference_data import reference_store
+
+
+def _run_calls(tool_calls: int) -> str:
+    async def go():
+        async with Client(mcp) as client:
+            for _ in range(tool_calls):
+                reference_store.invalidate("doctors")  # Every call must reach DBOps
+                await client.call_tool("get_doctors", {})
+            return (await client.read_resource("system://slow-calls"))[0].text
+    return asyncio.run(go())
+
+
+def test_slow_calls_are_profiled_and_rotated(monkeypatch, tmp_path, dbops_transport):
+    monkeypatch.setattr(profiling, "SLOW_CALL_MS", 10.0)
+    monkeypatch.setattr(profiling, "SAMPLE_MS", 2.0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 2)
+    monkeypatch.setattr(profiling, "recent_slow_calls", profiling.deque(maxlen=100))
+
+    dbops_transport(FakeDBOps(latency_ms=40).transport())
+    listing = _run_calls(3)
+
+    files = sorted(tmp_path.glob("*.json"))
+    assert len(files) == 2
+    profile = json.loads(files[-1].read_text())
+    assert profile["call"] == "tool get_doctors" and profile["duration_ms"] >= 40
+    assert profile["dbops_timeline"][0]["endpoint"] == "/doctors"
+    assert any("get" in frame for sample in profile["stack_samples"] for frame in sample["stack"])
+    assert listing.count("tool get_doctors") == 3
+
+
+def test_fast_calls_leave_no_profile(monkeypatch, tmp_path, dbops_transport):
+    monkeypatch.setattr(profiling, "SLOW_CALL_MS", 5000.0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+
+    dbops_transport(FakeDBOps().transport())
+    _run_calls(1)
+    assert not list(tmp_path.glob("*.json"))
@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+
+from benchmarks.fake_dbops import FakeDBOps
+from dependencies import DBOpsClient
+from read_routing import ReadRouter, patient_ids
+
+
+def _client(replicas, pin_s: float = 5.0, eject_failures: int = 3):
+    primary = FakeDBOps(list_size=3)
+    client = DBOpsClient(transport=primary.transport(), read_urls=[])
+    client.reads = ReadRouter(pin_s=pin_s, eject_failures=eject_failures, eject_s=60)
+    for i, transport in enumerate(replicas):
+        client.add_read_replica(f"http://replica-{i}", transport=transport)
+    return client, primary
+
+
+def _gets(fake: FakeDBOps) -> int:
+    return sum(n for route, n in fake.calls.items() if route.startswith("GET"))
+
+
+def test_reads_go_to_replicas_and_writes_pin_the_patient_to_the_primary():
+    replica = FakeDBOps(list_size=3)
+    client, primary = _client([replica.transport()], pin_s=0.2)
+
+    async def scenario():
+        await client.get("/doctors")
+        await client.get("/patients/pat-1/appointments")
+        await client.post("/appointments", data={"patient_id": "pat-1", "doctor_id": "doc-0"})
+        await client.get("/patients/pat-1/appointments")      # Read-your-writes: primary
+        await client.get("/treatment-plans/patient/pat-1")     # Same patient, other endpoint: primary
+        await client.get("/patients/pat-2/appointments")      # Other patients unaffected
+        await asyncio.sleep(0.25)
+        await client.get("/patients/pat-1/appointments")      # Pin expired: replica again
+
+    asyncio.run(scenario())
+    assert _gets(replica) == 4 and _gets(primary) == 2
+    assert primary.calls["POST /appointments"] == 1 and not any(r.startswith("POST") for r in replica.calls)
+    assert client.reads.stats()["pinned_reads"] == 2
+
+
+def test_pins_are_shared_by_workers_on_the_sqlite_backend(tmp_path, monkeypatch):
+    import caches
+
+    monkeypatch.setattr(caches, "CACHE_BACKEND", "sqlite")
+    monkeypatch.setattr(caches, "CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    writer, _ = _client([FakeDBOps(list_size=3).transport()])
+    replica = FakeDBOps(list_size=3)
+    caches._connections.clear()                                  # The reader is another process
+    reader, primary = _client([replica.transport()])
+
+    async def scenario():
+        await writer.post("/appointments", data={"patient_id": "pat-1", "doctor_id": "doc-0"})
+        await reader.get("/patients/pat-1/appointments")
+        await reader.get("/patients/pat-2/appointments")
+
+    asyncio.run(scenario())
+    assert _gets(primary) == 1 and _gets(replica) == 1 and reader.reads.stats()["pinned_reads"] == 1
+
+
+def test_failing_replica_falls_back_and_is_ejected():
+    broken = FakeDBOps(error_rate=1.0)
+    lagging = httpx.MockTransport(lambda request: httpx.Response(404, json={"message": "not replicated yet"}))
+    client, primary = _client([broken.transport()], eject_failures=2)
+    lag_client, lag_primary = _client([lagging])
+
+    async def scenario():
+        results = [await client.get("/doctors") for _ in range(4)]
+        patient = await lag_client.get("/patients/pat-new")
+        return results, patient
+
+    results, patient = asyncio.run(scenario())
+    assert all(len(r) == 3 for r in results)                   # Every read answered, by the primary
+    assert sum(broken.errors.values()) == 2                      # Ejected after two failures: no more traffic
+    stats = client.reads.stats()
+    assert stats["fallbacks"] == 2 and stats["primary_reads"] == 2 and not stats["replicas"][0]["healthy"]
+    assert patient["id"] == "pat-0" and lag_client.reads.replicas[0].failures == 0  # 404 retried, not held against it
+
+
+def test_patient_ids_from_paths_and_fields():
+    assert patient_ids("/patients/pat-3/medications/active") == {"pat-3"}
+    assert patient_ids("/patients/by-phone/0500000000") == set()
+    assert patient_ids("/db/reminders/medication", {"patientId": "pat-4"}) == {"pat-4"}
+    router = ReadRouter(pin_s=5)
+    router.replicas.append(object())
+    router.note_write("/patients", {"first_name": "New"}, {"id": "pat-99"})
+    assert router.pinned("/patients/pat-99") and not router.pinned("/doctors")
+
+
+def test_appointment_keyed_writes_pin_that_appointments_reads():
+    replica = FakeDBOps(list_size=3)
+    client, primary = _client([replica.transport()])
+
+    async def scenario():
+        await client.patch("/appointments/appt-1/cancel", data={"cancellation_reason": "ill"})
+        await client.get("/appointments/appt-1/soap-notes/latest")   # Primary: reads its own write
+        await client.get("/appointments/appt-2/soap-notes/latest")   # Other appointments: replica
+        await client.post("/appointments/appt-3/soap-notes", data={"subjective": "pain"})
+        await client.get("/appointments/appt-3/soap-notes/history")
+
+    asyncio.run(scenario())
+    assert _gets(primary) == 2 and _gets(replica) == 1 and client.reads.stats()["pinned_reads"] == 2
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+import zlib
+
+import pytest
+
+from benchmarks.fake_dbops import FakeDBOps
+from reference_data import _HEADER, MAGIC, Entry, ReferenceStore
+
+
+def _with_fake(use_transport, coro_fn, fake: FakeDBOps):
+    use_transport(fake.transport())
+    return asyncio.run(coro_fn())
+
+
+def test_snapshot_round_trip_serves_warm_data_then_revalidates(tmp_path, dbops_transport):
+    path = str(tmp_path / "snap.bin")
+    fake = FakeDBOps(list_size=3)
+
+    async def warm_and_save():
+        store = ReferenceStore()
+        await asyncio.gather(*[store.get(name) for name in store.endpoints])
+        store.save(path)
+        return store
+
+    first = _with_fake(dbops_transport, warm_and_save, fake)
+    fake.reset_stats()
+
+    async def restart():
+        store = ReferenceStore()
+        assert store.load_file(path) == len(store.endpoints)
+        doctors = await store.get("doctors")       # Served from the snapshot, no waiting on DBOps
+        served_before_fetch = sum(fake.calls.values())
+        await asyncio.sleep(0.05)                   # Background revalidation runs
+        return store, doctors, served_before_fetch
+
+    store, doctors, served_before_fetch = _with_fake(dbops_transport, restart, fake)
+    assert doctors == first.entries["doctors"].value
+    assert served_before_fetch == 0
+    assert sum(fake.calls.values()) == 1
+    # Same content hash: entry confirmed, nothing to rewrite
+    assert not store.entries["doctors"].from_snapshot and not store.dirty
+
+
+def test_changed_upstream_data_replaces_snapshot_entry(dbops_transport):
+    store = ReferenceStore()
+    store.entries["clinics"] = Entry([{"id": "old"}], "stale-digest", time.time() - 3600, from_snapshot=True)
+
+    async def go():
+        assert await store.get("clinics") == [{"id": "old"}]
+        await asyncio.sleep(0.05)
+        return await store.get("clinics")
+
+    fresh = _with_fake(dbops_transport, go, FakeDBOps(list_size=2))
+    assert fresh != [{"id": "old"}] and store.dirty and store.stale_served == 1
+
+
+def test_corrupt_or_foreign_snapshots_are_ignored(tmp_path):
+    store = ReferenceStore()
+    store.entries["doctors"] = Entry([{"id": "d1"}], "e", 0)
+    blob = bytearray(store.dump())
+    blob[-1] ^= 0xFF
+    assert ReferenceStore().load(bytes(blob)) == 0
+    assert ReferenceStore().load(b"PK\x03\x04 not a snapshot") == 0
+    assert ReferenceStore().load(store.dump()) == 1
+    payload = zlib.compress(b'{"entries":{"doctors":{"etag":"e","fetched_at":0,"value":[]}}}')
+    assert ReferenceStore().load(_HEADER.pack(MAGIC, 1, zlib.crc32(payload)) + payload) == 0   # Older format
+
+
+def test_entries_past_the_hard_staleness_limit_are_not_served(tmp_path, dbops_transport):
+    store = ReferenceStore()
+    store.entries["clinics"] = Entry([{"id": "ancient"}], "d", time.time() - 30 * 86400, from_snapshot=True)
+
+    async def go():
+        return await store.get("clinics")
+
+    assert _with_fake(dbops_transport, go, FakeDBOps(list_size=2)) != [{"id": "ancient"}]
+    assert store.expired == 1 and store.stale_served == 0
+    failing = ReferenceStore()
+    failing.entries["clinics"] = Entry([{"id": "ancient"}], "d", time.time() - 30 * 86400)
+    with pytest.raises(Exception):                               # DBOps down: an error, not month-old data
+        _with_fake(dbops_transport, lambda: failing.get("clinics"), FakeDBOps(error_rate=1.0))
+
+    path = str(tmp_path / "snap.bin")
+    store.save(path)
+    store.save(path)
+    assert os.listdir(tmp_path) == ["snap.bin"]                  # Temp files replaced or cleaned up
@@ -0,0 +1,75 @@
+import asyncio
+
+from benchmarks.fake_dbops import FakeDBOps
+from response_shaping import estimate_tokens, shape
+
+
+def _versions(n: int, text: str = "note " * 40) -> list:
+    return [{"version": v, "subjective": text, "plan": "", "updated_by": None} for v in range(n)]
+
+
+def test_pages_newest_first_within_budget_until_every_item_is_seen():
+    items = _versions(25)
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = shape("History:", items, max_tokens=200, cursor=cursor)
+        pages += 1
+        assert estimate_tokens(page.rsplit("\n…", 1)[0]) <= 200
+        lines = page.split("\n")[1:]
+        seen += [int(line.split(",")[0].split(":")[1]) for line in lines if line.startswith("{")]
+        if "more items" not in page:
+            break
+        cursor = page.rsplit("?cursor=", 1)[1].rstrip(")")
+    assert seen == list(range(24, -1, -1)) and pages > 1
+    assert '"plan"' not in page and "updated_by" not in page              # Empty fields elided
+    assert shape("History:", items, cursor="x").startswith("Error")
+
+
+def test_oversized_items_are_cut_to_priority_fields_and_headlines():
+    items = [{"id": f"plan-{i}", "diagnosis": "dx " * 300, "notes": "n " * 300, "created_at": f"2025-0{i + 1}-01"}
+             for i in range(3)]
+    page = shape("Plans:", items, max_tokens=150, priority=("id", "diagnosis"))
+    lines = page.split("\n")
+    assert lines[1].startswith('{"id":"plan-2","diagnosis":"dx') and '"notes"' not in lines[1]
+    assert "shortened to fit" in lines[-1]
+    tiny = shape("Plans:", items, max_bytes=40, priority=("id", "diagnosis"))
+    assert len(tiny.split("\n")[1]) < 100 and "2 more items" in tiny               # One headline, still progressing
+    assert "more items" not in shape("Plans:", items, max_tokens=0)             # 0 = unlimited
+
+
+def test_cursor_resumes_after_the_last_item_shown_when_records_change_between_reads():
+    items = [{"id": f"v-{v}", "version": v, "subjective": "note " * 40} for v in range(10)]
+    first = shape("History:", items, max_tokens=200)
+    cursor = first.rsplit("?cursor=", 1)[1].rstrip(")")
+    last = int(first.split("\n")[-2].split('"version":')[1].split(",")[0])
+
+    def first_version(page):
+        return int(page.split("\n")[1].split('"version":')[1].split(",")[0])
+
+    added = [{"id": "v-10", "version": 10, "subjective": "new"}, *items]
+    assert first_version(shape("History:", added, max_tokens=200, cursor=cursor)) == last - 1
+    removed = [item for item in items if item["version"] != last]             # Resumes at the next older one
+    assert first_version(shape("History:", removed, max_tokens=200, cursor=cursor)) == last - 1
+    assert shape("History:", items, cursor="bm90IGEgY3Vyc29y").startswith("Error")
+
+
+def test_history_resources_take_budget_and_cursor_query_parameters(dbops_transport):
+    from fastmcp import Client
+    import main  # noqa: F401 - registers every tool family on `mcp`
+    from server import mcp
+
+    dbops_transport(FakeDBOps(list_size=12, text_bytes=300).transport())
+
+    async def scenario():
+        async with Client(mcp) as client:
+            first = (await client.read_resource("clinical://soap/history/appt-0?max_tokens=250"))[0].text
+            cursor = first.rsplit("?cursor=", 1)[1].rstrip(")")
+            rest = await client.read_resource(f"clinical://soap/history/appt-0?max_tokens=5000&cursor={cursor}")
+            plain = await client.read_resource("previsit://date-range/2025-01-01/2025-12-31")
+        return first, rest[0].text, plain[0].text
+
+    first, rest, plain = asyncio.run(scenario())
+    shown = first.count('{"version":')
+    assert first.split("\n")[1].startswith('{"version":11') and f"{12 - shown} more items" in first
+    assert rest.split("\n")[1].startswith(f'{{"version":{11 - shown}') and rest.count('{"version":') == 12 - shown
+    assert plain.count('"id":"pv-') == 12
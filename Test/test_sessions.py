@@ -0,0 +1,45 @@
+import asyncio
+
+from fastmcp import Client
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+import sessions
+from benchmarks.fake_dbops import FakeDBOps
+from server import mcp
+
+
+def test_unlock_reports_only_new_families():
+    assert sessions.unlock("s-1", ["revenue", "system"]) == ["revenue"]
+    assert sessions.unlock("s-1", ["revenue", "clinical"]) == ["clinical"]
+    assert sessions.unlocked_families("s-1") == {"revenue", "clinical"}
+
+
+def test_session_starts_with_core_tools_and_unlocks_on_search(dbops_transport):
+    notifications = []
+
+    async def handler(message):
+        notifications.append(message)
+
+    dbops_transport(FakeDBOps().transport())
+
+    async def scenario():
+        async with Client(mcp, message_handler=handler) as client:
+            initial = {t.name for t in await client.list_tools()}
+            # Hidden tools stay callable by name, before their family is unlocked
+            hidden = await client.call_tool("join_waitlist", {"clinic_id": "c-1", "patient_id": "pat-1",
+                                                              "preferred_date": "2025-01-02"})
+            await client.call_tool("search_staff_tools", {"query": "refill my pills", "top_k": 3})
+            after = {t.name for t in await client.list_tools()}
+            return initial, after, hidden
+
+    initial, after, hidden = asyncio.run(scenario())
+    assert initial == sessions.CORE_TOOLS
+    assert not hidden.is_error and hidden.content[0].text and "join_waitlist" not in after
+    assert {"add_medication_refill", "prescribe_medication"} <= after
+    assert "book_appointment" not in after
+    assert notifications
+
+
+def test_search_tool_schema_hides_context():
+    tool = asyncio.run(mcp.get_tool("search_staff_tools"))
+    assert set(tool.parameters["properties"]) == {"query", "top_k"}
@@ -0,0 +1,92 @@
+import asyncio
+
+from fastmcp import Client
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+import sharding
+from benchmarks.fake_dbops import FakeDBOps
+from dependencies import DBOpsClient, dbops
+from reference_data import reference_store
+from server import mcp
+from sharding import merge_grouped, merge_sum, shard_router
+from tools.clinic_management import _fetch_clinic
+
+
+def _two_shards(monkeypatch, use_transport):
+    """Primary stand-in plus an "east" deployment with its own clinics and connection pool."""
+    primary, east = FakeDBOps(list_size=3), FakeDBOps(list_size=3, clinic_prefix="east-")
+    use_transport(primary.transport())
+    monkeypatch.setattr(shard_router, "clients", dict(shard_router.clients))
+    monkeypatch.setattr(shard_router, "clinic_shards", {})
+    monkeypatch.setattr(shard_router, "_discovered", False)
+    shard_router.add_shard("east", DBOpsClient(transport=east.transport(), base_url="http://dbops-east"))
+    reference_store.invalidate("clinics")
+    return primary, east
+
+
+def test_clinic_calls_go_to_the_owning_shard(monkeypatch, dbops_transport):
+    primary, east = _two_shards(monkeypatch, dbops_transport)
+
+    async def scenario():
+        detail = await _fetch_clinic("east-clinic-1")     # Unknown clinic: discovers the shard map first
+        async with Client(mcp) as client:
+            listing = await client.read_resource("clinics://all")
+            booked = await client.call_tool("report_emergency", {"clinic_id": "east-clinic-2", "patient_id": "pat-0",
+                                                                 "description": "Swelling"})
+        return detail, listing[0].text, booked.content[0].text
+
+    detail, listing, booked = asyncio.run(scenario())
+    assert detail["id"] == "east-clinic-1"
+    assert listing.count("•") == 6                        # Both deployments' clinics, merged
+    assert "em-new" in booked
+    assert shard_router.shard_of("clinic-0") == "primary" and shard_router.shard_of("east-clinic-0") == "east"
+    assert [route for route in east.calls if "clinics/(" in route or "emergencies" in route] == [
+        "GET /clinics/([^/]+)", "POST /emergencies"]
+    assert not any("clinics/(" in route or "emergencies" in route for route in primary.calls)
+
+
+def test_analytics_fan_out_and_merge(monkeypatch, dbops_transport):
+    primary, east = _two_shards(monkeypatch, dbops_transport)
+
+    async def scenario():
+        async with Client(mcp) as client:
+            raw = await client.read_resource("analytics://revenue/raw/2025-01-01/2025-01-31")
+            dashboard = await client.read_resource("analytics://dashboard/summary/2025-01-01/2025-01-31")
+            doctors = await client.read_resource("analytics://performance/doctors/2025-01-01/2025-01-31")
+        return raw[0].text, dashboard[0].text, doctors[0].text
+
+    raw, dashboard, doctors = asyncio.run(scenario())
+    assert "250000.0" in raw
+    assert "Active Patients: 1800" in dashboard
+    assert doctors.splitlines()[1] == "#1 Doc2: $40.0 (4 apps)"  # Same doctor in both regions, rolled up
+    assert primary.calls["GET /analytics/dashboard"] == east.calls["GET /analytics/dashboard"] == 1
+
+
+def test_merge_helpers_and_single_shard_passthrough():
+    assert merge_sum([{"revenue": 10, "percentage": 80, "label": "a"},
+                      {"revenue": 5, "percentage": 60, "label": "b"}]) == {"revenue": 15, "label": "a"}   # No weight
+    assert merge_sum([{"adherence_rate": 90, "total_reminders": 30, "totalRevenue": 1},
+                      {"adherence_rate": 50, "total_reminders": 10, "totalRevenue": 1000}]) == \
+        {"adherence_rate": 80, "total_reminders": 40, "totalRevenue": 1001}
+    assert merge_sum([{"stats": {"avgValue": 100, "appointmentCount": 1}},
+                      {"stats": {"avgValue": 200, "appointmentCount": 3}}]) == {"stats": {"avgValue": 175,
+                                                                                        "appointmentCount": 4}}
+    assert merge_grouped([[{"month": "01", "revenue": 1}], [{"month": "01", "revenue": 2}, {"month": "02", "revenue": 3}]],
+                         "month") == [{"month": "01", "revenue": 3}, {"month": "02", "revenue": 3}]
+    assert merge_grouped([[{"month": 1, "year": 2025, "revenue": 10}], [{"month": 1, "year": 2025, "revenue": 5}]],
+                         "month") == [{"month": 1, "year": 2025, "revenue": 15}]       # Numeric keys are not summed
+    ranked = sharding.merge_ranked([[{"doctor_id": 7, "name": "A", "revenue": 10, "appointmentCount": 2}],
+                                    [{"doctor_id": 7, "name": "A", "revenue": 30, "appointmentCount": 1},
+                                     {"doctor_id": 8, "name": "B", "revenue": 20, "appointmentCount": 4}]],
+                                   "revenue", key="doctor_id")
+    assert ranked == [{"doctor_id": 7, "name": "A", "revenue": 40, "appointmentCount": 3},
+                      {"doctor_id": 8, "name": "B", "revenue": 20, "appointmentCount": 4}]
+    assert merge_grouped([[{"day": "mon", "visits": 1, "score": 3}], [{"day": "mon", "visits": 2, "score": 4}]],
+                         "day", measures=("visits",)) == [{"day": "mon", "visits": 3, "score": 3}]
+    only = [{"month": "01", "revenue": 1}]
+    assert merge_grouped([only], "month") is only
+
+    router = sharding.ShardRouter(dbops)
+    assert not router.sharded and asyncio.run(router.client_for("clinic-9")) is dbops
+    assert sharding._parse_pairs("ksa=http://a:3000, oman = http://b ,bad") == {"ksa": "http://a:3000",
+                                                                                "oman": "http://b"}
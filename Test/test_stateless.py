@@ -0,0 +1,32 @@
+import asyncio
+
+from fastmcp import Client
+
+import sessions
+from benchmarks.replicas import ReplicaSet
+from benchmarks.run_suite import PHONE
+
+
+def test_stateless_mode_disables_per_session_exposure(monkeypatch):
+    monkeypatch.setattr(sessions, "EXPOSURE_MODE", "dynamic")
+    monkeypatch.setattr(sessions, "STATELESS_HTTP", True)
+    assert not sessions.dynamic_exposure_enabled()
+
+
+def test_round_robin_replicas_serve_one_client_session():
+    async def scenario(url):
+        async with Client(url, timeout=60) as client:
+            tools = {t.name for t in await client.list_tools()}
+            results = [await client.call_tool("resolve_patient_by_phone", {"phone_number": PHONE}),
+                       await client.call_tool("get_doctors", {}),
+                       await client.call_tool("check_system_health", {})]
+            return tools, results
+
+    with ReplicaSet(replicas=2, latency_ms=0) as replicas:
+        tools, results = asyncio.run(scenario(replicas.url))
+        served = replicas.served()
+
+    # Full tool list without unlocking, every call answered, and both replicas took part
+    assert {"get_doctors", "book_appointment"} <= tools and len(tools) > len(sessions.CORE_TOOLS)
+    assert all(not r.is_error for r in results)
+    assert all(count > 0 for count in served.values())
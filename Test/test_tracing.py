@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import httpx
+from fastmcp import Client
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+import tracing
+from benchmarks.fake_dbops import FakeDBOps
+from server import mcp
+from reference_data import reference_store
+from tracing import current_span, start_span
+
+
+def test_span_context_follows_asyncio_tasks(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_EXPORT", "off")
+
+    async def child(name):
+        with start_span(name, "dbops"):
+            await asyncio.sleep(0)
+
+    async def go():
+        with start_span("tool parent", "tool") as root:
+            await asyncio.gather(child("a"), child("b"))
+        return root
+
+    root = asyncio.run(go())
+    assert sorted(c.name for c in root.children) == ["a", "b"]
+    assert all(c.trace_id == root.trace_id for c in root.children)
+    assert current_span.get() is None
+
+
+def test_tool_call_exports_dbops_child_spans(monkeypatch, tmp_path, dbops_transport):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_EXPORT", "file")
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(trace_file))
+
+    fake = FakeDBOps()
+    seen_headers = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen_headers.append(request.headers.get("traceparent"))
+        return await fake.handle(request)
+
+    dbops_transport(httpx.MockTransport(handler))
+    reference_store.invalidate("doctors")
+
+    async def go():
+        async with Client(mcp) as client:
+            await client.call_tool("get_doctors", {})
+    asyncio.run(go())
+
+    trace = json.loads(trace_file.read_text().splitlines()[-1])
+    assert trace["name"] == "tool get_doctors" and trace["status"] == "ok"
+    child = trace["children"][0]
+    assert child["attributes"]["endpoint"] == "/doctors"
+    assert child["attributes"]["status"] == 200 and child["attributes"]["bytes"] > 0
+    assert seen_headers and seen_headers[0] == f"00-{trace['trace_id']}-{child['span_id']}-01"
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import os
+import tempfile
+
+import httpx
+from fastmcp import Client
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from benchmarks.fake_dbops import FakeDBOps
+from server import mcp
+from write_behind import WriteBehindQueue, communication_logs
+
+
+class Recorder:
+    """DBOps stand-in that can refuse the batch endpoint or fail the next N requests."""
+
+    def __init__(self, batch: bool = True, fail_next: int = 0):
+        self.batch = batch
+        self.fail_next = fail_next
+        self.received = []   # (path, payload)
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/batch") and not self.batch:
+            return httpx.Response(404, json={"message": "no route"})
+        if self.fail_next:
+            self.fail_next -= 1
+            return httpx.Response(503, json={"message": "busy"})
+        self.received.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200, json={"ok": True})
+
+    def messages(self):
+        out = []
+        for path, payload in self.received:
+            out.extend(p["message"] for p in payload["logs"]) if path.endswith("/batch") else out.append(payload["message"])
+        return out
+
+
+def _queue(**kwargs) -> WriteBehindQueue:
+    spill = os.path.join(tempfile.mkdtemp(), "spill.jsonl")
+    return WriteBehindQueue("test", "/communication-logs", batch_endpoint="/communication-logs/batch",
+                            spill_path=spill, **kwargs)
+
+
+def test_flush_sends_batches_of_configured_size(dbops_transport):
+    recorder = Recorder()
+    dbops_transport(httpx.MockTransport(recorder))
+    queue = _queue(batch_size=3, flush_s=60)
+    for i in range(7):
+        queue.enqueue({"message": f"m{i}"})
+    asyncio.run(queue.flush())
+    assert [len(p["logs"]) for _, p in recorder.received] == [3, 3, 1]
+    assert recorder.messages() == [f"m{i}" for i in range(7)] and queue.stats()["sent"] == 7
+
+
+def test_falls_back_to_single_posts_and_retries_failures(dbops_transport):
+    recorder = Recorder(batch=False, fail_next=1)
+    dbops_transport(httpx.MockTransport(recorder))
+    queue = _queue(batch_size=10, flush_s=60)
+    for text in ("hi", "ok", "ok"):   # Identical messages are still two log entries
+        queue.enqueue({"message": text})
+
+    asyncio.run(queue.flush())
+    assert queue.stats()["buffered"] == 1 and queue.stats()["backoff_s"] > 0
+    asyncio.run(queue.flush())
+    assert sorted(recorder.messages()) == ["hi", "ok", "ok"] and queue.stats()["buffered"] == 0
+    assert queue.batch_endpoint is None
+
+
+def test_overflow_and_unsent_logs_survive_a_restart_in_order(dbops_transport):
+    down = Recorder(fail_next=100)
+    dbops_transport(httpx.MockTransport(down))
+    queue = _queue(batch_size=10, flush_s=60, buffer_size=2)
+    for i in range(5):
+        queue.enqueue({"message": f"m{i}"})
+    assert queue.stats()["spilled"] == 3
+    asyncio.run(queue.stop(timeout=1))   # DBOps down: the buffer is spilled too
+
+    up = Recorder()
+    dbops_transport(httpx.MockTransport(up))
+    restarted = WriteBehindQueue("test", "/communication-logs", batch_endpoint="/communication-logs/batch",
+                                 spill_path=queue.spill_path, batch_size=10, buffer_size=10)
+    asyncio.run(restarted.flush())
+    assert sorted(up.messages()) == [f"m{i}" for i in range(5)]
+    assert not os.path.exists(queue.spill_path)
+
+
+def test_workers_reloading_one_spill_file_together_lose_nothing(monkeypatch):
+    import write_behind
+
+    first = _queue(buffer_size=10)
+    second = WriteBehindQueue("test", "/communication-logs", spill_path=first.spill_path, buffer_size=10)
+    first._spill([{"data": {"message": "a"}, "key": "k-a"}])
+    replace = os.replace
+    claims = []
+
+    def interleaved(src, dst):
+        replace(src, dst)
+        claims.append(dst)
+        if len(claims) == 1:        # The other worker spills and claims before this one reads its claim
+            second._spill([{"data": {"message": "b"}, "key": "k-b"}])
+            second._reload_spill()
+
+    monkeypatch.setattr(write_behind.os, "replace", interleaved)
+    first._reload_spill()
+    assert sorted(e["data"]["message"] for e in [*first.buffer, *second.buffer]) == ["a", "b"]
+    assert claims[0] != claims[1] and os.listdir(os.path.dirname(first.spill_path)) == []
+
+
+def test_tool_returns_before_dbops_write_and_nothing_is_lost_at_shutdown(dbops_transport):
+    fake = FakeDBOps(latency_ms=50)
+    dbops_transport(fake.transport())
+
+    async def scenario():
+        async with Client(mcp) as client:
+            result = await client.call_tool("add_communication_logs", {"patient_id": "pat-0", "message": "Hi"})
+            posted_during_call = sum(n for route, n in fake.calls.items() if "communication" in route)
+        # Shutdown either delivered the log or spilled it; the next flush finishes the job
+        await communication_logs.flush()
+        return result, posted_during_call
+
+    result, posted_during_call = asyncio.run(scenario())
+    assert "Logged" in result.content[0].text and posted_during_call == 0
+    assert fake.calls["POST /communication-logs/batch"] >= 1
+    assert communication_logs.stats()["buffered"] == 0 and not os.path.exists(communication_logs.spill_path)
+
+
+def test_refused_entries_are_dead_lettered_and_retries_keep_the_batch_key(dbops_transport):
+    keys, fail = [], {"batch": 1}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        if request.url.path.endswith("/batch"):
+            keys.append(request.headers["Idempotency-Key"])
+            if fail["batch"]:
+                fail["batch"] -= 1
+                return httpx.Response(503, json={"message": "busy"})
+            if any(log["message"] == "bad" for log in payload["logs"]):
+                return httpx.Response(422, json={"message": "invalid"})
+        elif payload["message"] == "bad":
+            return httpx.Response(422, json={"message": "invalid"})
+        return httpx.Response(200, json={"ok": True})
+
+    dbops_transport(httpx.MockTransport(handler))
+    queue = _queue(batch_size=3, flush_s=60)
+    for text in ("a", "b"):
+        queue.enqueue({"message": text})
+    asyncio.run(queue.flush())                   # 503: the batch is kept for a retry
+    queue.enqueue({"message": "c"})              # Queued meanwhile: not merged into the retried batch
+    queue.enqueue({"message": "bad"})
+    asyncio.run(queue.flush())
+
+    assert keys[0] == keys[1] and len(set(keys)) == 2
+    stats = queue.stats()
+    assert stats["buffered"] == 0 and stats["sent"] == 3 and stats["dead_lettered"] == 1
+    with open(f"{queue.spill_path}.dead") as f:
+        assert [json.loads(line)["data"]["message"] for line in f] == ["bad"]
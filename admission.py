@@ -0,0 +1,276 @@
+"""
+Admission control in front of DBOps.
+
+Every tool call and resource read passes two gates before it can reach the
+shared DBOps connection pool:
+
+1. Per-client token bucket. HTTP clients are charged by their `X-Client-Id`
+   header, else their MCP session (SSE / stateful HTTP), else their address
+   (stateless HTTP; first X-Forwarded-For hop behind a load balancer). Over-limit calls are rejected at once with a retry-after
+   hint. In-process and stdio callers are a single trusted client and only go
+   through the second gate. Emergency calls are never rate limited.
+2. Concurrency limit. At most MCP_ADMIT_CONCURRENCY calls run at a time (kept
+   below the DBOps pool size). The rest wait in a bounded queue ordered by
+   priority class, then arrival. A waiter past its class's deadline is shed;
+   when the queue is full, a new call displaces the lowest-priority waiter or
+   is rejected. Emergency calls may also use MCP_ADMIT_RESERVED extra slots.
+
+Priority classes, highest first: emergency (emergency family), booking
+(appointments, waitlist), standard (everything else), analytics (revenue
+family, analytics:// resources).
+
+MCP_RATE_PER_S          Sustained calls per second per client (default 10, 0 = no rate limit).
+MCP_RATE_BURST          Bucket size, i.e. calls allowed back to back (default 30).
+MCP_ADMIT_CONCURRENCY   Calls running at once (default 40, 0 = no concurrency limit).
+MCP_ADMIT_QUEUE         Calls allowed to wait for a slot (default 200).
+MCP_ADMIT_RESERVED      Extra slots only emergency calls may use (default 5).
+"""
+import asyncio
+import bisect
+import itertools
+import logging
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from cachetools import TTLCache
+from fastmcp.exceptions import ResourceError, ToolError
+from fastmcp.server.dependencies import get_http_request
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from sessions import STATELESS_HTTP, _session_id
+from tracing import current_span
+
+logger = logging.getLogger("dbops-mcp.admission")
+
+RATE_PER_S = float(os.getenv("MCP_RATE_PER_S", "10"))
+RATE_BURST = float(os.getenv("MCP_RATE_BURST", "30"))
+CONCURRENCY = int(os.getenv("MCP_ADMIT_CONCURRENCY", "40"))
+QUEUE_SIZE = int(os.getenv("MCP_ADMIT_QUEUE", "200"))
+RESERVED = int(os.getenv("MCP_ADMIT_RESERVED", "5"))
+
+# Class -> (rank, longest time a call may wait for a slot in seconds)
+PRIORITY_CLASSES: Dict[str, tuple] = {
+    "emergency": (0, 30.0),
+    "booking": (1, 10.0),
+    "standard": (2, 5.0),
+    "analytics": (3, 2.0),
+}
+FAMILY_CLASSES = {"emergency": "emergency", "appointments": "booking", "waitlist": "booking",
+                  "revenue": "analytics"}
+URI_CLASSES = {"emergency://": "emergency", "analytics://": "analytics"}
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server busy ({reason}); retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Takes a token. Returns 0 on success, else the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("rank", "seq", "future")
+
+    def __init__(self, rank: int, seq: int, future: asyncio.Future):
+        self.rank = rank
+        self.seq = seq
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class AdmissionController:
+    def __init__(self, rate: float = RATE_PER_S, burst: float = RATE_BURST, concurrency: int = CONCURRENCY,
+                 queue_size: int = QUEUE_SIZE, reserved: int = RESERVED):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.reserved = reserved
+        # client key -> bucket; idle clients expire with their bucket full anyway
+        self.buckets: TTLCache = TTLCache(maxsize=10000, ttl=600)
+        self.in_flight = 0
+        self.queue: List[_Waiter] = []   # Sorted: best rank first, then arrival
+        self._seq = itertools.count()
+        self.avg_service_s = 0.05        # EWMA of call duration, for retry-after hints
+        self.admitted: Counter = Counter()
+        self.rejected: Counter = Counter()   # reason -> count
+        self.peak_queued = 0
+
+    # --- Gate 1: per-client rate ---
+
+    def check_rate(self, client: Optional[str], cls: str) -> None:
+        if client is None or self.rate <= 0 or cls == "emergency":
+            return
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(self.rate, self.burst)
+        wait = bucket.take()
+        if wait:
+            self._reject("rate_limited", wait)
+
+    # --- Gate 2: concurrency ---
+
+    def _limit(self, rank: int) -> int:
+        return self.concurrency + (self.reserved if rank == 0 else 0)
+
+    def _retry_after(self) -> float:
+        return max(0.5, self.avg_service_s * (len(self.queue) + 1) / max(1, self.concurrency))
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected[reason] += 1
+        raise Rejected(reason, retry_after)
+
+    async def acquire(self, cls: str) -> float:
+        """Waits for a slot. Returns the time spent queued (s); raises Rejected when shed."""
+        if self.concurrency <= 0:
+            return 0.0
+        rank, max_wait = PRIORITY_CLASSES[cls]
+        if self.in_flight < self._limit(rank) and not (self.queue and self.queue[0].rank <= rank):
+            self.in_flight += 1
+            self.admitted[cls] += 1
+            return 0.0
+
+        if len(self.queue) >= self.queue_size:
+            worst = self.queue[-1]
+            if worst.rank <= rank:
+                self._reject("queue_full", self._retry_after())
+            self.queue.pop()
+            self.rejected["displaced"] += 1
+            worst.future.set_exception(Rejected("displaced by higher priority", self._retry_after()))
+
+        waiter = _Waiter(rank, next(self._seq), asyncio.get_running_loop().create_future())
+        bisect.insort(self.queue, waiter)
+        self.peak_queued = max(self.peak_queued, len(self.queue))
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._remove(waiter)
+                self._reject("deadline", self._retry_after())
+            waiter.future.result()  # Granted or displaced just as the deadline hit
+        except asyncio.CancelledError:
+            # Caller went away; hand back a slot granted in the meantime
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self.release()
+            self._remove(waiter)
+            raise
+        self.admitted[cls] += 1
+        return time.perf_counter() - t0
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if waiter in self.queue:
+            self.queue.remove(waiter)
+        waiter.future.cancel()  # No-op once granted or displaced
+
+    def release(self, duration_s: Optional[float] = None) -> None:
+        if self.concurrency <= 0:
+            return
+        if duration_s is not None:
+            self.avg_service_s += 0.1 * (duration_s - self.avg_service_s)
+        self.in_flight -= 1
+        # Grant freed slots in queue order; the head may be waiting for a reserved slot only
+        while self.queue and self.in_flight < self._limit(self.queue[0].rank):
+            waiter = self.queue.pop(0)
+            if waiter.future.done():
+                continue
+            self.in_flight += 1
+            waiter.future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self.queue),
+            "peak_queued": self.peak_queued,
+            "concurrency": self.concurrency,
+            "rate_per_s": self.rate,
+            "tracked_clients": len(self.buckets),
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
+
+
+# Global instance
+admission = AdmissionController()
+
+
+def client_key(ctx) -> Optional[str]:
+    """Who a call is charged to; None for in-process and stdio callers."""
+    try:
+        request = get_http_request()
+    except RuntimeError:
+        return None
+    explicit = request.headers.get("x-client-id")
+    if explicit:
+        return f"client:{explicit}"
+    if not STATELESS_HTTP:
+        session_id = _session_id(ctx)
+        if session_id:
+            return f"session:{session_id}"
+    forwarded = request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+    return f"addr:{forwarded or (request.client.host if request.client else 'unknown')}"
+
+
+async def tool_class(ctx, name: str) -> str:
+    from capabilities import family_of
+    try:
+        tool = await ctx.fastmcp.get_tool(name)
+    except Exception:
+        return "standard"  # Unknown tool: let the normal error path answer
+    return FAMILY_CLASSES.get(family_of(tool), "standard")
+
+
+def resource_class(uri: str) -> str:
+    for prefix, cls in URI_CLASSES.items():
+        if uri.startswith(prefix):
+            return cls
+    return "standard"
+
+
+class AdmissionMiddleware(Middleware):
+    """Applies the rate and concurrency gates to tool calls and resource reads."""
+
+    async def _admit(self, context: MiddlewareContext, call_next, cls: str, error_type: type):
+        ctx = context.fastmcp_context
+        try:
+            admission.check_rate(client_key(ctx), cls)
+            waited = await admission.acquire(cls)
+        except Rejected as e:
+            logger.warning("Rejected %s call (%s), retry after %.1fs", cls, e.reason, e.retry_after)
+            raise error_type(str(e)) from None
+        span = current_span.get()
+        if span is not None:
+            span.attributes.update(priority=cls, queued_ms=round(waited * 1000, 2))
+        t0 = time.perf_counter()
+        try:
+            return await call_next(context)
+        finally:
+            admission.release(time.perf_counter() - t0)
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        cls = await tool_class(context.fastmcp_context, context.message.name)
+        return await self._admit(context, call_next, cls, ToolError)
+
+    async def on_read_resource(self, context: MiddlewareContext, call_next):
+        return await self._admit(context, call_next, resource_class(str(context.message.uri)), ResourceError)
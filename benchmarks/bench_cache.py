@@ -0,0 +1,103 @@
+"""
+Cache backend benchmark: per-process TTLCache vs the shared SQLite (WAL) cache.
+
+1. Operation cost: get (hit), get (miss) and set, in microseconds.
+2. Multi-worker: W processes each serve R lookups of the doctor registry, a
+   DBOps-sized JSON payload fetched from FakeDBOps on a miss. With per-process
+   caches every worker warms separately; with the shared cache the first
+   worker's fetch serves the others.
+
+Run from the repo root:  python -m benchmarks.bench_cache [workers] [lookups]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_dbops import FakeDBOps
+from caches import CountingTTLCache, SQLiteCache, async_cached
+from dependencies import DBOpsClient
+
+
+def _make(backend: str, path: str, name: str = "doctors", maxsize: int = 100, ttl: float = 7200):
+    if backend == "sqlite":
+        return SQLiteCache(name, maxsize=maxsize, ttl=ttl, path=path)
+    return CountingTTLCache(maxsize=maxsize, ttl=ttl)
+
+
+def _op_costs(backend: str, path: str, n: int = 5000) -> dict:
+    cache = _make(backend, path, name="bench-ops", maxsize=n * 2)
+    payload = FakeDBOps(list_size=50).doctor(0)
+    t0 = time.perf_counter()
+    for i in range(n):
+        cache[f"k{i}"] = payload
+    set_us = (time.perf_counter() - t0) / n * 1e6
+    t0 = time.perf_counter()
+    for i in range(n):
+        cache.get(f"k{i}")
+    hit_us = (time.perf_counter() - t0) / n * 1e6
+    t0 = time.perf_counter()
+    for i in range(n):
+        cache.get(f"missing{i}")
+    miss_us = (time.perf_counter() - t0) / n * 1e6
+    cache.clear()
+    return {"set_us": set_us, "hit_us": hit_us, "miss_us": miss_us}
+
+
+def _worker(backend: str, path: str, lookups: int, results) -> None:
+    fake = FakeDBOps(latency_ms=5, list_size=200)
+    dbops = DBOpsClient(transport=fake.transport())
+    cache = _make(backend, path)
+
+    @async_cached(cache)
+    async def fetch_doctors():
+        return await dbops.get("/doctors")
+
+    async def run():
+        for _ in range(lookups):
+            await fetch_doctors()
+            await asyncio.sleep(0.002)  # Requests arrive over time, not all at once
+
+    t0 = time.perf_counter()
+    asyncio.run(run())
+    results.put((sum(fake.calls.values()), time.perf_counter() - t0))
+
+
+def _multi_worker(backend: str, path: str, workers: int, lookups: int) -> dict:
+    if backend == "sqlite":
+        SQLiteCache("doctors", maxsize=1, ttl=1, path=path).clear()
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(backend, path, lookups, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {"dbops_requests": sum(r[0] for r in rows), "slowest_worker_s": max(r[1] for r in rows)}
+
+
+def main_cli(argv=None) -> int:
+    argv = argv if argv is not None else sys.argv[1:]
+    workers = int(argv[0]) if argv else 4
+    lookups = int(argv[1]) if len(argv) > 1 else 200
+    path = os.path.join(tempfile.mkdtemp(), "bench-cache.sqlite3")
+
+    print("Operation cost (µs/op)")
+    print(f"   {'backend':<8} {'set':>8} {'get hit':>8} {'get miss':>9}")
+    for backend in ("memory", "sqlite"):
+        c = _op_costs(backend, path)
+        print(f"   {backend:<8} {c['set_us']:>8.1f} {c['hit_us']:>8.1f} {c['miss_us']:>9.1f}")
+
+    print(f"\n{workers} workers x {lookups} doctor-registry lookups (FakeDBOps, 5 ms latency)")
+    print(f"   {'backend':<8} {'DBOps requests':>15} {'slowest worker s':>17}")
+    for backend in ("memory", "sqlite"):
+        r = _multi_worker(backend, path, workers, lookups)
+        print(f"   {backend:<8} {r['dbops_requests']:>15} {r['slowest_worker_s']:>17.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,72 @@
+"""
+Capability search benchmark (fully offline).
+Measures index build time, per-query latency (cold and cached) and hit@3 on a
+set of paraphrased intents for each retrieval mode.
+
+Run from the repo root:  python -m benchmarks.bench_capabilities
+"""
+import asyncio
+import statistics
+import time
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from capabilities import CapabilityIndex
+from server import mcp
+
+# Paraphrased intent -> any capability that counts as a correct route
+INTENTS = {
+    "who can see my kid Tuesday": {"doctors://availability/{doctor_name}/{date}", "book_appointment"},
+    "refill my pills": {"add_medication_refill"},
+    "how much money did we make last quarter": {
+        "analytics://revenue/comprehensive/{start_date}/{end_date}",
+        "analytics://revenue/raw/{start_date}/{end_date}",
+    },
+    "is the dentist free tomorrow": {"doctors://availability/{doctor_name}/{date}"},
+    "call off my visit": {"cancel_appointment"},
+    "patient filled out the intake form": {"submit_previsit_response"},
+    "does my insurer pay for a root canal": {"check_procedure_coverage"},
+    "stop the metformin": {"discontinue_medication"},
+    "write up the visit notes": {"create_soap_note"},
+    "put her on the waiting list": {"join_waitlist"},
+    "someone collapsed in the lobby": {"report_emergency"},
+    "which doctors bring in the most revenue": {"analytics://performance/doctors/{start_date}/{end_date}"},
+}
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_benchmark(rounds: int = 200):
+    index = CapabilityIndex()
+    t0 = time.perf_counter()
+    await index.refresh(mcp)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"📚 Indexed {len(index.capabilities)} capabilities in {build_ms:.1f} ms")
+
+    for mode in ("bm25", "semantic", "hybrid"):
+        hits = 0
+        cold = []
+        for query, expected in INTENTS.items():
+            index._results.clear()
+            t0 = time.perf_counter()
+            results = index.search(query, top_k=3, mode=mode)
+            cold.append((time.perf_counter() - t0) * 1e6)
+            hits += bool(expected & {c.key for c, _ in results})
+
+        warm = []
+        for _ in range(rounds):
+            for query in INTENTS:
+                t0 = time.perf_counter()
+                index.search(query, top_k=3, mode=mode)
+                warm.append((time.perf_counter() - t0) * 1e6)
+
+        print(f"\n🔎 Mode: {mode}")
+        print(f"   hit@3: {hits}/{len(INTENTS)}")
+        print(f"   cold  p50 {statistics.median(cold):8.1f} µs | p95 {_percentile(cold, 95):8.1f} µs")
+        print(f"   cached p50 {statistics.median(warm):7.1f} µs | p95 {_percentile(warm, 95):8.1f} µs")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,64 @@
+"""
+Decode and validation benchmark on registry-sized DBOps payloads.
+
+For doctor registries and availability lists of N rows (FakeDBOps data):
+
+1. Decode: stdlib `json.loads` vs `fast_json.loads` (orjson when installed)
+   on the raw response bytes.
+2. Validation: one `Model(**row)` per item vs one `validate_list` call
+   (cached TypeAdapter(list[Model])) vs `validate_registry` on an unchanged
+   cached registry (no re-validation).
+
+Run from the repo root:  python -m benchmarks.bench_json [rows ...]
+"""
+import json
+import sys
+import time
+from typing import Callable
+
+import fast_json
+from benchmarks.fake_dbops import FakeDBOps
+from tools.models import Availability, DoctorBase, validate_list, validate_registry
+
+
+def _us(fn: Callable[[], object], budget_s: float = 0.3) -> float:
+    """Mean microseconds per call, repeating for about `budget_s`."""
+    fn()  # Warm-up (adapter build, caches)
+    n, t0 = 0, time.perf_counter()
+    while True:
+        fn()
+        n += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= budget_s:
+            return elapsed / n * 1e6
+
+
+def _payloads(rows: int) -> dict:
+    fake = FakeDBOps(list_size=rows)
+    availability = fake._many(lambda i: {"id": f"slot-{i}", "doctor_id": "doc-0", "day_of_week": "monday",
+                                         "start_time": f"{9 + i % 8}:00", "end_time": f"{9 + i % 8}:30",
+                                         "is_available": i % 3 != 0})
+    return {"doctors": (DoctorBase, fake._many(fake.doctor)), "availability": (Availability, availability)}
+
+
+def main_cli(argv=None) -> int:
+    argv = argv if argv is not None else sys.argv[1:]
+    sizes = [int(a) for a in argv] or [50, 500, 5000]
+    print(f"fast_json backend: {fast_json.BACKEND}")
+    print(f"   {'payload':<13} {'rows':>5} {'json.loads':>11} {'fast loads':>11} "
+          f"{'Model(**r)':>11} {'validate_list':>14} {'trusted hit':>12}   (µs/call)")
+    for rows in sizes:
+        for name, (model, data) in _payloads(rows).items():
+            body = json.dumps(data).encode()
+            stdlib = _us(lambda: json.loads(body))
+            fast = _us(lambda: fast_json.loads(body))
+            per_item = _us(lambda: [model(**row) for row in data])
+            batch = _us(lambda: validate_list(model, data))
+            trusted = _us(lambda: validate_registry(f"bench-{name}", model, data))
+            print(f"   {name:<13} {rows:>5} {stdlib:>11.1f} {fast:>11.1f} "
+                  f"{per_item:>11.1f} {batch:>14.1f} {trusted:>12.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
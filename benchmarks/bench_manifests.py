@@ -0,0 +1,91 @@
+"""
+Handshake cost benchmark: N concurrent MCP sessions each run initialize +
+tools/list + resources/list + resources/templates/list, first through FastMCP's
+stock list handlers (schemas regenerated per request), then through the
+precomputed manifests. Also measures the pre-serialized HTTP manifest route,
+with and without a matching ETag.
+
+Run from the repo root:  python -m benchmarks.bench_manifests [sessions]
+"""
+import asyncio
+import functools
+import logging
+import sys
+import time
+
+import httpx
+from fastmcp import Client, FastMCP
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+import sessions
+from server import mcp
+
+logging.disable(logging.INFO)
+
+
+def _install_list_handlers(stock: bool) -> None:
+    """(Re)binds the low-level list handlers to FastMCP's stock or our cached versions."""
+    low = mcp._mcp_server
+    if stock:
+        low.list_tools()(functools.partial(FastMCP._list_tools_mcp, mcp))
+        low.list_resources()(functools.partial(FastMCP._list_resources_mcp, mcp))
+        low.list_resource_templates()(functools.partial(FastMCP._list_resource_templates_mcp, mcp))
+    else:
+        low.list_tools()(mcp._list_tools_mcp)
+        low.list_resources()(mcp._list_resources_mcp)
+        low.list_resource_templates()(mcp._list_resource_templates_mcp)
+
+
+async def _handshake() -> None:
+    async with Client(mcp) as client:
+        await client.list_tools()
+        await client.list_resources()
+        await client.list_resource_templates()
+
+
+async def _run_sessions(n: int) -> tuple:
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    await asyncio.gather(*[_handshake() for _ in range(n)])
+    return time.perf_counter() - wall0, time.process_time() - cpu0
+
+
+async def _run_http(n: int, etag: str = None) -> tuple:
+    headers = {"If-None-Match": etag} if etag else {}
+    transport = httpx.ASGITransport(app=mcp.http_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        responses = await asyncio.gather(*[client.get("/manifest/tools", headers=headers) for _ in range(n)])
+        elapsed = time.perf_counter() - wall0, time.process_time() - cpu0
+    return elapsed + (responses[0],)
+
+
+async def run_benchmark(n: int):
+    print(f"🤝 {n} concurrent sessions (tool exposure: {sessions.EXPOSURE_MODE})")
+    await _handshake()  # warm imports, lifespan and caches
+
+    for label, stock in (("stock handlers", True), ("precomputed manifests", False)):
+        _install_list_handlers(stock)
+        wall, cpu = await _run_sessions(n)
+        print(f"   {label:<22} wall {wall:6.2f} s | cpu {cpu:6.2f} s | {cpu / n * 1000:6.2f} ms cpu/session")
+
+    # Server-side share only: the three list handlers, without client/session overhead
+    print("\n🧮 Server-side list handlers per handshake:")
+    handlers = {
+        "stock handlers": [functools.partial(FastMCP._list_tools_mcp, mcp),
+                           functools.partial(FastMCP._list_resources_mcp, mcp),
+                           functools.partial(FastMCP._list_resource_templates_mcp, mcp)],
+        "precomputed manifests": [mcp._list_tools_mcp, mcp._list_resources_mcp, mcp._list_resource_templates_mcp],
+    }
+    for label, fns in handlers.items():
+        cpu0 = time.process_time()
+        await asyncio.gather(*[fn() for _ in range(n) for fn in fns])
+        print(f"   {label:<22} {(time.process_time() - cpu0) / n * 1000:6.3f} ms cpu/session")
+
+    wall, cpu, first = await _run_http(n)
+    print(f"\n🌐 GET /manifest/tools x{n}: wall {wall:5.2f} s | cpu {cpu / n * 1000:5.2f} ms/req | {len(first.content)} bytes")
+    wall, cpu, first = await _run_http(n, etag=first.headers["etag"])
+    print(f"   with If-None-Match:     wall {wall:5.2f} s | cpu {cpu / n * 1000:5.2f} ms/req | status {first.status_code}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,89 @@
+"""
+Resident memory of the cached patient registry: list of DBOps dicts vs the
+compact struct-of-arrays registry with its lookup index (patient_registry.py).
+
+N FakeDBOps patients are encoded and decoded as a DBOps response would be, so
+every string is its own object. First and last names are drawn from pools
+(500 / 2000 names), as in a real registry where names repeat.
+
+Also times `search()`, the fuzzy name lookup, on misspelled full names.
+
+Run from the repo root:  python -m benchmarks.bench_registry [patients]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+import fast_json
+from benchmarks.fake_dbops import FakeDBOps
+from patient_registry import PatientRegistry
+
+
+SYLLABLES = ["ka", "mi", "ra", "so", "lu", "de", "na", "fa", "ri", "ho", "za", "be", "ya", "tu", "sha", "kh"]
+
+
+def _name(k: int, syllables: int) -> str:
+    """k-th synthetic name, letters only (name tokens drop digits)."""
+    parts = []
+    for _ in range(syllables):
+        k, s = divmod(k, len(SYLLABLES))
+        parts.append(SYLLABLES[s])
+    return "".join(parts).capitalize()
+
+
+def _body(n: int) -> bytes:
+    fake = FakeDBOps(list_size=n)
+    rows = fake._many(fake.patient)
+    for i, row in enumerate(rows):
+        row["first_name"], row["last_name"] = _name(i * 7919 % 500, 3), _name(i * 104729 % 2000, 3)
+    return fast_json.dumps(rows).encode()
+
+
+def _measure(build: Callable[[], object]) -> Tuple[object, int, float]:
+    """(value, bytes still allocated by it, build seconds); timed without tracemalloc's overhead."""
+    t0 = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, used, elapsed
+
+
+def _compact(body: bytes) -> PatientRegistry:
+    registry = PatientRegistry()
+    registry.load(fast_json.loads(body))  # The decoded list is garbage once loaded
+    return registry
+
+
+def main_cli(argv=None) -> int:
+    argv = argv if argv is not None else sys.argv[1:]
+    n = int(argv[0]) if argv else 100_000
+    body = _body(n)
+    dicts, dict_bytes, dict_s = _measure(lambda: fast_json.loads(body))
+    del dicts
+    registry, compact_bytes, compact_s = _measure(lambda: _compact(body))
+    per_100k = 100_000 / n / 2 ** 20
+
+    print(f"{n} patients ({len(body) / 2 ** 20:.1f} MB of JSON)")
+    print(f"   {'layout':<22} {'MB resident':>12} {'MB / 100k':>10} {'build s':>8}")
+    print(f"   {'list of dicts':<22} {dict_bytes / 2 ** 20:>12.1f} {dict_bytes * per_100k:>10.1f} {dict_s:>8.2f}")
+    print(f"   {'compact registry':<22} {compact_bytes / 2 ** 20:>12.1f} {compact_bytes * per_100k:>10.1f} {compact_s:>8.2f}")
+    print(f"   {len(registry)} patients indexed, {dict_bytes / compact_bytes:.1f}x smaller")
+    searches = min(200, n)
+    t0 = time.perf_counter()
+    for row in range(0, n, n // searches or 1):
+        first, last = registry.first_names[row], registry.last_names[row]
+        registry.search(f"{first[:-1]}e {last[:2]}{last[1:]}")   # Last letter changed, one doubled
+    print(f"   fuzzy name search: {(time.perf_counter() - t0) / searches * 1e3:.2f} ms/call "
+          f"over {len(registry.names)} distinct name tokens")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,262 @@
+"""
+In-process DBOps stand-in for benchmarks and load tests.
+
+FakeDBOps answers every endpoint the tool families call with synthetic data.
+Latency, list payload sizes and error rate are configurable, so the same suite
+can model a fast LAN, a struggling backend or a flaky one.
+
+    fake = FakeDBOps(latency_ms=5, jitter_ms=2, list_size=200, error_rate=0.01)
+    dbops.use_transport(fake.transport())      # in-process, no sockets
+    app = fake.asgi_app()                      # or serve it over real HTTP
+
+It also stands in for the DBOps change feed: `fake.emit("clinic", "updated",
+"clinic-0", {...})` records an event, served on GET /events/stream as
+server-sent events after the client's Last-Event-ID. `fake.update_patient({...})`
+changes a patient, returned by GET /patients?updatedSince=<cursor>.
+"""
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+Handler = Callable[[re.Match, Optional[dict], dict], object]
+
+
+class FakeDBOps:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        list_size: int = 50,
+        text_bytes: int = 120,
+        error_rate: float = 0.0,
+        seed: int = 7,
+        clinic_prefix: str = "",
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.list_size = list_size
+        self.text_bytes = text_bytes
+        self.error_rate = error_rate
+        self.clinic_prefix = clinic_prefix  # Distinct clinic ids per stand-in, for sharding tests
+        self._rng = random.Random(seed)
+        self._routes: List[Tuple[str, re.Pattern, Handler]] = []
+        self._register_routes()
+
+        # Observability for load tests
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.bytes_sent = 0
+        self.events: List[dict] = []
+        self.patient_updates: Dict[str, dict] = {}
+
+    # --- Transport adapters ---
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def asgi_app(self):
+        """Minimal ASGI app so the stand-in can also sit behind a real socket."""
+        from starlette.applications import Starlette
+        from starlette.requests import Request
+        from starlette.responses import Response
+        from starlette.routing import Route
+
+        async def endpoint(request: Request) -> Response:
+            req = httpx.Request(request.method, str(request.url), content=await request.body())
+            res = await self.handle(req)
+            return Response(res.content, status_code=res.status_code, media_type="application/json")
+
+        methods = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+        return Starlette(routes=[Route("/{path:path}", endpoint, methods=methods)])
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self.latency_ms + (self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+
+            path = request.url.path
+            if request.method == "GET" and path == "/events/stream":
+                return self._event_stream(request.headers.get("Last-Event-ID"))
+            body = json.loads(request.content) if request.content else None
+            params = dict(request.url.params)
+            for method, pattern, handler in self._routes:
+                if method != request.method:
+                    continue
+                match = pattern.fullmatch(path)
+                if match:
+                    key = f"{method} {pattern.pattern}"
+                    self.calls[key] += 1
+                    if self.error_rate and self._rng.random() < self.error_rate:
+                        self.errors[key] += 1
+                        return httpx.Response(500, json={"message": "Injected failure"})
+                    content = json.dumps(handler(match, body, params)).encode()
+                    self.bytes_sent += len(content)
+                    return httpx.Response(200, content=content, headers={"Content-Type": "application/json"})
+            self.errors[f"{request.method} {path}"] += 1
+            return httpx.Response(404, json={"message": f"No fake route for {request.method} {path}"})
+        finally:
+            self.in_flight -= 1
+
+    # --- Change feed ---
+
+    def emit(self, entity: str, op: str, entity_id: str, data: Optional[dict] = None) -> dict:
+        event = {"id": f"evt-{len(self.events) + 1}", "entity": entity, "op": op, "entity_id": entity_id}
+        if data is not None:
+            event["data"] = data
+        self.events.append(event)
+        return event
+
+    def update_patient(self, record: dict) -> dict:
+        """Creates or changes a patient (stamped with updated_at now)."""
+        record = {**record, "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")}
+        self.patient_updates[record["id"]] = record
+        return record
+
+    def _patients(self, params: dict) -> List[dict]:
+        since = params.get("updatedSince")
+        if since is not None:
+            return [p for p in self.patient_updates.values() if p["updated_at"] > since]
+        patients = {p["id"]: p for p in self._many(self.patient)}
+        patients.update(self.patient_updates)
+        return [p for p in patients.values() if not p.get("deleted")]
+
+    def _event_stream(self, last_event_id: Optional[str]) -> httpx.Response:
+        """Events after `last_event_id`; the stream then ends cleanly and the client reconnects."""
+        ids = [e["id"] for e in self.events]
+        start = ids.index(last_event_id) + 1 if last_event_id in ids else 0
+        body = "".join(f"id: {e['id']}\ndata: {json.dumps(e)}\n\n" for e in self.events[start:])
+        return httpx.Response(200, content=body.encode(), headers={"Content-Type": "text/event-stream"})
+
+    def reset_stats(self) -> None:
+        self.calls.clear()
+        self.errors.clear()
+        self.max_in_flight = self.in_flight
+        self.bytes_sent = 0
+
+    # --- Synthetic data ---
+
+    def _text(self, prefix: str) -> str:
+        filler = "lorem ipsum dolor sit amet " * (self.text_bytes // 27 + 1)
+        return f"{prefix}: {filler[: self.text_bytes]}"
+
+    def _many(self, factory: Callable[[int], dict]) -> List[dict]:
+        return [factory(i) for i in range(self.list_size)]
+
+    def doctor(self, i: int) -> dict:
+        return {"id": f"doc-{i}", "first_name": f"Doc{i}", "last_name": f"Smith{i}", "title": "Dentist",
+                "languages_spoken": ["English", "Arabic"], "specialties": [{"name": "General"}]}
+
+    def patient(self, i: int) -> dict:
+        return {"id": f"pat-{i}", "first_name": f"Pat{i}", "last_name": f"Doe{i}",
+                "date_of_birth": "1990-01-01", "phoneNumber": f"97150{i:07d}",
+                "email": f"pat{i}@example.com", "reliability_score": 0.9,
+                "medical_history": self._text("history"), "allergies": ["penicillin"],
+                "updated_at": "2026-01-01T00:00:00Z"}
+
+    def appointment(self, i: int) -> dict:
+        return {"id": f"appt-{i}", "clinic_id": "clinic-0", "patient_id": f"pat-{i % 10}",
+                "doctor_id": f"doc-{i % 5}", "appointment_date": f"2026-01-{i % 28 + 1:02d}",
+                "start_time": "10:00", "end_time": "10:30", "status": "scheduled",
+                "notes": self._text("notes")}
+
+    def clinic(self, clinic_id: str) -> dict:
+        return {"id": clinic_id, "name": f"Clinic {clinic_id.rsplit('-', 1)[-1]}", "address": "1 Main St",
+                "city": "Dubai", "phone": "0400000000", "email": "c@example.com"}
+
+    def medication(self, i: int) -> dict:
+        return {"id": f"med-{i}", "medicationName": f"Metformin{i}", "dosage": "500mg",
+                "frequency": "twice daily", "status": "active", "instructions": self._text("take")}
+
+    def _register_routes(self) -> None:
+        S = r"[^/]+"
+        m = self._many
+        routes: List[Tuple[str, str, Handler]] = [
+            ("GET", r"/health", lambda *_: {"status": "ok"}),
+            # Doctors
+            ("GET", r"/doctors", lambda *_: m(self.doctor)),
+            ("GET", rf"/doctors/{S}/availability", lambda *_: m(lambda i: {
+                "id": f"slot-{i}", "doctor_id": "doc-0", "day_of_week": "monday",
+                "start_time": f"{9 + i % 8}:00", "end_time": f"{9 + i % 8}:30", "is_available": i % 3 != 0})),
+            ("POST", r"/doctors/availability", lambda *_: {"id": "slot-new"}),
+            # Patients
+            ("GET", r"/patients", lambda match, body, params: self._patients(params)),
+            ("GET", rf"/patients/by-phone/{S}", lambda match, *_: self.patient(0)),
+            ("GET", rf"/patients/{S}", lambda *_: self.patient(0)),
+            ("POST", r"/patients", lambda match, body, _: {"id": "pat-new", **(body or {})}),
+            ("GET", rf"/patients/{S}/appointments", lambda *_: m(self.appointment)),
+            ("GET", rf"/patients/{S}/medications", lambda *_: m(self.medication)),
+            ("GET", rf"/patients/{S}/medications/active", lambda *_: m(self.medication)),
+            ("GET", rf"/patients/{S}/medications/history", lambda *_: m(self.medication)),
+            ("GET", rf"/patients/{S}/medications/statistics", lambda *_: {"total": self.list_size, "active": 3}),
+            ("POST", rf"/patients/{S}/medications", lambda *_: {"id": "med-new"}),
+            ("PUT", rf"/patients/{S}/medications/{S}", lambda *_: {"id": "med-0"}),
+            ("POST", rf"/patients/{S}/medications/{S}/(discontinue|refill)", lambda *_: {"id": "med-0"}),
+            # Appointments & clinical
+            ("GET", r"/appointments", lambda *_: m(self.appointment)),
+            ("POST", r"/appointments", lambda *_: {"id": "appt-new"}),
+            ("PATCH", rf"/appointments/{S}/cancel", lambda *_: {"id": "appt-0", "status": "cancelled"}),
+            ("GET", rf"/appointments/{S}/soap-notes", lambda *_: m(lambda i: {"id": f"note-{i}", "subjective": self._text("s")})),
+            ("GET", rf"/appointments/{S}/soap-notes/latest", lambda *_: {
+                "id": "note-0", "subjective": self._text("s"), "objective": self._text("o"),
+                "assessment": self._text("a"), "plan": self._text("p")}),
+            ("GET", rf"/appointments/{S}/soap-notes/history", lambda *_: m(lambda i: {"version": i, "subjective": self._text("s")})),
+            ("POST", rf"/appointments/{S}/soap-notes", lambda *_: {"id": "note-new"}),
+            ("PUT", rf"/appointments/{S}/soap-notes/{S}", lambda *_: {"id": "note-0"}),
+            ("POST", rf"/appointments/{S}/soap-notes/{S}/new-version", lambda *_: {"id": "note-0", "version": 2}),
+            ("GET", rf"/treatment-plans/patient/{S}", lambda *_: m(lambda i: {"id": f"plan-{i}", "diagnosis": self._text("dx")})),
+            ("GET", rf"/treatment-plans/patient/{S}/history", lambda *_: m(lambda i: {"id": f"plan-{i}", "diagnosis": self._text("dx")})),
+            ("GET", rf"/treatment-plans/appointment/{S}", lambda *_: {"id": "plan-0", "diagnosis": self._text("dx")}),
+            ("POST", r"/treatment-plans", lambda *_: {"id": "plan-new"}),
+            ("PUT", rf"/treatment-plans/{S}", lambda *_: {"id": "plan-0"}),
+            ("POST", rf"/treatment-plans/{S}/discontinue", lambda *_: {"id": "plan-0"}),
+            # Reminders
+            ("GET", rf"/db/reminders/medication/{S}", lambda *_: m(lambda i: {"id": f"rem-{i}", "message": self._text("take"), "send_at": "08:00"})),
+            ("GET", rf"/db/reminders/adherence/{S}", lambda *_: {"adherence_rate": 92, "taken": 46, "missed": 4, "total_reminders": 50}),
+            ("POST", r"/db/reminders/medication", lambda *_: {"id": "rem-new", "message": "Medication schedule"}),
+            ("PATCH", rf"/db/reminders/adherence/{S}", lambda *_: {"ok": True}),
+            # Analytics
+            ("GET", r"/analytics/revenue", lambda *_: {"totalRevenue": 125000.0, "breakdown": {"cleaning": 40000.0}}),
+            ("GET", r"/analytics/revenue/data", lambda *_: {"totalRevenue": 125000.0}),
+            ("GET", r"/analytics/revenue/monthly-trend", lambda *_: m(lambda i: {"month": f"2025-{i % 12 + 1:02d}", "revenue": 1000.0 * i})),
+            ("GET", r"/analytics/revenue/daily-trend", lambda *_: m(lambda i: {"date": f"2025-01-{i % 28 + 1:02d}", "revenue": 100.0 * i})),
+            ("GET", r"/analytics/specialty-performance", lambda *_: m(lambda i: {"specialty": f"spec-{i}", "revenue": 10.0 * i, "appointments": i})),
+            ("GET", r"/analytics/top-doctors", lambda *_: m(lambda i: {"doctor_id": f"doc-{i}", "name": f"Doc{i}", "revenue": 10.0 * i, "appointmentCount": i})),
+            ("GET", r"/analytics/dashboard", lambda *_: {"summary": {"activePatients": 900, "newPatientsThisMonth": 40, "upcomingAppointments": 120}}),
+            # Clinics, insurance, procedures
+            ("GET", r"/clinics", lambda *_: [self.clinic(f"{self.clinic_prefix}clinic-{i}") for i in range(3)]),
+            ("GET", r"/clinics/payment/methods", lambda *_: ["cash", "card", "insurance"]),
+            ("GET", r"/clinics/visit-fees", lambda *_: m(lambda i: {"visitType": f"type-{i}", "fee": 100 + i})),
+            ("GET", r"/clinics/insurance/providers", lambda *_: m(lambda i: {"id": f"ins-{i}", "name": f"Insurer {i}"})),
+            ("GET", r"/clinics/procedures/insurance-coverage", lambda *_: {"covered": True, "percentage": 80}),
+            ("GET", rf"/clinics/({S})", lambda match, *_: self.clinic(match.group(1))),
+            ("GET", r"/procedures", lambda *_: m(lambda i: {"id": f"proc-{i}", "name": f"Procedure {i}", "price": 200 + i})),
+            ("GET", rf"/procedures/name/{S}", lambda *_: {"id": "proc-0", "name": "Cleaning"}),
+            ("GET", rf"/procedure-guidelines/procedure/{S}", lambda *_: {"pre": self._text("pre"), "post": self._text("post")}),
+            # Ops: emergencies, waitlist, inquiries, previsit, users, communication
+            ("GET", r"/emergencies", lambda *_: m(lambda i: {"id": f"em-{i}", "priority": "urgent"})),
+            ("POST", r"/emergencies", lambda *_: {"id": "em-new"}),
+            ("PUT", rf"/emergencies/{S}/status", lambda *_: {"ok": True}),
+            ("GET", r"/db/waitlist", lambda *_: m(lambda i: {"id": f"wl-{i}", "patient_id": f"pat-{i}"})),
+            ("POST", r"/db/waitlist/add", lambda *_: {"id": "wl-new"}),
+            ("GET", r"/inquiries", lambda *_: m(lambda i: {"id": f"inq-{i}", "subject": self._text("subject")})),
+            ("POST", r"/inquiries", lambda *_: {"id": "inq-new"}),
+            ("PATCH", rf"/inquiries/{S}/answer", lambda *_: {"ok": True}),
+            ("GET", r"/previsit-responses", lambda *_: m(lambda i: {"id": f"pv-{i}", "responses": {"pain": "none"}})),
+            ("GET", r"/previsit-responses/date-range", lambda *_: m(lambda i: {"id": f"pv-{i}", "responses": {"pain": "none"}})),
+            ("POST", r"/previsit-responses", lambda *_: {"id": "pv-new"}),
+            ("POST", r"/auth/register", lambda *_: {"id": "user-new"}),
+            ("POST", r"/communication-logs", lambda *_: {"id": "log-new"}),
+            ("POST", r"/communication-logs/batch", lambda m, body, p: {"created": len(body["logs"])}),
+        ]
+        self._routes = [(method, re.compile(path), handler) for method, path, handler in routes]
@@ -0,0 +1,305 @@
+"""
+SSE load generator: opens many concurrent MCP sessions over the SSE transport
+and replays a weighted mix of staff calls (lookups, bookings, analytics).
+
+By default it starts the server locally (the same app `fastmcp run main.py
+--transport sse` serves) with FakeDBOps behind a real HTTP socket, so the
+DBOps connection pool is exercised exactly as in production. Probes running on
+the server's event loop sample loop lag and pool saturation.
+
+Run from the repo root:
+    python -m benchmarks.load_sse --sessions 200 --calls 20
+    python -m benchmarks.load_sse --sessions 200 --latency-ms 20 --json load.json
+    python -m benchmarks.load_sse --url http://pod:8000/sse   # external server, client-side metrics only
+    python -m benchmarks.load_sse --url http://lb:8000/mcp   # streamable HTTP (e.g. stateless replicas)
+
+The load generator shares the process (and GIL) with the local server; for
+absolute sizing numbers point --url at a separately started server.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import uvicorn
+from fastmcp import Client
+from fastmcp.client.transports import SSETransport, StreamableHttpTransport
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from benchmarks.fake_dbops import FakeDBOps
+from benchmarks.run_suite import PHONE, _invoke, _looks_like_error, _percentile
+from dependencies import dbops
+from idempotency import idempotent_writes
+from server import mcp
+
+# (weight, label, kind, target, arguments). Weights roughly follow front-desk traffic.
+MIX: List[Tuple[int, str, str, str, Optional[dict]]] = [
+    (20, "lookup", "tool", "resolve_patient_by_phone", {"phone_number": PHONE}),
+    (15, "lookup", "tool", "get_doctors", {}),
+    (10, "lookup", "resource", "doctors://availability/Doc1/2026-01-05", None),
+    (10, "lookup", "resource", f"patients://appointments/{PHONE}", None),
+    (8, "lookup", "tool", "search_staff_tools", {"query": "book an appointment"}),
+    (6, "lookup", "tool", "get_clinic_info", {}),
+    (10, "booking", "tool", "book_appointment", {"patient_name": PHONE, "doctor_name": "Doc1", "date": "2026-01-05",
+                                                 "start_time": "10:00", "end_time": "10:30"}),
+    (4, "booking", "tool", "cancel_appointment", {"appointment_id": "appt-0", "reason": "sick"}),
+    (4, "booking", "tool", "join_waitlist", {"clinic_id": "clinic-0", "patient_id": "pat-0",
+                                             "preferred_date": "2026-01-05"}),
+    (5, "analytics", "resource", "analytics://dashboard/summary/2025-01-01/2025-12-31", None),
+    (4, "analytics", "resource", "analytics://revenue/comprehensive/2025-01-01/2025-12-31", None),
+    (4, "analytics", "resource", "analytics://performance/doctors/2025-01-01/2025-12-31", None),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _summary(samples: List[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(_percentile(samples, 50), 2),
+        "p95_ms": round(_percentile(samples, 95), 2),
+        "p99_ms": round(_percentile(samples, 99), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+class ServerProbes:
+    """Samples event-loop lag and DBOps pool usage from inside the server loop."""
+
+    def __init__(self, interval_ms: float = 10.0):
+        self.interval = interval_ms / 1000
+        self.lag_ms: List[float] = []
+        self.max_connections = 0
+        self.peak_busy = 0
+        self.peak_queued = 0
+        self.saturated_samples = 0
+        self.samples = 0
+
+    async def run(self, stop: asyncio.Event) -> None:
+        self.max_connections = dbops.pool_stats().get("max_connections") or 0
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lag_ms.append(max(0.0, (time.perf_counter() - t0 - self.interval) * 1000))
+            pool = dbops.pool_stats()
+            if not pool["available"]:
+                continue
+            self.peak_busy = max(self.peak_busy, pool["busy_connections"])
+            self.peak_queued = max(self.peak_queued, pool["queued_requests"])
+            self.samples += 1
+            self.saturated_samples += pool["queued_requests"] > 0
+
+    def report(self) -> dict:
+        return {
+            "loop_lag": _summary(self.lag_ms),
+            "pool": {
+                "max_connections": self.max_connections,
+                "peak_busy_connections": self.peak_busy,
+                "peak_queued_requests": self.peak_queued,
+                "saturated_pct": round(100 * self.saturated_samples / self.samples, 1) if self.samples else 0.0,
+            },
+        }
+
+
+class LocalServer:
+    """The MCP SSE app plus FakeDBOps over HTTP, both on one event loop in a background thread."""
+
+    def __init__(self, fake: FakeDBOps, probes: ServerProbes):
+        self.fake = fake
+        self.probes = probes
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}/sse"
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _serve(self) -> None:
+        fake_port = _free_port()
+        original = (dbops.base_url, dbops._client)
+        dbops.base_url = f"http://127.0.0.1:{fake_port}"
+        dbops.use_transport(None)  # Real sockets, real pool limits
+
+        servers = [
+            uvicorn.Server(uvicorn.Config(self.fake.asgi_app(), port=fake_port, log_level="warning")),
+            uvicorn.Server(uvicorn.Config(mcp.http_app(transport="sse"), port=self.port,
+                                          log_level="warning", timeout_keep_alive=30)),
+        ]
+        for s in servers:
+            s.install_signal_handlers = lambda: None
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        tasks = [asyncio.create_task(s.serve()) for s in servers]
+        while not all(s.started for s in servers):
+            await asyncio.sleep(0.01)
+        probe = asyncio.create_task(self.probes.run(self._stop))
+        self._ready.set()
+
+        await self._stop.wait()
+        await probe
+        for s in servers:
+            s.should_exit = True
+        await asyncio.gather(*tasks)
+        await dbops.close()
+        dbops.base_url, dbops._client = original
+
+    def __enter__(self):
+        self._thread.start()
+        if not self._ready.wait(timeout=30):
+            raise RuntimeError("Local server did not start")
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout=30)
+
+
+async def _session(url: str, calls: int, think_ms: float, rng: random.Random, results: dict) -> None:
+    t0 = time.perf_counter()
+    try:
+        # Each simulated agent identifies itself, so per-client rate limits apply per session
+        headers = {"X-Client-Id": f"load-{rng.random():.12f}"}
+        transport = (SSETransport(url, headers=headers) if url.rstrip("/").endswith("/sse")
+                     else StreamableHttpTransport(url, headers=headers))
+        async with Client(transport, timeout=60) as client:
+            results["setup"].append((time.perf_counter() - t0) * 1000)
+            weights = [m[0] for m in MIX]
+            for _ in range(calls):
+                _, label, kind, target, args = rng.choices(MIX, weights=weights)[0]
+                if think_ms:
+                    await asyncio.sleep(rng.uniform(0, 2 * think_ms) / 1000)
+                c0 = time.perf_counter()
+                try:
+                    failed = _looks_like_error(await _invoke(client, kind, target, args))
+                except Exception:
+                    failed = True
+                elapsed = (time.perf_counter() - c0) * 1000
+                results["calls"][target].append(elapsed)
+                results["labels"][label].append(elapsed)
+                if failed:
+                    results["errors"][target] += 1
+    except Exception as e:
+        results["session_failures"].append(f"{type(e).__name__}: {e}")
+
+
+async def generate_load(url: str, sessions: int, calls: int, ramp_s: float, think_ms: float, seed: int) -> dict:
+    results = {
+        "setup": [], "session_failures": [],
+        "calls": defaultdict(list), "labels": defaultdict(list), "errors": defaultdict(int),
+    }
+    rng = random.Random(seed)
+
+    async def delayed(i: int):
+        await asyncio.sleep(ramp_s * i / max(1, sessions))
+        await _session(url, calls, think_ms, random.Random(rng.random()), results)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[delayed(i) for i in range(sessions)])
+    elapsed = time.perf_counter() - t0
+
+    total = sum(len(s) for s in results["calls"].values())
+    return {
+        "sessions": {"requested": sessions, "opened": len(results["setup"]),
+                     "failed": len(results["session_failures"]),
+                     "failure_samples": results["session_failures"][:5]},
+        "session_setup": _summary(results["setup"]),
+        "throughput": {"calls": total, "seconds": round(elapsed, 2), "calls_per_s": round(total / elapsed, 1)},
+        "by_category": {label: _summary(s) for label, s in results["labels"].items()},
+        "by_call": {t: {**_summary(s), "errors": results["errors"].get(t, 0)} for t, s in results["calls"].items()},
+    }
+
+
+def run_load(sessions: int = 200, calls: int = 20, ramp_s: float = 2.0, think_ms: float = 50.0,
+             url: Optional[str] = None, seed: int = 7, **fake_kwargs) -> dict:
+    if url:
+        return asyncio.run(generate_load(url, sessions, calls, ramp_s, think_ms, seed))
+
+    fake = FakeDBOps(**fake_kwargs)
+    probes = ServerProbes()
+    with LocalServer(fake, probes) as server:
+        report = asyncio.run(generate_load(server.url, sessions, calls, ramp_s, think_ms, seed))
+    report["server"] = probes.report()
+    report["server"]["dbops_max_in_flight"] = fake.max_in_flight
+    report["server"]["dbops_requests"] = sum(fake.calls.values())
+    return report
+
+
+def _row(name: str, s: dict) -> str:
+    if not s.get("count"):
+        return f"   {name:<58} {'-':>6}"
+    return (f"   {name:<58} {s['count']:>6} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+            f"{s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+
+
+def print_report(report: dict) -> None:
+    s = report["sessions"]
+    print(f"\n🔌 Sessions: {s['opened']}/{s['requested']} opened, {s['failed']} failed")
+    for failure in s["failure_samples"]:
+        print(f"   ! {failure}")
+    header = f"   {'':<58} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)
+    print(_row("session setup (connect + initialize)", report["session_setup"]))
+
+    print("\n📊 Per-call latency")
+    print(header)
+    for label, summary in report["by_category"].items():
+        print(_row(f"[{label}]", summary))
+    for target, summary in sorted(report["by_call"].items()):
+        print(_row(target[:58], summary) + (f"  ⚠️ {summary['errors']} errors" if summary["errors"] else ""))
+
+    t = report["throughput"]
+    print(f"\n🚀 Throughput: {t['calls_per_s']} calls/s ({t['calls']} calls in {t['seconds']} s)")
+
+    server = report.get("server")
+    if server:
+        lag, pool = server["loop_lag"], server["pool"]
+        print(f"\n⏱️  Server event-loop lag: p50 {lag.get('p50_ms', 0)} ms, p99 {lag.get('p99_ms', 0)} ms, "
+              f"max {lag.get('max_ms', 0)} ms")
+        print(f"🏊 DBOps pool: peak {pool['peak_busy_connections']}/{pool['max_connections']} busy connections, "
+              f"peak {pool['peak_queued_requests']} queued requests, saturated {pool['saturated_pct']}% of samples "
+              f"({server['dbops_requests']} DBOps requests, max {server['dbops_max_in_flight']} in flight)")
+
+
+def main_cli(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=20, help="Calls per session")
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="Spread session starts over this many seconds")
+    parser.add_argument("--think-ms", type=float, default=50.0, help="Mean pause between a session's calls")
+    parser.add_argument("--url", help="Target an already running SSE (/sse) or streamable-HTTP (/mcp) endpoint instead of a local server")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="FakeDBOps latency (local server only)")
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--list-size", type=int, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+    # Failing calls are counted in the report; keep the server's tracebacks out of it
+    logging.disable(logging.ERROR)
+    # The plan repeats identical write payloads: time the DBOps write path, not idempotent replays
+    idempotent_writes.window_s = 0
+
+    fake_kwargs = {} if args.url else dict(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                           list_size=args.list_size, error_rate=args.error_rate)
+    report = run_load(args.sessions, args.calls, args.ramp_s, args.think_ms, args.url, args.seed, **fake_kwargs)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved to {args.json}")
+    return 1 if report["sessions"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,173 @@
+"""
+Local stateless-replica harness: N server processes in MCP_MODE=stateless-http,
+each with its own FakeDBOps, behind a plain round-robin proxy (no sticky
+sessions). Every MCP request of a client session may land on a different
+replica, which is what a Kubernetes Service / cloud load balancer does.
+
+Run from the repo root:
+    python -m benchmarks.replicas --replicas 3 --sessions 50 --calls 20
+
+Prints the load report (see load_sse.py) plus how many requests each replica
+served. A single replica can be started with `--serve PORT`.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from benchmarks.load_sse import _free_port
+
+# Hop-by-hop headers, plus the ones httpx recomputes for the decoded body
+_DROP_HEADERS = {"host", "connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding"}
+
+
+def serve_replica(port: int, latency_ms: float = 5.0) -> None:
+    """Runs one replica on `port`. Started by ReplicaSet with MCP_MODE=stateless-http in its environment."""
+    import main
+    from benchmarks.fake_dbops import FakeDBOps
+    from dependencies import dbops
+
+    dbops.use_transport(FakeDBOps(latency_ms=latency_ms).transport())
+    uvicorn.run(main.http_app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+class RoundRobinProxy:
+    """Forwards each HTTP request to the next upstream in turn and counts where it went."""
+
+    def __init__(self, upstreams: List[str]):
+        self.upstreams = upstreams
+        self.served: Counter = Counter()
+        self._next = 0
+        self._client: httpx.AsyncClient = None
+
+    async def forward(self, request: Request) -> Response:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=60)
+        upstream = self.upstreams[self._next % len(self.upstreams)]
+        self._next += 1
+        self.served[upstream] += 1
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _DROP_HEADERS}
+        reply = await self._client.request(request.method, upstream + request.url.path,
+                                           params=request.query_params, headers=headers,
+                                           content=await request.body())
+        return Response(reply.content, status_code=reply.status_code,
+                        headers={k: v for k, v in reply.headers.items() if k.lower() not in _DROP_HEADERS})
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[Route("/{path:path}", self.forward, methods=["GET", "POST", "DELETE"])])
+
+
+class ReplicaSet:
+    """Starts N replica processes and the proxy; `url` is the load-balanced /mcp endpoint."""
+
+    def __init__(self, replicas: int = 2, latency_ms: float = 5.0):
+        self.ports = [_free_port() for _ in range(replicas)]
+        self.latency_ms = latency_ms
+        self.proxy = RoundRobinProxy([f"http://127.0.0.1:{p}" for p in self.ports])
+        self.proxy_port = _free_port()
+        self.url = f"http://127.0.0.1:{self.proxy_port}/mcp"
+        self._procs: List[subprocess.Popen] = []
+        self._workdir = tempfile.mkdtemp(prefix="mcp-replicas-")
+
+    def _spawn(self, port: int) -> subprocess.Popen:
+        env = dict(os.environ, MCP_MODE="stateless-http", MCP_CACHE_BACKEND="memory",
+                   MCP_SNAPSHOT_PATH=os.path.join(self._workdir, f"snapshot-{port}.bin"))
+        log = open(os.path.join(self._workdir, f"replica-{port}.log"), "wb")
+        return subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.replicas", "--serve", str(port),
+             "--latency-ms", str(self.latency_ms)],
+            env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+    def _wait_ready(self, port: int, proc: subprocess.Popen, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                break
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/livez", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        with open(os.path.join(self._workdir, f"replica-{port}.log"), "rb") as f:
+            tail = f.read()[-2000:].decode(errors="replace")
+        raise RuntimeError(f"Replica on port {port} did not start:\n{tail}")
+
+    def __enter__(self):
+        self._procs = [self._spawn(p) for p in self.ports]
+        try:
+            for port, proc in zip(self.ports, self._procs):
+                self._wait_ready(port, proc)
+        except Exception:
+            self._terminate()
+            raise
+        config = uvicorn.Config(self.proxy.app(), port=self.proxy_port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._server.install_signal_handlers = lambda: None
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def _terminate(self) -> None:
+        for proc in self._procs:
+            proc.terminate()
+        for proc in self._procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+        self._terminate()
+
+    def served(self) -> dict:
+        return {f"replica:{url.rsplit(':', 1)[1]}": self.proxy.served[url] for url in self.proxy.upstreams}
+
+
+def main_cli(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=20, help="Calls per session")
+    parser.add_argument("--ramp-s", type=float, default=2.0)
+    parser.add_argument("--think-ms", type=float, default=50.0)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="FakeDBOps latency in each replica")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve_replica(args.serve, args.latency_ms)
+        return 0
+
+    from benchmarks.load_sse import generate_load, print_report
+    logging.disable(logging.ERROR)
+    with ReplicaSet(args.replicas, args.latency_ms) as replicas:
+        report = asyncio.run(generate_load(replicas.url, args.sessions, args.calls, args.ramp_s,
+                                           args.think_ms, args.seed))
+        print_report(report)
+        print(f"\n⚖️  Requests per replica: {replicas.served()}")
+    return 1 if report["sessions"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,342 @@
+"""
+Offline benchmark suite: drives every tool and resource family in process
+against the FakeDBOps stand-in (no server, no network, no real DBOps).
+
+Reports per-call and per-family p50/p95/p99 latency, throughput under
+concurrency and allocation high-water per call (tracemalloc), and can save
+the results as a JSON baseline or compare against one.
+
+Run from the repo root:
+    python -m benchmarks.run_suite --save benchmarks/baselines/local.json
+    python -m benchmarks.run_suite --latency-ms 5 --compare benchmarks/baselines/local.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastmcp import Client
+
+import main  # noqa: F401 - registers every tool family on `mcp`
+from benchmarks.fake_dbops import FakeDBOps
+from dependencies import dbops
+from idempotency import idempotent_writes
+from server import mcp
+
+PHONE = "0501234567"
+
+# family -> [(kind, tool name or resource URI, arguments)]
+CALL_PLAN: Dict[str, List[Tuple[str, str, Optional[dict]]]] = {
+    "doctors": [
+        ("tool", "get_doctors", {}),
+        ("resource", "doctors://list", None),
+        ("resource", "doctors://availability/Doc1/2026-01-05", None),
+        ("tool", "add_availability_tool", {"doctor_name": "Doc1", "day_of_week": "Monday",
+                                           "start_time": "09:00", "end_time": "12:00"}),
+    ],
+    "patients": [
+        ("tool", "resolve_patient_by_phone", {"phone_number": PHONE}),
+        ("tool", "search_patients", {"name": "Pat1 Doe1"}),
+        ("resource", f"patients://appointments/{PHONE}", None),
+        ("tool", "create_patient_tool", {"first_name": "Sara", "last_name": "Ali", "email": "sara@example.com",
+                                         "phone": PHONE, "dob": "1990-01-01"}),
+    ],
+    "appointments": [
+        ("resource", "appointments://doctor/Doc1", None),
+        ("tool", "book_appointment", {"patient_name": PHONE, "doctor_name": "Doc1", "date": "2026-01-05",
+                                      "start_time": "10:00", "end_time": "10:30"}),
+        ("tool", "cancel_appointment", {"appointment_id": "appt-0", "reason": "sick"}),
+    ],
+    "medications": [
+        ("resource", f"medications://all/{PHONE}", None),
+        ("resource", f"medications://active/{PHONE}", None),
+        ("resource", f"medications://history/{PHONE}/2025-01-01/2025-12-31", None),
+        ("resource", f"medications://statistics/{PHONE}", None),
+        ("tool", "prescribe_medication", {"patient_name": PHONE, "medication_name": "Metformin", "dosage": "500mg",
+                                          "frequency": "daily", "start_date": "2026-01-01", "instructions": "with food"}),
+        ("tool", "update_prescription", {"patient_name": PHONE, "medication_name": "Metformin1", "new_dosage": "1g"}),
+        ("tool", "discontinue_medication", {"patient_name": PHONE, "medication_name": "Metformin1", "reason": "done"}),
+        ("tool", "add_medication_refill", {"patient_name": PHONE, "medication_name": "Metformin1",
+                                           "refill_date": "2026-01-01", "quantity": 30, "pharmacy": "Main"}),
+    ],
+    "reminders": [
+        ("resource", f"reminders://medication/pending/{PHONE}", None),
+        ("resource", f"reminders://adherence/{PHONE}", None),
+        ("tool", "create_medication_reminder", {"patient_name": PHONE, "medication": "Metformin", "dosage": "500mg",
+                                                "frequency": "daily", "times": ["08:00"], "end_date": "2026-06-01"}),
+        ("tool", "log_medication_taken", {"reminder_id": "rem-0"}),
+    ],
+    "revenue": [
+        ("resource", "analytics://revenue/comprehensive/2025-01-01/2025-12-31", None),
+        ("resource", "analytics://revenue/raw/2025-01-01/2025-12-31", None),
+        ("resource", "analytics://revenue/trend/monthly/2025-01-01/2025-12-31", None),
+        ("resource", "analytics://revenue/trend/daily/2025-01-01/2025-12-31", None),
+        ("resource", "analytics://performance/specialty/2025-01-01/2025-12-31", None),
+        ("resource", "analytics://performance/doctors/2025-01-01/2025-12-31", None),
+        ("resource", "analytics://dashboard/summary/2025-01-01/2025-12-31", None),
+    ],
+    "clinical": [
+        ("resource", "clinical://soap/all/appt-0", None),
+        ("resource", f"clinical://soap/latest/{PHONE}", None),
+        ("resource", "clinical://soap/history/appt-0", None),
+        ("resource", f"clinical://plans/active/{PHONE}", None),
+        ("resource", f"clinical://plans/history/{PHONE}", None),
+        ("resource", "clinical://plans/appointment/appt-0", None),
+        ("tool", "create_soap_note", {"patient_name": PHONE, "subjective": "pain", "objective": "swelling",
+                                      "assessment": "caries", "plan": "filling", "bp": "120/80"}),
+        ("tool", "update_soap_note", {"appointment_id": "appt-0", "note_id": "note-0", "subjective": "less pain"}),
+        ("tool", "version_soap_note", {"appointment_id": "appt-0", "note_id": "note-0",
+                                       "subjective": "s", "objective": "o"}),
+        ("tool", "create_treatment_plan", {"patient_name": PHONE, "diagnosis": "caries",
+                                           "medication_intervention": "fluoride", "lifestyle_intervention": "floss"}),
+        ("tool", "update_treatment_plan", {"plan_id": "plan-0", "status": "completed", "notes": "ok"}),
+        ("tool", "discontinue_treatment_plan", {"plan_id": "plan-0", "reason": "recovered"}),
+    ],
+    "previsit": [
+        ("resource", "previsit://all", None),
+        ("resource", "previsit://date-range/2025-01-01/2025-12-31", None),
+        ("tool", "submit_previsit_response", {"patient_name": PHONE, "responses": {"pain": "none"}}),
+    ],
+    "clinics": [
+        ("resource", "clinics://all", None),
+        ("resource", "clinics://details/clinic-0", None),
+        ("tool", "get_clinic_info", {}),
+        ("tool", "get_payment_methods", {}),
+        ("tool", "get_visit_type_fees", {}),
+    ],
+    "emergency": [
+        ("tool", "report_emergency", {"clinic_id": "clinic-0", "patient_id": "pat-0", "description": "bleeding"}),
+        ("resource", "emergency://all", None),
+        ("tool", "update_emergency_status", {"emergency_id": "em-0", "status": "resolved"}),
+    ],
+    "insurance": [
+        ("resource", "insurance://providers", None),
+        ("tool", "get_insurance_providers", {}),
+        ("tool", "check_procedure_coverage", {"procedure_id": "proc-0", "insurance_id": "ins-0"}),
+    ],
+    "inquiries": [
+        ("tool", "create_medical_inquiry", {"patient_id": "pat-0", "subject": "billing", "message": "question"}),
+        ("tool", "mark_inquiry_answered", {"inquiry_id": "inq-0", "answer_text": "done", "user_id": "user-0"}),
+        ("resource", "inquiries://list", None),
+    ],
+    "waitlist": [
+        ("tool", "join_waitlist", {"clinic_id": "clinic-0", "patient_id": "pat-0", "preferred_date": "2026-01-05"}),
+        ("resource", "waitlist://all", None),
+    ],
+    "procedures": [
+        ("tool", "get_procedure_guidelines", {"procedure_name": "cleaning"}),
+        ("tool", "search_procedures", {"name": "cleaning"}),
+        ("tool", "list_procedures", {}),
+        ("tool", "get_all_dental_procedures", {}),
+    ],
+    "communication": [
+        ("tool", "add_communication_logs", {"patient_id": "pat-0", "message": "Hello from the suite"}),
+    ],
+    "users": [
+        ("tool", "register_user", {"email": "new@example.com", "full_name": "New User", "phone": PHONE}),
+    ],
+    "system": [
+        ("tool", "check_system_health", {}),
+        ("tool", "search_staff_tools", {"query": "refill my pills"}),
+        ("resource", "system://families", None),
+        ("resource", "system://slow-calls", None),
+    ],
+}
+
+ERROR_MARKERS = ("error", "failed", "not found", "could not")
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100)))]
+
+
+def _summary(samples: List[float]) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "p99_ms": round(_percentile(samples, 99), 3),
+    }
+
+
+async def _invoke(client: Client, kind: str, target: str, args: Optional[dict]) -> str:
+    if kind == "tool":
+        result = await client.call_tool(target, args or {}, raise_on_error=False)
+        text = result.content[0].text if result.content else ""
+        return f"error: {text}" if result.is_error else text
+    contents = await client.read_resource(target)
+    return contents[0].text if contents else ""
+
+
+def _looks_like_error(text: str) -> bool:
+    head = text[:80].lower()
+    return any(marker in head for marker in ERROR_MARKERS)
+
+
+async def run_suite(iterations: int = 20, concurrency: int = 32, **fake_kwargs) -> dict:
+    fake = FakeDBOps(**fake_kwargs)
+    dbops.use_transport(fake.transport())
+
+    calls: Dict[str, dict] = {}
+    families: Dict[str, List[float]] = {}
+    async with Client(mcp) as client:
+        plan = [(family, kind, target, args) for family, entries in CALL_PLAN.items()
+                for kind, target, args in entries]
+
+        # Warm-up: imports, caches and lazy indexes
+        for _, kind, target, args in plan:
+            try:
+                await _invoke(client, kind, target, args)
+            except Exception:
+                pass
+
+        # 1. Latency (sequential, so percentiles aren't polluted by queueing)
+        for family, kind, target, args in plan:
+            samples, errors = [], 0
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                try:
+                    text = await _invoke(client, kind, target, args)
+                    errors += _looks_like_error(text)
+                except Exception:
+                    errors += 1
+                samples.append((time.perf_counter() - t0) * 1000)
+            calls[target] = {"family": family, "kind": kind, "errors": errors, **_summary(samples)}
+            families.setdefault(family, []).extend(samples)
+
+        # 2. Allocation high-water per call
+        tracemalloc.start()
+        for family, kind, target, args in plan:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            try:
+                await _invoke(client, kind, target, args)
+            except Exception:
+                pass
+            calls[target]["alloc_peak_kib"] = round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1)
+        tracemalloc.stop()
+
+        # 3. Throughput under concurrency
+        fake.reset_stats()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(kind, target, args):
+            async with semaphore:
+                try:
+                    await _invoke(client, kind, target, args)
+                except Exception:
+                    pass
+
+        work = [(kind, target, args) for _ in range(iterations) for _, kind, target, args in plan]
+        t0 = time.perf_counter()
+        await asyncio.gather(*[bounded(*w) for w in work])
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "fake_dbops": fake_kwargs,
+        },
+        "throughput": {
+            "calls": len(work),
+            "seconds": round(elapsed, 3),
+            "calls_per_s": round(len(work) / elapsed, 1),
+            "dbops_requests": sum(fake.calls.values()),
+            "dbops_max_in_flight": fake.max_in_flight,
+        },
+        "families": {f: _summary(s) for f, s in families.items()},
+        "calls": calls,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Lists calls whose p95 regressed by more than `threshold` (fraction)."""
+    regressions = []
+    for target, now in current["calls"].items():
+        before = baseline.get("calls", {}).get(target)
+        if not before or before["p95_ms"] <= 0:
+            continue
+        change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        if change > threshold:
+            regressions.append(f"{target}: p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms (+{change:.0%})")
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    print(f"\n📊 Families ({results['meta']['iterations']} iterations per call)")
+    print(f"   {'family':<14} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for family, s in results["families"].items():
+        print(f"   {family:<14} {s['count']:>6} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}")
+
+    errors = {t: c["errors"] for t, c in results["calls"].items() if c["errors"]}
+    heaviest = sorted(results["calls"].items(), key=lambda kv: kv[1]["alloc_peak_kib"], reverse=True)[:5]
+    print("\n🧠 Highest allocation peak per call:")
+    for target, c in heaviest:
+        print(f"   {c['alloc_peak_kib']:>8.1f} KiB  {target}")
+
+    t = results["throughput"]
+    print(f"\n🚀 Throughput: {t['calls_per_s']} calls/s ({t['calls']} calls, concurrency "
+          f"{results['meta']['concurrency']}, {t['dbops_requests']} DBOps requests)")
+    if errors:
+        print(f"\n⚠️  Calls returning errors: {errors}")
+
+
+def save_baseline(results: dict, path: str) -> None:
+    """Writes `results` as JSON, creating the baseline directory if needed."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def main_cli(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--list-size", type=int, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--save", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="Baseline JSON to compare p95 latencies against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed p95 regression (fraction)")
+    args = parser.parse_args(argv)
+    # Failing calls are counted in the report; keep the server's tracebacks out of it
+    logging.disable(logging.ERROR)
+    # The plan repeats identical write payloads: time the DBOps write path, not idempotent replays
+    idempotent_writes.window_s = 0
+
+    results = asyncio.run(run_suite(
+        iterations=args.iterations, concurrency=args.concurrency,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        list_size=args.list_size, error_rate=args.error_rate,
+    ))
+    print_report(results)
+
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"\n💾 Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\n❌ Regressions:\n   " + "\n   ".join(regressions))
+            return 1
+        print("\n✅ No p95 regressions beyond threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
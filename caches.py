@@ -0,0 +1,276 @@
+"""
+Cache backends.
+
+MCP_CACHE_BACKEND  "memory" (default): per-process cachetools TTL caches.
+                   "sqlite": one SQLite file in WAL mode shared by every worker
+                   process on the node, so a value fetched by one worker is
+                   served to all of them and clear() invalidates everywhere.
+MCP_CACHE_PATH     SQLite file for the shared backend (default in the temp dir).
+MCP_CACHE_BUSY_MS  How long a lookup or store waits for another worker's write
+                   lock (default 50). SQLite calls run on the event loop, so a
+                   lookup that would wait longer counts as a miss and a store
+                   is skipped; deletes and clear() still wait up to 5 s, since
+                   a lost invalidation would serve stale data.
+
+Only make_cache() caches are shared: full patient records, clinics, the
+idempotency results and read-your-writes pins. The doctor list and other reference data live in each
+process's ReferenceStore (reference_data.py), and patient lookups in each
+process's PatientRegistry (patient_registry.py); every worker fetches and
+syncs its own copy of those, whatever the backend.
+
+Both backends expose the same mapping-style surface (get / [] / in / del /
+clear / len) with per-entry TTL and maxsize, count hits and misses, and are
+registered by name so diagnostics (see health.py) can report them.
+Use `async_cached` for coroutines; cachetools' @cached would store the
+coroutine object rather than its result.
+"""
+import functools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from cachetools import Cache, LRUCache, TTLCache
+
+from fast_json import dumps, loads
+
+CACHE_BACKEND = os.getenv("MCP_CACHE_BACKEND", "memory").lower()
+CACHE_PATH = os.getenv("MCP_CACHE_PATH", os.path.join(tempfile.gettempdir(), "carebot-mcp-cache.sqlite3"))
+BUSY_MS = int(os.getenv("MCP_CACHE_BUSY_MS", "50"))
+INVALIDATE_WAIT_MS = 5000
+
+
+class _Counting:
+    """Counts lookups through `cache[key]` (used by @cached) and `cache.get(key)`."""
+
+    hits = 0
+    misses = 0
+
+    def __getitem__(self, key):
+        try:
+            value = super().__getitem__(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        self.misses += 1
+        return default
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class CountingTTLCache(_Counting, TTLCache):
+    pass
+
+
+class CountingLRUCache(_Counting, LRUCache):
+    pass
+
+
+# --- Shared SQLite backend ---
+
+_MISSING = object()
+
+# One connection per database file per process, shared by every cache namespace
+_connections: Dict[str, sqlite3.Connection] = {}
+_connections_lock = threading.Lock()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    with _connections_lock:
+        conn = _connections.get(path)
+        if conn is None:
+            conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache_entries (namespace, expires_at)")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_MS}")
+            _connections[path] = conn
+        return conn
+
+
+class SQLiteCache:
+    """
+    TTL cache stored in a node-local SQLite file (WAL: readers never block the writer).
+    Values must be JSON-serializable (DBOps payloads are). Expiry uses wall-clock
+    time so it agrees across processes. When over maxsize, the entries closest
+    to expiry (i.e. the oldest, since TTL is fixed) are evicted first.
+    """
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float, path: str = None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path or CACHE_PATH
+        self._conn = _connect(self.path)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.busy = 0      # Lookups and stores given up on another writer's lock
+
+    def _lookup(self, key: str) -> Any:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+        except sqlite3.OperationalError:   # Locked past BUSY_MS: a miss
+            self.busy += 1
+            return _MISSING
+        if row is None or row[1] <= time.time():
+            return _MISSING
+        return loads(row[0])
+
+    def get(self, key: str, default=None):
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def __setitem__(self, key: str, value) -> None:
+        now = time.time()
+        payload = dumps(value)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, payload, now + self.ttl),
+                )
+                self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                                   (self.namespace, now))
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache_entries WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.maxsize),
+                )
+        except sqlite3.OperationalError:   # Locked past BUSY_MS: not cached this time
+            self.busy += 1
+
+    def _invalidate(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        """Runs a delete, waiting up to INVALIDATE_WAIT_MS for the write lock."""
+        with self._lock:
+            self._conn.execute(f"PRAGMA busy_timeout={INVALIDATE_WAIT_MS}")
+            try:
+                return self._conn.execute(sql, params)
+            finally:
+                self._conn.execute(f"PRAGMA busy_timeout={BUSY_MS}")
+
+    def __delitem__(self, key: str) -> None:
+        cur = self._invalidate("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+        if cur.rowcount == 0:
+            raise KeyError(key)
+
+    def clear(self) -> None:
+        """Invalidates the namespace for every process sharing the file."""
+        self._invalidate("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "SELECT COUNT(*) FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+                    (self.namespace, time.time()),
+                ).fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "busy": self.busy,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+# --- Registry / factory ---
+
+# name -> cache, for diagnostics
+cache_registry: Dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Cache) -> Cache:
+    cache_registry[name] = cache
+    return cache
+
+
+def make_cache(name: str, maxsize: int, ttl: float):
+    """TTL cache on the configured backend (MCP_CACHE_BACKEND), registered under `name`."""
+    if CACHE_BACKEND == "sqlite":
+        cache = SQLiteCache(name, maxsize=maxsize, ttl=ttl)
+    else:
+        cache = CountingTTLCache(maxsize=maxsize, ttl=ttl)
+    return register_cache(name, cache)
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in cache_registry.items() if hasattr(cache, "stats")}
+
+
+def async_cached(cache, key: Callable[..., str] = None):
+    """Caches the awaited result of a coroutine function (keys are strings so every backend can store them)."""
+
+    def decorator(fn):
+        def make_key(*args, **kwargs) -> str:
+            return key(*args, **kwargs) if key else f"{fn.__name__}:{json.dumps([args, kwargs], sort_keys=True, default=str)}"
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            k = make_key(*args, **kwargs)
+            value = cache.get(k, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = await fn(*args, **kwargs)
+            cache[k] = value
+            return value
+
+        def invalidate(*args, **kwargs) -> None:
+            """Drops the cached result for these arguments."""
+            try:
+                del cache[make_key(*args, **kwargs)]
+            except KeyError:
+                pass
+
+        wrapper.cache = cache
+        wrapper.invalidate = invalidate
+        return wrapper
+
+    return decorator
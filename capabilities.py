@@ -0,0 +1,391 @@
+import asyncio
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+from pydantic import BaseModel
+
+from caches import CountingLRUCache, register_cache
+
+logger = logging.getLogger("dbops-mcp.capabilities")
+
+# --- Vocabulary ---
+
+# Words that appear in nearly every docstring ("Tool: ...", "Resource: ...")
+# and carry no routing signal.
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "our", "please", "the",
+    "this", "to", "tool", "resource", "use", "using", "want", "we", "what",
+    "who", "with", "you",
+}
+
+# Domain synonym groups. Any query term found in a group is expanded with the
+# other members (at reduced weight), so "reschedule my dentist" reaches
+# appointment/doctor tools even though those words never occur in the query.
+SYNONYM_GROUPS: List[List[str]] = [
+    ["doctor", "dr", "dentist", "physician", "staff", "provider", "specialist"],
+    ["appointment", "booking", "visit", "slot", "consultation", "see"],
+    ["book", "schedule", "reserve", "arrange"],
+    ["cancel", "remove", "drop", "off", "abort", "stop"],
+    ["availability", "available", "free", "open", "calendar", "schedule"],
+    ["date", "day", "today", "tomorrow", "monday", "tuesday", "wednesday",
+     "thursday", "friday", "saturday", "sunday", "availability"],
+    ["patient", "client", "kid", "child", "person"],
+    ["medication", "medicine", "drug", "pill", "prescription", "meds", "dose"],
+    ["prescribe", "prescription", "medication"],
+    ["discontinue", "stop", "halt", "end"],
+    ["refill", "renew", "restock"],
+    ["reminder", "remind", "notify", "notification", "alert"],
+    ["revenue", "income", "earnings", "sales", "money", "financial"],
+    ["analytics", "report", "dashboard", "statistics", "stats", "trend", "performance"],
+    ["emergency", "urgent", "critical", "sos", "collapsed", "bleeding", "fainted",
+     "accident", "injury", "unconscious"],
+    ["clinic", "branch", "location", "center"],
+    ["insurance", "coverage", "insurer", "policy"],
+    ["fee", "price", "cost", "pricing", "payment"],
+    ["procedure", "treatment", "operation", "service"],
+    ["soap", "note", "notes", "chart"],
+    ["plan", "treatment"],
+    ["phone", "number", "mobile", "whatsapp"],
+    ["inquiry", "question", "ticket", "support"],
+    ["waitlist", "waiting", "queue"],
+    ["join", "put", "enroll", "add"],
+    ["previsit", "questionnaire", "form", "intake"],
+    ["health", "status", "ping", "diagnostic", "online"],
+    ["register", "signup", "create", "new", "add", "write", "record"],
+    ["log", "message", "chat", "communication"],
+]
+
+SYNONYM_WEIGHT = 0.5
+
+# "bm25" (keyword), "semantic" (char n-gram vectors) or "hybrid" (both, rank-fused)
+SEARCH_MODE = os.getenv("CAPABILITY_SEARCH_MODE", "hybrid").lower()
+
+_CAMEL_RE = re.compile(r"([a-z0-9])([A-Z])")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    """Very light suffix stripping; enough to fold plurals and verb forms."""
+    if len(word) <= 4:
+        return word
+    for suffix, repl in (("ies", "y"), ("ing", ""), ("ed", ""), ("es", ""), ("s", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)] + repl
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases, splits snake_case/camelCase/URIs, drops stopwords and stems."""
+    text = _CAMEL_RE.sub(r"\1 \2", text).lower()
+    return [_stem(t) for t in _TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+def _build_synonym_map() -> Dict[str, List[str]]:
+    mapping: Dict[str, set] = defaultdict(set)
+    for group in SYNONYM_GROUPS:
+        stems = {_stem(w) for w in group}
+        for s in stems:
+            mapping[s] |= stems - {s}
+    return {k: sorted(v) for k, v in mapping.items()}
+
+
+SYNONYMS = _build_synonym_map()
+
+
+def expand_query(query: str) -> Dict[str, float]:
+    """Returns weighted query terms: original tokens at 1.0, synonyms at SYNONYM_WEIGHT."""
+    terms: Dict[str, float] = {}
+    for tok in tokenize(query):
+        terms[tok] = 1.0
+    for tok in list(terms):
+        for syn in SYNONYMS.get(tok, []):
+            terms.setdefault(syn, SYNONYM_WEIGHT)
+    return terms
+
+
+# --- Capability records ---
+
+class Capability(BaseModel):
+    key: str          # Tool name, resource URI or URI template
+    kind: str         # "tool" | "resource" | "template"
+    family: str       # Module family, e.g. "doctors"
+    signature: str
+    description: str
+    loaded: bool = True  # False for deferred families known only from their manifest
+
+    def summary(self) -> str:
+        """First line of the docstring without the 'Tool:'/'Resource:' prefix."""
+        first = self.description.strip().splitlines()[0] if self.description.strip() else ""
+        return re.sub(r"^\s*(tool|resource|meta-tool|diagnostic)\s*:\s*", "", first, flags=re.I)
+
+
+def _schema_type(schema: dict) -> str:
+    if "type" in schema:
+        t = schema["type"]
+        if t == "array" and "items" in schema:
+            return f"list[{_schema_type(schema['items'])}]"
+        return t if isinstance(t, str) else "|".join(t)
+    if "anyOf" in schema:
+        return "|".join(_schema_type(s) for s in schema["anyOf"])
+    return "any"
+
+
+def _tool_signature(name: str, parameters: dict) -> str:
+    props = parameters.get("properties", {})
+    required = set(parameters.get("required", []))
+    args = []
+    for pname, pschema in props.items():
+        arg = f"{pname}: {_schema_type(pschema)}"
+        if pname not in required:
+            arg += f" = {pschema.get('default')!r}"
+        args.append(arg)
+    return f"{name}({', '.join(args)})"
+
+
+def family_of(component) -> str:
+    """Plugin family name (see plugins.FAMILIES); main.py's own tools are 'system'."""
+    from plugins import family_of_module
+    module = getattr(getattr(component, "fn", None), "__module__", "") or ""
+    return family_of_module(module) or "system"
+
+
+async def collect_capabilities(server) -> List[Capability]:
+    """Snapshots every registered tool, resource and resource template on `server`."""
+    tools = await server.get_tools()
+    resources = await server.get_resources()
+    templates = await server.get_resource_templates()
+
+    caps = [
+        Capability(key=key, kind="tool", family=family_of(t),
+                   signature=_tool_signature(key, t.parameters or {}),
+                   description=t.description or "")
+        for key, t in tools.items() if t.enabled
+    ]
+    caps += [
+        Capability(key=key, kind="resource", family=family_of(r),
+                   signature=key, description=r.description or "")
+        for key, r in resources.items() if r.enabled
+    ]
+    caps += [
+        Capability(key=key, kind="template", family=family_of(t),
+                   signature=key, description=t.description or "")
+        for key, t in templates.items() if t.enabled
+    ]
+    # Local import: plugins imports this module for the Capability model
+    from plugins import deferred_capabilities
+    caps += deferred_capabilities()
+    return caps
+
+
+def _document_tokens(cap: Capability) -> List[str]:
+    """Name tokens are repeated so identifiers outrank incidental docstring words."""
+    name_tokens = tokenize(cap.key)
+    return (name_tokens * 3) + tokenize(cap.family) + tokenize(cap.signature) + tokenize(cap.description)
+
+
+def _with_synonyms(tokens: List[str]) -> str:
+    """Flattens tokens plus their synonyms into one string for n-gram vectorizing."""
+    words = list(tokens)
+    for tok in tokens:
+        words.extend(SYNONYMS.get(tok, []))
+    return " ".join(words)
+
+
+# --- BM25 ---
+
+class BM25Index:
+    """Okapi BM25 over pre-tokenized documents, stored as an inverted index."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_len: List[int] = []
+        self.avg_len = 0.0
+
+    def build(self, docs: List[List[str]]) -> None:
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for i, doc in enumerate(docs):
+            for term, tf in Counter(doc).items():
+                postings[term].append((i, tf))
+        n = len(docs)
+        self.postings = dict(postings)
+        self.doc_len = [len(d) for d in docs]
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for t, p in self.postings.items()
+        }
+
+    def score(self, terms: Dict[str, float]) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in terms.items():
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc] / self.avg_len)
+                scores[doc] += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+# --- Semantic (character n-gram TF-IDF) ---
+
+class SemanticIndex:
+    """
+    Offline paraphrase-tolerant retrieval. Every document becomes an L2-normalized
+    TF-IDF vector over character n-grams, stacked into a dense NumPy matrix at
+    build time, so a query costs one vectorization plus one matrix-vector product.
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (3, 5)):
+        self.ngram_range = ngram_range
+        self.vocab: Dict[str, int] = {}
+        self.idf = None
+        self.matrix = None
+
+    def _ngrams(self, text: str) -> Counter:
+        lo, hi = self.ngram_range
+        grams: Counter = Counter()
+        for word in text.split():
+            padded = f" {word} "
+            for n in range(lo, hi + 1):
+                for i in range(len(padded) - n + 1):
+                    grams[padded[i:i + n]] += 1
+        return grams
+
+    def build(self, texts: List[str]) -> None:
+        # Local import: NumPy is only needed once the semantic mode is used
+        import numpy as np
+
+        doc_grams = [self._ngrams(t) for t in texts]
+        vocab: Dict[str, int] = {}
+        for grams in doc_grams:
+            for g in grams:
+                vocab.setdefault(g, len(vocab))
+
+        tf = np.zeros((len(texts), len(vocab)), dtype=np.float32)
+        for row, grams in enumerate(doc_grams):
+            for g, count in grams.items():
+                tf[row, vocab[g]] = 1.0 + math.log(count)
+
+        df = np.count_nonzero(tf, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1.0).astype(np.float32)
+        matrix = tf * self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.maximum(norms, 1e-9)
+        self.vocab = vocab
+
+    def query_vector(self, text: str):
+        import numpy as np
+
+        vec = np.zeros(len(self.vocab), dtype=np.float32)
+        for g, count in self._ngrams(text).items():
+            col = self.vocab.get(g)
+            if col is not None:
+                vec[col] = (1.0 + math.log(count)) * self.idf[col]
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def score(self, text: str, top_k: int) -> List[Tuple[int, float]]:
+        import numpy as np
+
+        if self.matrix is None or not len(self.matrix):
+            return []
+        sims = self.matrix @ self.query_vector(text)
+        k = min(top_k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(int(i), float(sims[i])) for i in top if sims[i] > 0]
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> Dict[int, float]:
+    """Merges ranked doc-id lists without having to calibrate their raw scores."""
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            fused[doc] += 1.0 / (k + rank + 1)
+    return fused
+
+
+class CapabilityIndex:
+    """
+    Searchable catalog of everything registered on the MCP server.
+    Rebuilt whenever the server's `registry_version` moves.
+    """
+
+    def __init__(self):
+        self.capabilities: List[Capability] = []
+        self.version: Optional[int] = None
+        self._bm25 = BM25Index()
+        self._semantic = SemanticIndex()
+        self._semantic_docs: Optional[List[str]] = None   # Not yet vectorized (built on first semantic search)
+        self._lock = asyncio.Lock()
+        # Query results for the current registry version; cleared on rebuild
+        self._results: LRUCache = register_cache("capability_search", CountingLRUCache(maxsize=512))
+
+    async def refresh(self, server) -> bool:
+        """Rebuilds the index if registrations changed. Returns True if rebuilt."""
+        if self.version == server.registry_version:
+            return False
+        async with self._lock:
+            version = server.registry_version
+            if self.version == version:
+                return False
+            caps = await collect_capabilities(server)
+            docs = [_document_tokens(c) for c in caps]
+            self._bm25.build(docs)
+            self._semantic_docs = [_with_synonyms(d) for d in docs]
+            if SEARCH_MODE != "bm25":
+                self._semantic_index()
+            self.capabilities = caps
+            self._results.clear()
+            self.version = version
+            logger.info("Capability index built: %s entries (registry v%s)", len(caps), version)
+            return True
+
+    def search(self, query: str, top_k: int = 5, mode: Optional[str] = None) -> List[Tuple[Capability, float]]:
+        mode = (mode or SEARCH_MODE).lower()
+        cache_key = (" ".join(query.lower().split()), top_k, mode)
+        hit = self._results.get(cache_key)
+        if hit is not None:
+            return hit
+
+        if mode == "bm25":
+            ranked = self._search_bm25(query, top_k)
+        elif mode == "semantic":
+            ranked = self._semantic_index().score(_with_synonyms(tokenize(query)), top_k)
+        else:
+            # Over-fetch from both retrievers so fusion has candidates to reorder
+            depth = max(top_k * 3, 10)
+            bm25 = [i for i, _ in self._search_bm25(query, depth)]
+            semantic = [i for i, _ in self._semantic_index().score(_with_synonyms(tokenize(query)), depth)]
+            fused = reciprocal_rank_fusion([bm25, semantic])
+            ranked = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+
+        results = [(self.capabilities[i], s) for i, s in ranked]
+        self._results[cache_key] = results
+        return results
+
+    def _semantic_index(self) -> SemanticIndex:
+        """The semantic index of the current capabilities, vectorized (and NumPy imported) on first use."""
+        if self._semantic_docs is not None:
+            self._semantic.build(self._semantic_docs)
+            self._semantic_docs = None
+        return self._semantic
+
+    def _search_bm25(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        scores = self._bm25.score(expand_query(query))
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+        return [(i, s) for i, s in ranked if s > 0]
+
+
+# Global instance
+capability_index = CapabilityIndex()
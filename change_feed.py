@@ -0,0 +1,257 @@
+"""
+DBOps change feed: precise cache invalidation instead of waiting for TTLs.
+
+Events arrive on the POST /events/dbops webhook and, optionally, from a DBOps
+server-sent event stream that every replica subscribes to. An event looks like
+
+    {"id": "evt-42", "entity": "clinic", "op": "updated", "entity_id": "clinic-3", "data": {...}}
+
+(or a JSON list of them). Reference data lists (see reference_data.py) are
+patched in place when the event carries the record, and re-fetched in the
+background otherwise. Other caches register a handler for their entity with
+`@on_change("patient")`. Event ids are remembered for a while, so redelivered
+events are applied once.
+
+MCP_CHANGE_FEED_SECRET  Shared secret. The webhook then requires
+                        `X-DBOps-Signature: sha256=<hex HMAC of the body>` and
+                        rejects anything else. Without it, the webhook only
+                        accepts loopback clients (403 otherwise) and their events
+                        only invalidate: the `data` field is ignored, and handlers
+                        prefer cheap re-reads (one record, or an incremental sync)
+                        over full refetches.
+MCP_CHANGE_FEED_STREAM  DBOps SSE endpoint to subscribe to (e.g. "/events/stream").
+                        Unset (default) = webhook only. After an unclean disconnect
+                        every subscribed cache is dropped, since events may have
+                        been missed; a clean end resumes from Last-Event-ID.
+"""
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from cachetools import TTLCache
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger("dbops-mcp.change-feed")
+
+FEED_SECRET = os.getenv("MCP_CHANGE_FEED_SECRET", "")
+STREAM_ENDPOINT = os.getenv("MCP_CHANGE_FEED_STREAM", "")
+STREAM_RECONNECT_S = 1.0
+MAX_BACKOFF_S = 30.0
+
+# DBOps entity -> reference_data entry holding the list of those records
+REFERENCE_ENTITIES = {
+    "doctor": "doctors",
+    "clinic": "clinics",
+    "procedure": "procedures",
+    "insurance_provider": "insurance_providers",
+    "payment_method": "payment_methods",
+    "visit_fee": "visit_fees",
+}
+OPS = ("created", "updated", "deleted")
+
+
+def _loopback(request: Request) -> bool:
+    host = request.client.host if request.client else ""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class ChangeEvent:
+    def __init__(self, entity: str, op: str, entity_id: Optional[str] = None, data: Optional[dict] = None,
+                 event_id: Optional[str] = None, trusted: bool = True):
+        self.entity = entity
+        self.op = op
+        self.entity_id = entity_id
+        self.data = data
+        self.event_id = event_id
+        self.trusted = trusted     # Signed webhook or our own stream; handlers may act on it, not just re-read
+
+    @classmethod
+    def parse(cls, raw: dict, trusted: bool) -> "ChangeEvent":
+        if not isinstance(raw, dict) or not raw.get("entity") or raw.get("op") not in OPS:
+            raise ValueError(f"Not a change event: {raw!r:.200}")
+        data = raw.get("data") if trusted and isinstance(raw.get("data"), dict) else None
+        entity_id = raw.get("entity_id") or (data or {}).get("id")
+        return cls(str(raw["entity"]), raw["op"], str(entity_id) if entity_id is not None else None,
+                   data, str(raw["id"]) if raw.get("id") is not None else None, trusted)
+
+
+class ChangeFeed:
+    def __init__(self):
+        self.handlers: Dict[str, List[Callable[[ChangeEvent], None]]] = {}
+        self.seen: TTLCache = TTLCache(maxsize=20000, ttl=3600)
+        self.last_event_id: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stream_endpoint: Optional[str] = None
+        self.stream_connected = False
+        self.received = 0
+        self.applied = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.gaps = 0
+        self.last_event_at: Optional[float] = None
+
+    def on_change(self, entity: str):
+        """Decorator: registers `fn(event)` for changes to `entity` (entity_id None = anything may have changed)."""
+        def decorator(fn):
+            self.handlers.setdefault(entity, []).append(fn)
+            return fn
+        return decorator
+
+    # --- Applying events ---
+
+    def apply(self, event: ChangeEvent) -> bool:
+        """Applies one event. Returns False for an already seen event id."""
+        self.received += 1
+        if event.event_id is not None:
+            if event.event_id in self.seen:
+                self.duplicates += 1
+                return False
+            self.seen[event.event_id] = True
+            self.last_event_id = event.event_id
+        self.last_event_at = time.time()
+
+        reference = REFERENCE_ENTITIES.get(event.entity)
+        if reference is not None:
+            from reference_data import reference_store
+            reference_store.apply_change(reference, event.op, event.entity_id, event.data)
+        for handler in self.handlers.get(event.entity, []):
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error("Change handler %s failed for %s %s: %s", handler.__name__, event.entity, event.op, e)
+        self.applied += 1
+        return True
+
+    def invalidate_all(self) -> None:
+        """Events may have been missed: drop everything the feed keeps fresh."""
+        from reference_data import reference_store
+        self.gaps += 1
+        for name in set(REFERENCE_ENTITIES.values()):
+            reference_store.invalidate(name)
+        for entity, handlers in self.handlers.items():
+            for handler in handlers:
+                try:
+                    handler(ChangeEvent(entity, "updated"))
+                except Exception as e:
+                    logger.error("Change handler %s failed to invalidate %s: %s", handler.__name__, entity, e)
+        logger.warning("Change feed gap: dropped all feed-managed cache entries")
+
+    # --- Webhook ---
+
+    async def webhook(self, request: Request) -> JSONResponse:
+        body = await request.body()
+        trusted = False
+        if FEED_SECRET:
+            signature = request.headers.get("x-dbops-signature", "")
+            if not hmac.compare_digest(signature, sign(body, FEED_SECRET)):
+                self.rejected += 1
+                return JSONResponse({"error": "bad signature"}, status_code=401)
+            trusted = True
+        elif not _loopback(request):
+            self.rejected += 1
+            return JSONResponse({"error": "unsigned events are only accepted from localhost"}, status_code=403)
+        try:
+            payload = json.loads(body)
+            events = [ChangeEvent.parse(raw, trusted) for raw in (payload if isinstance(payload, list) else [payload])]
+        except ValueError as e:
+            self.rejected += 1
+            return JSONResponse({"error": str(e)}, status_code=400)
+        applied = sum(self.apply(event) for event in events)
+        return JSONResponse({"applied": applied, "duplicates": len(events) - applied})
+
+    # --- Stream subscription ---
+
+    def start(self, endpoint: Optional[str] = None) -> None:
+        self.stream_endpoint = endpoint or STREAM_ENDPOINT
+        if self.stream_endpoint and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._consume(self.stream_endpoint))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _consume(self, endpoint: str) -> None:
+        from dependencies import dbops
+        backoff = STREAM_RECONNECT_S
+        connected_before = False
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if self.last_event_id:
+                headers["Last-Event-ID"] = self.last_event_id
+            try:
+                async with dbops.stream(endpoint, headers=headers) as response:
+                    response.raise_for_status()
+                    self.stream_connected = True
+                    connected_before = True
+                    backoff = STREAM_RECONNECT_S
+                    await self._read_events(response)
+                self.stream_connected = False
+                await asyncio.sleep(STREAM_RECONNECT_S)  # Clean end: resume from Last-Event-ID
+            except asyncio.CancelledError:
+                self.stream_connected = False
+                raise
+            except Exception as e:
+                self.stream_connected = False
+                logger.warning("Change stream %s failed: %s (retrying in %.0fs)", endpoint, e, backoff)
+                if connected_before:
+                    self.invalidate_all()
+                    connected_before = False
+                await asyncio.sleep(backoff)
+                backoff = min(MAX_BACKOFF_S, backoff * 2)
+
+    async def _read_events(self, response) -> None:
+        event_id, data = None, []
+        async for line in response.aiter_lines():
+            if line.startswith("id:"):
+                event_id = line[3:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif not line and data:
+                try:
+                    raw = json.loads("\n".join(data))
+                    if isinstance(raw, dict):
+                        raw.setdefault("id", event_id)
+                    # The stream is our own authenticated DBOps connection
+                    self.apply(ChangeEvent.parse(raw, trusted=True))
+                except ValueError as e:
+                    self.rejected += 1
+                    logger.warning("Ignoring malformed change event: %s", e)
+                event_id, data = None, []
+
+    def stats(self) -> dict:
+        return {
+            "webhook_signed": bool(FEED_SECRET),
+            "stream": self.stream_endpoint,
+            "stream_connected": self.stream_connected,
+            "received": self.received,
+            "applied": self.applied,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "gaps": self.gaps,
+            "last_event_id": self.last_event_id,
+            "last_event_at": round(self.last_event_at, 3) if self.last_event_at else None,
+        }
+
+
+# Global instance
+change_feed = ChangeFeed()
+on_change = change_feed.on_change
@@ -1,14 +1,22 @@
 import os
+import time
 import httpx
 import logging
 from dotenv import load_dotenv
+from fast_json import loads
+from idempotency import idempotent_writes
+from read_routing import READ_URLS, ReadRouter, Replica
+from tracing import TracingTransport
 
 load_dotenv()
 logger = logging.getLogger("dbops-mcp.dependencies")
 
+_MISSING = object()
+
 class DBOpsClient:
-    def __init__(self):
-        self.base_url = os.getenv("DB_OPS_URL", "http://localhost:3000").rstrip('/')
+    def __init__(self, transport: httpx.AsyncBaseTransport = None, base_url: str = None, read_urls: list = None):
+        # DB_OPS_URL is the primary deployment; regional shards pass their own (see sharding.py)
+        self.base_url = (base_url or os.getenv("DB_OPS_URL", "http://localhost:3000")).rstrip('/')
         self.token = os.getenv("ADMIN_ACCESS_TOKEN")
         
         # 1. Persistent Headers
@@ -20,44 +28,149 @@ class DBOpsClient:
         
         # 2. Optimized Client (Shared across all requests)
         # We use a long-lived client with a connection pool
-        self._client = httpx.AsyncClient(
-            base_url=self.base_url,
-            headers=self.headers,
+        self._client = self._build_client(transport)
+
+        # 3. Optional read replicas for GETs, one pool each (see read_routing.py).
+        # DB_OPS_READ_URLS belongs to the primary deployment, not to regional shards.
+        self.reads = ReadRouter()
+        if read_urls is None:
+            read_urls = READ_URLS if base_url is None else []
+        for url in read_urls:
+            self.add_read_replica(url)
+
+    def _build_client(self, transport: httpx.AsyncBaseTransport = None, base_url: str = None) -> httpx.AsyncClient:
+        if transport is None:
             # Limits: Keep up to 20 idle connections open for reuse
-            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=50, max_keepalive_connections=20))
+        return httpx.AsyncClient(
+            base_url=(base_url or self.base_url).rstrip('/'),
+            headers=self.headers,
+            # Per-request DBOps spans + traceparent header (pass-through when no span is active)
+            transport=TracingTransport(transport),
             # Timeout: Fail fast if DBOps is struggling
             timeout=httpx.Timeout(15.0, connect=5.0)
         )
 
+    def add_read_replica(self, url: str, transport: httpx.AsyncBaseTransport = None):
+        """Adds a read replica with its own connection pool."""
+        self.reads.replicas.append(Replica(url, self._build_client(transport, base_url=url)))
+
     async def get(self, endpoint: str, params=None):
-        """High-efficiency GET using pooled connections."""
+        """High-efficiency GET using pooled connections (a read replica when configured)."""
+        replica = self.reads.pick(endpoint, params)
+        if replica is not None:
+            data = await self._replica_get(replica, endpoint, params)
+            if data is not _MISSING:
+                return data
         try:
             res = await self._client.get(endpoint, params=params)
             res.raise_for_status()
-            return res.json()
+            return loads(res.content)
         except httpx.HTTPStatusError as e:
-            logger.error(f"DBOps GET Error: {e.response.status_code} at {endpoint}")
+            logger.error("DBOps GET Error: %s at %s", e.response.status_code, endpoint)
             raise
 
-    async def post(self, endpoint: str, data: dict):
-        """High-efficiency POST using pooled connections."""
+    async def _replica_get(self, replica: Replica, endpoint: str, params=None):
+        """GET from a read replica; _MISSING when the primary should answer instead."""
+        replica.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            res = await replica.client.get(endpoint, params=params)
+        except httpx.TransportError as e:
+            res, error = None, f"{type(e).__name__}: {e}"
+        finally:
+            replica.in_flight -= 1
+        if res is not None and res.status_code < 500:
+            self.reads.record(replica, True, (time.perf_counter() - t0) * 1000)
+            if res.status_code != 404:  # Not found may just be replication lag
+                try:
+                    res.raise_for_status()
+                except httpx.HTTPStatusError as e:
+                    logger.error("DBOps GET Error: %s at %s (replica %s)", e.response.status_code, endpoint, replica.url)
+                    raise
+                return loads(res.content)
+        else:
+            self.reads.record(replica, False, 0.0)
+            logger.warning("Read replica %s failed at %s: %s", replica.url, endpoint,
+                           error if res is None else f"HTTP {res.status_code}")
+        self.reads.fallbacks += 1
+        return _MISSING
+
+    async def post(self, endpoint: str, data: dict, idempotency_key: str = None):
+        """
+        High-efficiency POST using pooled connections.
+        Writes are idempotent (see idempotency.py): repeats of the same write share
+        one DBOps request and its response.
+        """
+        self.reads.note_write(endpoint, data)
+        if not idempotent_writes.enabled:
+            result = await self._post(endpoint, data)
+        else:
+            key = idempotency_key or idempotent_writes.key_for("POST", endpoint, data)
+            result = await idempotent_writes.run(key, lambda: self._post(endpoint, data, {"Idempotency-Key": key}))
+        self.reads.note_write(endpoint, data, result)  # Pin from completion (and a new patient's id)
+        return result
+
+    async def _post(self, endpoint: str, data: dict, headers: dict = None):
         try:
-            res = await self._client.post(endpoint, json=data)
+            res = await self._client.post(endpoint, json=data, headers=headers)
             res.raise_for_status()
-            return res.json()
+            return loads(res.content)
         except httpx.HTTPStatusError as e:
-            logger.error(f"DBOps POST Error: {e.response.status_code} at {endpoint}")
+            logger.error("DBOps POST Error: %s at %s", e.response.status_code, endpoint)
             raise
 
     # Added PUT and DELETE for complete medication management
     async def put(self, endpoint: str, data: dict):
+        self.reads.note_write(endpoint, data)
         res = await self._client.put(endpoint, json=data)
         res.raise_for_status()
-        return res.json()
+        self.reads.note_write(endpoint, data)
+        return loads(res.content)
+
+    async def patch(self, endpoint: str, data: dict):
+        """PATCH (cancellations, adherence logs, inquiry answers)."""
+        self.reads.note_write(endpoint, data)
+        res = await self._client.patch(endpoint, json=data)
+        res.raise_for_status()
+        self.reads.note_write(endpoint, data)
+        return loads(res.content)
+
+    def stream(self, endpoint: str, headers: dict = None):
+        """Long-lived streaming GET (e.g. an event stream); no read timeout. Use as `async with`."""
+        return self._client.stream("GET", endpoint, headers=headers, timeout=httpx.Timeout(None, connect=5.0))
+
+    async def ping(self, endpoint: str, timeout: float = 2.0) -> int:
+        """Cheap reachability check: returns the HTTP status without parsing the body."""
+        res = await self._client.get(endpoint, timeout=timeout)
+        return res.status_code
+
+    def pool_stats(self) -> dict:
+        """Connection pool usage (httpcore keeps these private, so read defensively)."""
+        transport = getattr(self._client, "_transport", None)
+        pool = getattr(getattr(transport, "inner", transport), "_pool", None)
+        if pool is None:
+            return {"available": False}
+        connections = list(pool.connections)
+        busy = sum(1 for c in connections if not c.is_idle())
+        return {
+            "available": True,
+            "max_connections": pool._max_connections,
+            "open_connections": len(connections),
+            "busy_connections": busy,
+            "idle_connections": len(connections) - busy,
+            "queued_requests": sum(1 for r in pool._requests if r.connection is None),
+        }
+
+    def use_transport(self, transport: httpx.AsyncBaseTransport):
+        """Swaps the underlying transport (e.g. an in-process DBOps stand-in for benchmarks)."""
+        self._client = self._build_client(transport)
 
     async def close(self):
-        """Gracefully shut down the connection pool."""
+        """Gracefully shut down the connection pools."""
         await self._client.aclose()
+        for replica in self.reads.replicas:
+            await replica.client.aclose()
 
 # Global instance
 dbops = DBOpsClient()
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Fast JSON for DBOps payloads.
+
+`loads()` / `dumps()` use orjson when it is installed and fall back to the
+standard library otherwise, so the speed-up is optional and the results are
+the same. orjson decodes list-heavy DBOps responses (registries, schedules,
+analytics rows) several times faster than `json`. `dumps()` returns compact
+text like `json.dumps(obj, separators=(",", ":"), ensure_ascii=False)`, so
+non-ASCII names come out as UTF-8 text on either backend. Values orjson cannot
+encode (e.g. integers wider than 64 bits) are handed to the standard library.
+
+MCP_JSON_BACKEND  "auto" (default) = orjson if importable; "stdlib" = always json.
+"""
+import json
+import os
+from typing import Any
+
+BACKEND = "stdlib"
+if os.getenv("MCP_JSON_BACKEND", "auto").lower() != "stdlib":
+    try:
+        import orjson
+        BACKEND = "orjson"
+    except ImportError:
+        pass
+
+if BACKEND == "orjson":
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Any) -> Any:
+        """Decodes str or bytes (e.g. `response.content`, no text decoding step)."""
+        return orjson.loads(data)
+
+    def dumps(obj: Any, sort_keys: bool = False) -> str:
+        try:
+            return orjson.dumps(obj, option=_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _OPTIONS).decode()
+        except TypeError:
+            return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False)
+else:
+    def loads(data: Any) -> Any:
+        """Decodes str or bytes (e.g. `response.content`, no text decoding step)."""
+        return json.loads(data)
+
+    def dumps(obj: Any, sort_keys: bool = False) -> str:
+        return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False)
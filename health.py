@@ -0,0 +1,199 @@
+"""
+Background health monitor.
+
+Pings a lightweight DBOps endpoint on an interval and keeps a rolling status,
+so probes (check_system_health, /livez, /readyz) are answered from memory
+instead of hitting DBOps on every orchestrator check.
+
+DBOPS_HEALTH_ENDPOINT  Endpoint to ping (default "/health"). Any non-5xx answer
+                       means DBOps is reachable; the body is never parsed.
+MCP_HEALTH_INTERVAL_S  Seconds between pings (default 15).
+MCP_HEALTH_FAILURES    Consecutive failed pings that open the DBOps breaker and
+                       fail readiness (default 3).
+"""
+import asyncio
+import logging
+import os
+import statistics
+import time
+from collections import deque
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from admission import admission
+from caches import cache_stats
+from change_feed import change_feed
+from idempotency import idempotent_writes
+from logging_setup import log_stats
+from write_behind import communication_logs
+
+logger = logging.getLogger("dbops-mcp.health")
+
+HEALTH_ENDPOINT = os.getenv("DBOPS_HEALTH_ENDPOINT", "/health")
+HEALTH_INTERVAL_S = float(os.getenv("MCP_HEALTH_INTERVAL_S", "15"))
+FAILURE_THRESHOLD = int(os.getenv("MCP_HEALTH_FAILURES", "3"))
+LAG_INTERVAL_S = 0.5
+
+
+class ProbeResult:
+    def __init__(self, ok: bool, latency_ms: float, status: Optional[int] = None, error: Optional[str] = None):
+        self.ok = ok
+        self.latency_ms = latency_ms
+        self.status = status
+        self.error = error
+        self.at = time.time()
+
+
+class HealthMonitor:
+    def __init__(self, window: int = 20):
+        self.started_at = time.time()
+        self.probes: deque = deque(maxlen=window)
+        self.lag_ms: deque = deque(maxlen=120)
+        self.consecutive_failures = 0
+        # closed: DBOps answering. open: FAILURE_THRESHOLD pings failed in a row.
+        # half_open: first successful ping after being open.
+        self.breaker = "closed"
+        self.breaker_changed_at = self.started_at
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Background loop ---
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        await asyncio.gather(self._probe_loop(), self._lag_loop())
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(HEALTH_INTERVAL_S)
+
+    async def _lag_loop(self) -> None:
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL_S)
+            self.lag_ms.append(max(0.0, (time.perf_counter() - t0 - LAG_INTERVAL_S) * 1000))
+
+    @property
+    def alive(self) -> bool:
+        """False only if the background loop died with an error."""
+        return not (self._task and self._task.done() and not self._task.cancelled())
+
+    # --- Probing ---
+
+    async def probe(self) -> ProbeResult:
+        from dependencies import dbops
+        t0 = time.perf_counter()
+        try:
+            status = await dbops.ping(HEALTH_ENDPOINT)
+            result = ProbeResult(status < 500, (time.perf_counter() - t0) * 1000, status=status,
+                                 error=None if status < 500 else f"HTTP {status}")
+        except Exception as e:
+            result = ProbeResult(False, (time.perf_counter() - t0) * 1000, error=f"{type(e).__name__}: {e}")
+        self._record(result)
+        return result
+
+    def _record(self, result: ProbeResult) -> None:
+        self.probes.append(result)
+        previous = self.breaker
+        if result.ok:
+            self.consecutive_failures = 0
+            self.breaker = "half_open" if previous == "open" else "closed"
+        else:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURE_THRESHOLD:
+                self.breaker = "open"
+            logger.warning("DBOps health ping failed (%sx): %s", self.consecutive_failures, result.error)
+        if self.breaker != previous:
+            self.breaker_changed_at = result.at
+            logger.info("DBOps breaker %s -> %s", previous, self.breaker)
+
+    # --- Reporting ---
+
+    @property
+    def last(self) -> Optional[ProbeResult]:
+        return self.probes[-1] if self.probes else None
+
+    @property
+    def ready(self) -> bool:
+        return self.last is not None and self.breaker != "open"
+
+    def status(self) -> str:
+        if self.last is None:
+            return "starting"
+        if self.breaker == "open":
+            return "unavailable"
+        if self.breaker == "half_open" or self.consecutive_failures:
+            return "degraded"
+        return "ok"
+
+    def snapshot(self) -> dict:
+        from dependencies import dbops
+        from sharding import shard_router
+        last = self.last
+        window = list(self.probes)
+        latencies = [p.latency_ms for p in window if p.ok]
+        lags = list(self.lag_ms)
+        return {
+            "status": self.status(),
+            "ready": self.ready,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "dbops": {
+                "endpoint": HEALTH_ENDPOINT,
+                "reachable": bool(last and last.ok),
+                "last_checked": round(last.at, 3) if last else None,
+                "last_status": last.status if last else None,
+                "last_latency_ms": round(last.latency_ms, 2) if last else None,
+                "last_error": last.error if last else None,
+                "consecutive_failures": self.consecutive_failures,
+                "window_probes": len(window),
+                "window_success_rate": round(sum(p.ok for p in window) / len(window), 3) if window else None,
+                "window_p50_latency_ms": round(statistics.median(latencies), 2) if latencies else None,
+            },
+            "breaker": {"state": self.breaker, "since": round(self.breaker_changed_at, 3),
+                        "failure_threshold": FAILURE_THRESHOLD},
+            "pool": dbops.pool_stats(),
+            "read_replicas": dbops.reads.stats() if dbops.reads.replicas else None,
+            "sharding": shard_router.stats() if shard_router.sharded else None,
+            "admission": admission.stats(),
+            "idempotency": idempotent_writes.stats(),
+            "communication_logs": communication_logs.stats(),
+            "caches": cache_stats(),
+            "change_feed": change_feed.stats(),
+            "logging": log_stats(),
+            "event_loop": {
+                "lag_ms_last": round(lags[-1], 2) if lags else None,
+                "lag_ms_avg": round(statistics.fmean(lags), 2) if lags else None,
+                "lag_ms_max": round(max(lags), 2) if lags else None,
+            },
+        }
+
+
+# Global instance
+health_monitor = HealthMonitor()
+
+
+# --- Kubernetes probes ---
+
+async def livez(request: Request) -> JSONResponse:
+    """Liveness: the event loop answers and the monitor has not crashed."""
+    alive = health_monitor.alive
+    return JSONResponse({"status": "alive" if alive else "monitor_failed"}, status_code=200 if alive else 503)
+
+
+async def readyz(request: Request) -> JSONResponse:
+    """Readiness: DBOps answered the latest ping and the breaker is not open."""
+    return JSONResponse(health_monitor.snapshot(), status_code=200 if health_monitor.ready else 503)
@@ -0,0 +1,115 @@
+"""
+Idempotent DBOps writes.
+
+Every POST to DBOps carries an idempotency key. If the client supplied one for
+the tool call (`_meta.idempotencyKey` on tools/call, or an `Idempotency-Key`
+HTTP header), it is combined with the endpoint and the JSON body, so a key
+reused for a different write (or several writes of one tool call) never
+replays another write's response. Otherwise the key is a hash of the endpoint
+and the JSON body, so an agent re-issuing the same write after a slow
+response is recognised. The key is forwarded to DBOps as the
+`Idempotency-Key` header. Then:
+
+- concurrent POSTs with the same key share one upstream request;
+- a repeat within the window replays the stored response instead of writing again.
+
+Failed writes are not stored, so a retry after an error reaches DBOps.
+Responses are kept in the "idempotency" cache (MCP_CACHE_BACKEND), so with the
+sqlite backend a repeat is replayed whichever worker receives it.
+
+MCP_IDEMPOTENCY_WINDOW_S  Replay window in seconds (default 120, 0 = off).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from caches import make_cache
+
+logger = logging.getLogger("dbops-mcp.idempotency")
+
+WINDOW_S = float(os.getenv("MCP_IDEMPOTENCY_WINDOW_S", "120"))
+
+# Key supplied by the client for the current tool call, if any
+client_key: ContextVar[Optional[str]] = ContextVar("idempotency_client_key", default=None)
+
+_MISSING = object()
+
+
+def digest(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+
+class IdempotentWrites:
+    def __init__(self, window_s: float = WINDOW_S):
+        self.window_s = window_s
+        self.results = make_cache("idempotency", maxsize=5000, ttl=max(window_s, 1))
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.replayed = 0
+        self.collapsed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_s > 0
+
+    def key_for(self, method: str, endpoint: str, data) -> str:
+        body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+        supplied = client_key.get()
+        if supplied:
+            return digest("client", supplied, method, endpoint, body)
+        return digest(method, endpoint, body)
+
+    async def run(self, key: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs `send` at most once per key and window; repeats get the same response."""
+        stored = self.results.get(key, _MISSING)
+        if stored is not _MISSING:
+            self.replayed += 1
+            logger.info("Replayed idempotent write %s", key[:12])
+            return stored
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(send())
+        self.in_flight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Future) -> None:
+        self.in_flight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.results[key] = task.result()
+
+    def stats(self) -> dict:
+        return {"window_s": self.window_s, "in_flight": len(self.in_flight),
+                "replayed": self.replayed, "collapsed": self.collapsed}
+
+
+# Global instance
+idempotent_writes = IdempotentWrites()
+
+
+class IdempotencyMiddleware(Middleware):
+    """Makes a client-supplied idempotency key visible to the DBOps writes of a tool call."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        supplied = None
+        ctx = context.fastmcp_context
+        request_context = getattr(ctx, "request_context", None) if ctx is not None else None
+        meta = getattr(request_context, "meta", None)
+        if meta is not None:
+            supplied = getattr(meta, "idempotencyKey", None)
+        supplied = supplied or get_http_headers().get("idempotency-key")
+        if not supplied:
+            return await call_next(context)
+        token = client_key.set(str(supplied))
+        try:
+            return await call_next(context)
+        finally:
+            client_key.reset(token)
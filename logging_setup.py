@@ -0,0 +1,200 @@
+"""
+Non-blocking logging pipeline.
+
+Records are put on a bounded in-memory queue by the calling coroutine and
+formatted / written by a background thread (QueueHandler -> QueueListener), so
+log I/O never stalls the event loop. On the calling side a record only gets
+its request / trace IDs attached. Its `%`-style arguments are merged there
+too (so a mutable argument changed after the call is logged as it was),
+unless they are all immutable values or `Deferred` objects: those are
+rendered, with the JSON line and any traceback, in the listener thread.
+
+LOG_LEVEL    Root level (default INFO).
+LOG_FORMAT   "json" (default, one object per line) or "text".
+LOG_SAMPLE   Per-logger sampling for INFO and below, e.g.
+             "dbops-mcp.clinics=0.1,dbops-mcp.procedures=0.25". Warnings and
+             errors are never sampled out.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else came from `extra=` and is emitted as a field
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_CONTEXT_ATTRS = ("request_id", "trace_id", "span_id")
+
+
+class Deferred:
+    """A log argument that no longer changes once logged and is costly to render: str() runs in the writer."""
+
+
+_IMMUTABLE = (str, int, float, bool, bytes, type(None), Deferred)
+
+
+def parse_sample_rates(raw: Optional[str]) -> Dict[str, float]:
+    rates = {}
+    for item in (raw or "").split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            try:
+                rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+            except ValueError:
+                continue
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """Attaches the MCP request ID and the current trace/span IDs (caller side, cheap)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        from mcp.server.lowlevel.server import request_ctx
+        from tracing import current_span
+
+        request = request_ctx.get(None)
+        record.request_id = request.request_id if request is not None else None
+        span = current_span.get()
+        record.trace_id = span.trace_id if span is not None else None
+        record.span_id = span.span_id if span is not None else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of INFO/DEBUG records for configured loggers (prefix match)."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self.dropped = 0
+
+    def _rate(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        if random.random() < self._rate(record.name):
+            return True
+        self.dropped += 1
+        return False
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread and never blocks."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Args that may be mutated once the caller moves on are merged now. Unlike the
+        # stock handler, tracebacks are left to the listener (no pickling: the queue
+        # never leaves the process).
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(a, _IMMUTABLE) for a in args)):
+            record.message = record.getMessage()
+            record.msg, record.args = record.message, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for attr in _CONTEXT_ATTRS:
+            value = getattr(record, attr, None)
+            if value is not None:
+                entry[attr] = value
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key not in _CONTEXT_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        trace_id = getattr(record, "trace_id", None)
+        return f"{line} [trace={trace_id}]" if trace_id else line
+
+
+class LogPipeline:
+    def __init__(self, handler: LazyQueueHandler, listener: logging.handlers.QueueListener,
+                 sampler: SamplingFilter):
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped_queue_full": self.handler.dropped,
+            "sampled_out": self.sampler.dropped,
+        }
+
+    def stop(self) -> None:
+        """Flushes queued records and stops the writer thread."""
+        self.listener.stop()
+
+
+# Set by configure_logging()
+pipeline: Optional[LogPipeline] = None
+
+
+def log_stats() -> dict:
+    return pipeline.stats() if pipeline is not None else {"configured": False}
+
+
+def configure_logging(stream=None) -> LogPipeline:
+    """Replaces the root handlers with the queue pipeline. Safe to call more than once."""
+    global pipeline
+    if pipeline is not None:
+        return pipeline
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    sampler = SamplingFilter(parse_sample_rates(os.getenv("LOG_SAMPLE")))
+    handler = LazyQueueHandler(queue.Queue(maxsize=QUEUE_SIZE))
+    handler.addFilter(sampler)
+    handler.addFilter(ContextFilter())
+    listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    listener.start()
+    pipeline = LogPipeline(handler, listener, sampler)
+    atexit.register(pipeline.stop)
+    return pipeline
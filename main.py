@@ -1,33 +1,24 @@
+import json
 import logging
+import os
+from typing import Optional
+from fastmcp import Context
 from server import mcp  # Import the configured FastMCP instance
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+from logging_setup import configure_logging
+
+# Queue-based JSON logging: records are written by a background thread (see logging_setup.py)
+configure_logging()
 logger = logging.getLogger("mcp-server")
 
 # --- Import Capabilities ---
-# The act of importing these modules triggers the @mcp.tool and @mcp.resource 
-# decorators inside them, automatically registering them with the server.
-# This keeps main.py clean and acts as a "Plugin Loader".
-
-import tools.doctors
-import tools.patients
-import tools.appointments
-import tools.medication_management
-import tools.reminders
-import tools.revenue
-import tools.clinical
-import tools.previsit
-import tools.clinic_management
-import tools.emergency
-import tools.insurance
-import tools.inquiries
-import tools.waitlist
-import tools.procedures
-import tools.communication
-import tools.users
+# Importing a tool module triggers the @mcp.tool and @mcp.resource decorators
+# inside it, registering it with the server. plugins.py is the "Plugin Loader":
+# it picks which families to import now, which to defer until first use and
+# which to leave out entirely (MCP_TOOL_FAMILIES / MCP_LAZY_FAMILIES).
+
+from plugins import load_families
+load_families()
 
 # --- System & Diagnostics (New) ---
 
@@ -36,46 +27,94 @@ async def check_system_health() -> str:
     """
     Diagnostic: Checks connection to DBOps and reports system status.
     Useful for orchestrators (PatientAI) to verify readiness.
+    Answered from the background health monitor (see health.py); DBOps is only
+    pinged here if the monitor has not completed a check yet.
     """
-    from dependencies import dbops
-    try:
-        # fast ping to see if we can reach the DBOps container
-        # We try to fetch something lightweight, like clinic list or just root
-        await dbops.get("/clinics") 
-        return " System Status: ONLINE. DBOps connection established."
-    except Exception as e:
-        logger.error(f"Health Check Failed: {e}")
-        return f" System Status: OFFLINE. Error connecting to DBOps: {str(e)}"
+    from health import health_monitor
+    if health_monitor.last is None:
+        await health_monitor.probe()
+    snapshot = health_monitor.snapshot()
+    if snapshot["dbops"]["reachable"]:
+        headline = " System Status: ONLINE. DBOps connection established."
+    else:
+        logger.error("Health Check Failed: %s", snapshot['dbops']['last_error'])
+        headline = f" System Status: OFFLINE. Error connecting to DBOps: {snapshot['dbops']['last_error']}"
+    return headline + "\n" + json.dumps(snapshot, indent=2)
 
 # --- JARVIS Pattern: Capability Search ---
 
 @mcp.tool()
-async def search_staff_tools(query: str) -> str:
+async def search_staff_tools(query: str, top_k: int = 5, ctx: Optional[Context] = None) -> str:
     """
     Meta-Tool: Dynamically identifies relevant tools based on user intent.
     Helps the LLM navigate the large catalog of tools.
+    Ranks every registered tool and resource (BM25 keywords fused with offline
+    character n-gram vectors, see CAPABILITY_SEARCH_MODE) and returns the best
+    matches with their call signatures. Families of the matches are unlocked
+    for the calling session (see sessions.py).
     """
-    # Simple semantic catalog - scalable to a vector search later if needed
-    catalog = {
-        "check availability": "doctors://availability/{name}/{date}",
-        "list staff": "doctors://list",
-        "update schedule": "add_availability_tool",
-        "book appointment": "book_appointment",
-        "prescribe": "prescribe_medication",
-        "revenue": "analytics://revenue/comprehensive/..."
-    }
-    
-    query_lower = query.lower()
-    results = [f"Match: '{k}' -> Use Tool/Resource: {v}" for k, v in catalog.items() if k in query_lower]
-    
+    from capabilities import capability_index
+    await capability_index.refresh(mcp)
+
+    top_k = max(1, min(top_k, 20))
+    results = capability_index.search(query, top_k=top_k)
+
     if not results:
         return "No direct match found. Try listing tools via the standard menu."
-    
-    return "\n".join(results)
+
+    # Deferred families are imported the first time a search routes to them;
+    # registering their tools notifies the client that the tool list changed.
+    from plugins import load_family
+    loaded_now = sorted({cap.family for cap, _ in results if not cap.loaded})
+    for family in loaded_now:
+        load_family(family)
+
+    from sessions import unlock_for_context
+    unlocked = await unlock_for_context(ctx, {cap.family for cap, _ in results})
+
+    lines = [f"{i}. [{cap.kind}] {cap.signature} - {cap.summary()}" for i, (cap, _) in enumerate(results, 1)]
+    if loaded_now:
+        lines.append(f"(Loaded on demand: {', '.join(loaded_now)})")
+    if unlocked:
+        lines.append(f"(Tools now available in this session: {', '.join(unlocked)})")
+    return f"Top capabilities for '{query}':\n" + "\n".join(lines)
+
+@mcp.resource("system://families")
+async def get_tool_families() -> str:
+    """Resource: Tool families with their load status and import cost."""
+    from plugins import format_report, import_report
+    return format_report(import_report())
+
+@mcp.resource("system://slow-calls")
+async def get_slow_calls() -> str:
+    """Resource: Recent tool calls and resource reads over the slow-call threshold, with their profile files."""
+    from profiling import format_slow_calls
+    return format_slow_calls()
 
 # --- Entry Point ---
 
+# MCP_MODE: "stdio" (default), "sse" (sticky sessions), "http" (streamable HTTP)
+# or "stateless-http" (streamable HTTP, no server-side session: any replica can
+# serve any request, so pods can sit behind a plain round-robin load balancer).
+TRANSPORT_MODE = os.getenv("MCP_MODE", "stdio").lower()
+
+
+def _http_options() -> dict:
+    if TRANSPORT_MODE == "sse":
+        return {"transport": "sse"}
+    stateless = TRANSPORT_MODE == "stateless-http"
+    # Stateless replies are plain JSON bodies, so proxies never have to hold a stream open
+    return {"transport": "http", "stateless_http": stateless, "json_response": stateless}
+
+
+def http_app():
+    """ASGI factory for the HTTP modes, e.g. `uvicorn main:http_app --factory --workers 4`."""
+    return mcp.http_app(**_http_options())
+
+
 if __name__ == "__main__":
-    logger.info(" Starting CareBot MCP Server...")
-    # This runs the FastMCP server (default port 8000 if not specified)
-    mcp.run()
\ No newline at end of file
+    logger.info(" Starting CareBot MCP Server (%s)...", TRANSPORT_MODE)
+    if TRANSPORT_MODE == "stdio":
+        mcp.run()
+    else:
+        mcp.run(host=os.getenv("MCP_HOST", "127.0.0.1"), port=int(os.getenv("MCP_PORT", "8000")), **_http_options())
\ No newline at end of file
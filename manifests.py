@@ -0,0 +1,102 @@
+"""
+Precomputed tools/resources/templates manifests.
+
+Converting components into MCP schemas (and serializing them) only depends on
+the registry, so it is done once per registry version and per distinct exposure
+set (see sessions.py), then shared by every session. Each manifest also keeps
+its pre-serialized JSON body and a content hash, served over plain HTTP at
+/manifest/{tools|resources|templates} with ETag / If-None-Match support.
+"""
+import hashlib
+import json
+import logging
+from typing import Callable, Optional
+
+from cachetools import LRUCache
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from caches import CountingLRUCache, register_cache
+
+logger = logging.getLogger("dbops-mcp.manifests")
+
+KINDS = ("tools", "resources", "templates")
+
+
+class Manifest:
+    """One serialized component list. `body` and `etag` are built on first access."""
+
+    def __init__(self, kind: str, version: int, items: list):
+        self.kind = kind
+        self.version = version
+        self.items = items
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            payload = {self.kind: [i.model_dump(mode="json", by_alias=True, exclude_none=True) for i in self.items]}
+            self._body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = hashlib.sha256(self.body).hexdigest()[:16]
+        return self._etag
+
+
+class ManifestCache:
+    """Manifests keyed by (kind, component keys); dropped wholesale on registry changes."""
+
+    def __init__(self, maxsize: int = 256):
+        self.version = -1
+        self._manifests: LRUCache = register_cache("manifests", CountingLRUCache(maxsize=maxsize))
+        self.builds = 0
+
+    def get(self, server, kind: str, components: list, convert: Callable) -> Manifest:
+        if self.version != server.registry_version:
+            self._manifests.clear()
+            self.version = server.registry_version
+        key = (kind, tuple(c.key for c in components))
+        manifest = self._manifests.get(key)
+        if manifest is None:
+            manifest = Manifest(kind, self.version, [convert(c) for c in components])
+            self._manifests[key] = manifest
+            self.builds += 1
+            logger.debug("Built %s manifest (%s items, registry v%s)", kind, len(components), self.version)
+        return manifest
+
+
+# Global instance
+manifest_cache = ManifestCache()
+
+
+async def full_manifest(server, kind: str) -> Manifest:
+    """Manifest of every enabled component of `kind`, independent of any session."""
+    if kind == "tools":
+        components = [t for t in (await server.get_tools()).values() if server._should_enable_component(t)]
+        return manifest_cache.get(server, kind, components, server._sdk_tool)
+    if kind == "resources":
+        components = [r for r in (await server.get_resources()).values() if server._should_enable_component(r)]
+        return manifest_cache.get(server, kind, components, server._sdk_resource)
+    components = [t for t in (await server.get_resource_templates()).values() if server._should_enable_component(t)]
+    return manifest_cache.get(server, kind, components, server._sdk_template)
+
+
+def make_manifest_route(server) -> Callable:
+    """HTTP handler serving pre-serialized manifests with conditional GET."""
+
+    async def manifest_route(request: Request) -> Response:
+        kind = request.path_params["kind"]
+        if kind not in KINDS:
+            return JSONResponse({"error": f"Unknown manifest '{kind}'", "kinds": list(KINDS)}, status_code=404)
+        manifest = await full_manifest(server, kind)
+        etag = f'"{manifest.etag}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Registry-Version": str(manifest.version)}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(manifest.body, media_type="application/json", headers=headers)
+
+    return manifest_route
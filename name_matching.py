@@ -0,0 +1,132 @@
+"""
+Fuzzy matching of patient name tokens across spellings and scripts.
+
+Patient names are transliterated from Arabic in many ways (Mohammed /
+Muhammad / Mohamed / محمد, Hussein / Husain / Hossein, Abdul Rahman /
+Abdulrahman). A `NameIndex` holds the distinct name tokens of the patient
+registry (a few thousand, whatever the number of patients) under three keys:
+
+- fold: lower case, accents and Arabic diacritics stripped, Arabic letters
+  transliterated ("Muñoz" -> "munoz", "أحمد" -> "ahmd");
+- phonetic key: consonant skeleton of the folded token (digraphs merged,
+  vowels, y and w dropped, doubled letters collapsed) plus the class of its
+  first vowel (o/u vs a/e/i), so Hassan and Hussein stay apart. Arabic script
+  writes no short vowels, so its tokens match on the skeleton alone;
+- trigrams of the folded token, for typos.
+
+`candidates()` scores every vocabulary token a query token may stand for;
+PatientRegistry.search() combines them per patient.
+"""
+import re
+import unicodedata
+from typing import Dict, Set, Tuple
+
+# Arabic letters after NFKD (hamza carriers and alef variants already reduced)
+_ARABIC = str.maketrans({
+    "ا": "a", "ب": "b", "ت": "t", "ث": "th", "ج": "j", "ح": "h", "خ": "kh", "د": "d", "ذ": "dh",
+    "ر": "r", "ز": "z", "س": "s", "ش": "sh", "ص": "s", "ض": "d", "ط": "t", "ظ": "z", "ع": "",
+    "غ": "gh", "ف": "f", "ق": "q", "ك": "k", "ل": "l", "م": "m", "ن": "n", "ه": "h", "و": "u",
+    "ي": "i", "ى": "a", "ة": "a", "ء": "", "ـ": "", "ک": "k", "ی": "i", "گ": "g", "پ": "p", "چ": "ch",
+})
+_ARABIC_SCRIPT = re.compile(r"[؀-ۿ]")
+_DIGRAPHS = re.compile(r"kh|gh|sh|ch|th|dh|ph|ck")
+_DIGRAPH_SOUNDS = {"kh": "k", "gh": "G", "sh": "S", "ch": "S", "th": "t", "dh": "d", "ph": "f", "ck": "k"}
+_LETTER_SOUNDS = str.maketrans({"q": "k", "c": "k", "g": "j", "v": "f", "x": "ks", "p": "b"})
+_FINAL_H = re.compile(r"(?<=[aeiouy])h$")
+_VOWELS = re.compile(r"[aeiouyw]+")
+_DOUBLES = re.compile(r"(.)\1+")
+
+# Query words that do not have to match anything ("Ahmed Al Hashimi" ~ "Ahmed Hashimi")
+PARTICLES = frozenset({"al", "el", "bin", "ben", "ibn", "bint"})
+
+MIN_SIMILARITY = 0.45   # Trigram Dice coefficient below which a typo is not considered
+COMPOUND_MIN = 0.75     # Words run together must match at least phonetically, not just share trigrams
+
+
+def fold(token: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", token.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).translate(_ARABIC)
+
+
+def phonetic_key(token: str) -> Tuple[str, str]:
+    """(consonant skeleton, first vowel class "a"/"u", or "" for Arabic script)."""
+    text = _FINAL_H.sub("", fold(token))
+    vowel = ""
+    if not _ARABIC_SCRIPT.search(token):
+        first = re.search(r"[aeiou]", text)
+        vowel = ("u" if first.group() in "ou" else "a") if first else ""
+    text = _DIGRAPHS.sub(lambda m: _DIGRAPH_SOUNDS[m.group()], text).translate(_LETTER_SOUNDS)
+    return _DOUBLES.sub(r"\1", _VOWELS.sub("", text)), vowel
+
+
+def trigrams(folded: str) -> Set[str]:
+    padded = f"${folded}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    def __init__(self):
+        self.by_fold: Dict[str, Set[str]] = {}
+        self.by_key: Dict[str, Set[str]] = {}
+        self.by_gram: Dict[str, Set[str]] = {}
+        self.keys: Dict[str, Tuple[str, str]] = {}     # token -> phonetic key
+        self.sizes: Dict[str, int] = {}                # token -> number of trigrams
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, token: str) -> None:
+        if token in self.keys or token in PARTICLES:
+            return
+        folded = fold(token)
+        self.keys[token] = key = phonetic_key(token)
+        grams = trigrams(folded)
+        self.sizes[token] = len(grams)
+        self.by_fold.setdefault(folded, set()).add(token)
+        if key[0]:
+            self.by_key.setdefault(key[0], set()).add(token)
+        for gram in grams:
+            self.by_gram.setdefault(gram, set()).add(token)
+
+    def discard(self, token: str) -> None:
+        key = self.keys.pop(token, None)
+        if key is None:
+            return
+        del self.sizes[token]
+        folded = fold(token)
+        for index, keys in ((self.by_fold, (folded,)), (self.by_key, (key[0],)), (self.by_gram, trigrams(folded))):
+            for k in keys:
+                tokens = index.get(k)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del index[k]
+
+    def candidates(self, word: str) -> Dict[str, float]:
+        """Vocabulary tokens `word` may stand for -> score in (0, 1]; 1.0 = same token."""
+        folded = fold(word)
+        skeleton, vowel = phonetic_key(word)
+        grams = trigrams(folded)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for token in self.by_gram.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+
+        def dice(token: str) -> float:
+            return 2 * shared.get(token, 0) / (len(grams) + self.sizes[token])
+
+        scores = {}
+        for token in self.by_key.get(skeleton, ()) if skeleton else ():
+            other = self.keys[token][1]
+            if not vowel or not other or vowel == other:
+                scores[token] = 0.75 + 0.2 * dice(token)
+        for token in shared:
+            if token not in scores:
+                similarity = dice(token)
+                if similarity >= MIN_SIMILARITY:
+                    scores[token] = 0.8 * similarity
+        for token in self.by_fold.get(folded, ()):
+            scores[token] = 0.97
+        if word in self.keys:
+            scores[word] = 1.0
+        return scores
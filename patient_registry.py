@@ -0,0 +1,548 @@
+"""
+Compact, incrementally synced patient registry with a local lookup index.
+
+The /patients payload has every field of every patient (medical history,
+allergies, ...). Kept as a list of dicts, hundreds of thousands of patients
+dominate each worker's resident memory. The registry keeps only what lookup
+and display need (id, first and last name, phone, email) as a struct of
+arrays: one list per field and a row number per patient id. First and last
+names repeat heavily and are interned, so each distinct name is stored once.
+Phones are stored normalized (digits, with the UAE country code) and emails
+lower-cased, so the same string objects serve as index keys. `PatientRef`
+gives a `__slots__` view of one row.
+
+Index: id, normalized phone, email and name tokens -> rows. `find()` answers
+a phone number, email, id or unique full name locally; callers go to DBOps
+only on a miss (and write the answer back with `upsert()`).
+
+Names: the distinct name tokens also feed a `NameIndex` (name_matching.py)
+of folded, phonetic and trigram keys, so `search()` ranks patients across
+spellings and scripts (Mohammed / Muhammad / محمد, Abd al-Rahman /
+Abdulrahman) without scanning rows. `resolve()` accepts the top candidate
+when it scores at least MCP_NAME_MATCH_MIN and leads the next one by
+MCP_NAME_MATCH_MARGIN; otherwise the name is ambiguous.
+
+Sync: the first lookup loads the full registry. The rows and indexes of a
+full load are built in a worker thread (`asyncio.to_thread`) and swapped in
+at once, so the event loop keeps serving from the previous contents; writes
+made while the load runs are replayed onto the new contents. After that, every
+MCP_PATIENT_SYNC_S the registry asks DBOps only for patients changed since
+its cursor (`GET /patients?updatedSince=<cursor>`, the newest `updated_at`
+seen, or shortly before the previous sync started when records carry none); records marked deleted are removed. A full re-fetch every
+MCP_PATIENT_REGISTRY_TTL_S catches anything the incremental sync cannot see.
+Change-feed events and create_patient_tool write through directly; events
+that name a change without the record trigger an incremental sync (`sync_soon()`).
+
+Full records are fetched on demand from /patients/{id} (`patient_record()`)
+and kept in a small TTL cache.
+
+Measured with `python -m benchmarks.bench_registry 100000`: about 106 MB as a
+list of dicts vs 45 MB compact and indexed per 100k FakeDBOps patients.
+
+MCP_PATIENT_SYNC_S          Seconds between incremental syncs (default 30, 0 = off).
+MCP_PATIENT_REGISTRY_TTL_S  Age at which the registry is fully re-fetched (default 21600).
+MCP_NAME_MATCH_MIN          Lowest fuzzy name score resolved without asking (default 0.75).
+MCP_NAME_MATCH_MARGIN       Lead over the runner-up needed to resolve a name (default 0.1).
+"""
+import asyncio
+import heapq
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from caches import async_cached, make_cache, register_cache
+from name_matching import COMPOUND_MIN, PARTICLES, NameIndex
+
+logger = logging.getLogger("dbops-mcp.patient-registry")
+
+SYNC_S = float(os.getenv("MCP_PATIENT_SYNC_S", "30"))
+REGISTRY_TTL_S = float(os.getenv("MCP_PATIENT_REGISTRY_TTL_S", "21600"))
+NAME_MATCH_MIN = float(os.getenv("MCP_NAME_MATCH_MIN", "0.75"))
+NAME_MATCH_MARGIN = float(os.getenv("MCP_NAME_MATCH_MARGIN", "0.1"))
+COUNTRY_CODE = "971"
+# Rows and indexes, replaced together by a full load
+_CONTENTS = ("ids", "first_names", "last_names", "phones", "emails", "rows", "by_phone", "by_email", "by_token", "names")
+CURSOR_OVERLAP_S = 5   # Without updated_at, the next sync re-reads a little before this one started
+
+# Registry field -> DBOps spellings (list endpoints use snake_case, writes camelCase)
+FIELD_ALIASES = {
+    "first_name": ("first_name", "firstName"),
+    "last_name": ("last_name", "lastName"),
+    "phone": ("phoneNumber", "phone_number", "phone"),
+    "email": ("email",),
+    "updated_at": ("updated_at", "updatedAt"),
+}
+
+_TOKEN = re.compile(r"[^\W\d_]+")
+
+
+def _field(record: dict, name: str) -> str:
+    for alias in FIELD_ALIASES[name]:
+        value = record.get(alias)
+        if value:
+            return str(value)
+    return ""
+
+
+def normalize_phone(raw: str) -> str:
+    """Digits in international form: "+971 50-123 4567", "0501234567" and "501234567" all -> "971501234567"."""
+    digits = "".join(filter(str.isdigit, raw or ""))
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("0"):
+        digits = COUNTRY_CODE + digits[1:]
+    elif len(digits) == 9:
+        digits = COUNTRY_CODE + digits
+    return digits
+
+
+def name_tokens(text: str) -> List[str]:
+    return [sys.intern(t) for t in _TOKEN.findall((text or "").lower())]
+
+
+def _name_keys(first: str, last: str) -> Set[str]:
+    """Name tokens, plus each multi-word name written as one word ("Abd al-Rahman" -> "abdalrahman")."""
+    keys = set()
+    for part in (first, last):
+        tokens = name_tokens(part)
+        keys.update(tokens)
+        if len(tokens) > 1:
+            keys.add(sys.intern("".join(tokens)))
+    return keys
+
+
+def _is_contact(query: str) -> bool:
+    """Email or phone number rather than a name."""
+    return "@" in query or sum(c.isdigit() for c in query) >= 7
+
+
+def _add(index: dict, key: str, row: int) -> None:
+    """Index values are a row, or a tuple of rows when several patients share a key (e.g. a family phone)."""
+    current = index.get(key)
+    if current is None:
+        index[key] = row
+    elif isinstance(current, tuple):
+        index[key] = current + (row,)
+    elif current != row:
+        index[key] = (current, row)
+
+
+def _discard(index: dict, key: str, row: int) -> None:
+    current = index.get(key)
+    if current == row:
+        del index[key]
+    elif isinstance(current, tuple):
+        rest = tuple(r for r in current if r != row)
+        index[key] = rest if len(rest) > 1 else rest[0]
+
+
+def _rows(index: dict, key: str) -> tuple:
+    current = index.get(key)
+    if current is None:
+        return ()
+    return current if isinstance(current, tuple) else (current,)
+
+
+class PatientRef:
+    """Lookup/display fields of one patient."""
+    __slots__ = ("id", "first_name", "last_name", "phone", "email")
+
+    def __init__(self, id: str, first_name: str, last_name: str, phone: str, email: str):
+        self.id = id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.phone = phone
+        self.email = email
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def __repr__(self) -> str:
+        return f"PatientRef({self.id!r}, {self.full_name!r})"
+
+
+class PatientRegistry:
+    def __init__(self, sync_s: float = SYNC_S, ttl_s: float = REGISTRY_TTL_S):
+        self.sync_s = sync_s
+        self.ttl_s = ttl_s
+        self._reset()
+        self.loaded_at: Optional[float] = None     # Last full load
+        self.synced_at: Optional[float] = None     # Last full load or incremental sync
+        self.cursor: Optional[str] = None
+        self._cursor_dated = False                 # Cursor is a record's updated_at, not a sync start time
+        self._loading: Optional[asyncio.Future] = None
+        self._pending: Optional[list] = None       # Writes made while a full load runs
+        self._syncing: Optional[asyncio.Future] = None
+        self._sync_again = False
+        self._task: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.syncs = 0
+        self.synced_records = 0
+        self.local_hits = 0
+        self.local_misses = 0
+        self.name_searches = 0
+        self.fuzzy_hits = 0
+
+    def _reset(self) -> None:
+        self.ids: List[Optional[str]] = []     # None = removed row
+        self.first_names: List[str] = []
+        self.last_names: List[str] = []
+        self.phones: List[str] = []
+        self.emails: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.by_phone: Dict[str, object] = {}
+        self.by_email: Dict[str, object] = {}
+        self.by_token: Dict[str, Set[int]] = {}
+        self.names = NameIndex()
+
+    # --- Building ---
+
+    def load(self, records: Iterable[dict]) -> None:
+        """Replaces the registry contents with `records`."""
+        self._adopt(self._build(records))
+
+    @staticmethod
+    def _build(records: Iterable[dict]) -> "PatientRegistry":
+        """A registry of `records` alone. Shares nothing with the live one, so it can be built in a thread."""
+        staged = PatientRegistry(sync_s=0)
+        for record in records:
+            staged.upsert(record)
+            staged._advance_cursor(record)
+        return staged
+
+    def _adopt(self, staged: "PatientRegistry") -> None:
+        """Swaps in the contents and cursor of `staged`, then replays writes made while it was built."""
+        for name in _CONTENTS:
+            setattr(self, name, getattr(staged, name))
+        self.cursor, self._cursor_dated = staged.cursor, staged._cursor_dated
+        self.loaded_at = self.synced_at = time.time()
+        pending, self._pending = self._pending, None
+        for patient_id, record in pending or ():
+            if record is None:
+                self.remove(patient_id)
+            else:
+                self.upsert(record)
+
+    def upsert(self, record: dict) -> Optional[int]:
+        """Adds or updates one patient from a DBOps record; returns its row."""
+        if not isinstance(record, dict) or record.get("id") is None:
+            return None
+        if record.get("deleted") or record.get("deleted_at") or record.get("deletedAt"):
+            self.remove(record["id"])
+            return None
+        if self._pending is not None:
+            self._pending.append((record["id"], record))
+        patient_id = str(record["id"])
+        first, last = sys.intern(_field(record, "first_name")), sys.intern(_field(record, "last_name"))
+        phone, email = normalize_phone(_field(record, "phone")), _field(record, "email").lower()
+        row = self.rows.get(patient_id)
+        if row is None:
+            row = len(self.ids)
+            self.rows[patient_id] = row
+            self.ids.append(patient_id)
+            self.first_names.append(first)
+            self.last_names.append(last)
+            self.phones.append(phone)
+            self.emails.append(email)
+        else:
+            self._unindex(row)
+            self.first_names[row], self.last_names[row], self.phones[row], self.emails[row] = first, last, phone, email
+        self._index(row)
+        return row
+
+    def remove(self, patient_id: str) -> None:
+        if self._pending is not None:
+            self._pending.append((patient_id, None))
+        row = self.rows.pop(str(patient_id), None)
+        if row is not None:
+            self._unindex(row)
+            self.ids[row] = None   # Tombstone; rows are compacted on the next full load
+
+    def _index(self, row: int) -> None:
+        if self.phones[row]:
+            _add(self.by_phone, self.phones[row], row)
+        if self.emails[row]:
+            _add(self.by_email, self.emails[row], row)
+        for token in _name_keys(self.first_names[row], self.last_names[row]):
+            rows = self.by_token.get(token)
+            if rows is None:
+                rows = self.by_token[token] = set()
+                self.names.add(token)
+            rows.add(row)
+
+    def _unindex(self, row: int) -> None:
+        _discard(self.by_phone, self.phones[row], row)
+        _discard(self.by_email, self.emails[row], row)
+        for token in _name_keys(self.first_names[row], self.last_names[row]):
+            rows = self.by_token.get(token)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self.by_token[token]
+                    self.names.discard(token)
+
+    def _advance_cursor(self, record: dict) -> None:
+        """Only full loads and sync responses move the cursor: a single upsert (write-back, change feed,
+        create) is not proof that everything changed before it has been seen."""
+        updated_at = _field(record, "updated_at") if isinstance(record, dict) else ""
+        if updated_at and (not self._cursor_dated or updated_at > self.cursor):
+            self.cursor = updated_at
+            self._cursor_dated = True
+
+    # --- Reading ---
+
+    def _ref(self, row: int) -> PatientRef:
+        return PatientRef(self.ids[row], self.first_names[row], self.last_names[row],
+                          self.phones[row], self.emails[row])
+
+    def get(self, patient_id: str) -> Optional[PatientRef]:
+        row = self.rows.get(str(patient_id))
+        return self._ref(row) if row is not None else None
+
+    def find_phone(self, raw: str) -> List[PatientRef]:
+        return [self._ref(row) for row in _rows(self.by_phone, normalize_phone(raw))]
+
+    def find_email(self, raw: str) -> List[PatientRef]:
+        return [self._ref(row) for row in _rows(self.by_email, raw.strip().lower())]
+
+    def find_name(self, text: str) -> List[PatientRef]:
+        """Patients whose names contain every token of `text`."""
+        tokens = name_tokens(text)
+        if not tokens:
+            return []
+        sets = sorted((self.by_token.get(t, set()) for t in tokens), key=len)
+        return [self._ref(row) for row in sorted(sets[0].intersection(*sets[1:]))]
+
+    def find(self, query: str) -> Optional[PatientRef]:
+        """The one patient matching an id, phone number, email or full name; None if unknown or ambiguous."""
+        query = (query or "").strip()
+        ref = self.get(query)
+        if ref is None:
+            if "@" in query:
+                matches = self.find_email(query)
+            elif _is_contact(query):
+                matches = self.find_phone(query)
+            else:
+                matches = self.find_name(query)
+            ref = matches[0] if len(matches) == 1 else None
+        if ref is None:
+            self.local_misses += 1
+        else:
+            self.local_hits += 1
+        return ref
+
+    def search(self, text: str, limit: int = 5) -> List[Tuple[PatientRef, float]]:
+        """Patients whose names match every word of `text`, allowing for spelling variants; best first."""
+        self.name_searches += 1
+        tokens = name_tokens(text)
+        words = [i for i, t in enumerate(tokens) if t not in PARTICLES] or list(range(len(tokens)))
+        if not words:
+            return []
+        per_word = {i: self.names.candidates(tokens[i]) for i in words}
+        # A run of words may be one word in the registry ("abd al rahman" ~ "abdulrahman"): credits every word in it
+        for size in (2, 3):
+            for start in range(len(tokens) - size + 1):
+                joined = self.names.candidates("".join(tokens[start:start + size]))
+                for i in words:
+                    if start <= i < start + size:
+                        scores = per_word[i]
+                        for token, score in joined.items():
+                            if score >= COMPOUND_MIN and score > scores.get(token, 0):
+                                scores[token] = score
+
+        def matched(i: int, within: Optional[Dict[int, float]] = None) -> Dict[int, float]:
+            """Best score of word i per row (only rows in `within`, when given)."""
+            best: Dict[int, float] = {}
+            for token, score in per_word[i].items():
+                rows = self.by_token.get(token, ())
+                if within is not None:
+                    rows = [row for row in within if row in rows] if len(within) < len(rows) else \
+                        [row for row in rows if row in within]
+                for row in rows:
+                    if score > best.get(row, 0):
+                        best[row] = score
+            return best
+
+        # Rarest word first; every further word only looks at the rows still in the running
+        order = sorted(words, key=lambda i: sum(len(self.by_token.get(t, ())) for t in per_word[i]))
+        totals = matched(order[0])
+        for i in order[1:]:
+            best = matched(i, totals)
+            totals = {row: totals[row] + score for row, score in best.items()}
+        top = heapq.nlargest(limit, totals.items(), key=lambda item: (item[1], -item[0]))
+        return [(self._ref(row), round(total / len(words), 3)) for row, total in top]
+
+    def resolve(self, query: str) -> Optional[PatientRef]:
+        """`find()`, then the fuzzy name search when one candidate clearly leads."""
+        ref = self.find(query)
+        if ref is None and not _is_contact(query):
+            ranked = self.search(query, limit=2)
+            if ranked and ranked[0][1] >= NAME_MATCH_MIN and (
+                    len(ranked) == 1 or ranked[0][1] - ranked[1][1] >= NAME_MATCH_MARGIN):
+                ref = ranked[0][0]
+                self.fuzzy_hits += 1
+        return ref
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[PatientRef]:
+        return (self._ref(row) for row, patient_id in enumerate(self.ids) if patient_id is not None)
+
+    # --- Loading and syncing from DBOps ---
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    @property
+    def fresh(self) -> bool:
+        return self.loaded and time.time() - self.loaded_at < self.ttl_s
+
+    def invalidate(self) -> None:
+        """Forces a full re-fetch on the next `ensure_loaded()` (contents stay usable meanwhile)."""
+        if self.loaded_at is not None:
+            self.loaded_at = 0.0
+
+    def load_in_background(self) -> asyncio.Future:
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._fetch())
+            self._loading.add_done_callback(self._load_done)
+        return self._loading
+
+    def _load_done(self, task: asyncio.Future) -> None:
+        self._loading = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Patient registry load failed: %s", task.exception())
+
+    async def ensure_loaded(self) -> "PatientRegistry":
+        """Full fetch of /patients when never loaded or past the TTL; concurrent callers share one fetch."""
+        if not self.fresh:
+            await asyncio.shield(self.load_in_background())
+        return self
+
+    async def _fetch(self) -> None:
+        from dependencies import dbops
+        started = time.time()
+        self._pending = []
+        try:
+            records = await dbops.get("/patients")
+            staged = await asyncio.to_thread(self._build, records or [])
+        except BaseException:
+            self._pending = None
+            raise
+        self._adopt(staged)
+        self._default_cursor(started)
+        self.loads += 1
+        logger.info("Patient registry loaded: %s patients", len(self))
+
+    async def sync(self) -> int:
+        """Applies patients changed since the cursor (a full load when due). Returns the records received."""
+        if not self.fresh:
+            await self.ensure_loaded()
+            return len(self)
+        from dependencies import dbops
+        started = time.time()
+        records = await dbops.get("/patients", params={"updatedSince": self.cursor}) or []
+        for record in records:
+            self.upsert(record)
+            self._advance_cursor(record)
+        self._default_cursor(started)
+        self.synced_at = time.time()
+        self.syncs += 1
+        self.synced_records += len(records)
+        if records:
+            logger.info("Patient registry synced %s changed patients", len(records))
+        return len(records)
+
+    def sync_soon(self) -> None:
+        """Incremental sync in the background, for a change we were told about but not shown.
+        Calls while one runs are coalesced into one more sync; a no-op before the first load."""
+        if not self.loaded:
+            return
+        if self._syncing is not None:
+            self._sync_again = True
+            return
+        try:
+            self._syncing = asyncio.ensure_future(self.sync())
+        except RuntimeError:   # No event loop: the next ensure_loaded() re-fetches
+            self.invalidate()
+            return
+        self._syncing.add_done_callback(self._sync_done)
+
+    def _sync_done(self, task: asyncio.Future) -> None:
+        self._syncing = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Patient registry sync failed: %s", task.exception())
+        if self._sync_again:
+            self._sync_again = False
+            self.sync_soon()
+
+    def _default_cursor(self, started: float) -> None:
+        """DBOps records without updated_at: the next sync starts just before this one did."""
+        if not self._cursor_dated:
+            since = datetime.fromtimestamp(started - CURSOR_OVERLAP_S, tz=timezone.utc)
+            self.cursor = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        if self.sync_s > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_s)
+            if not self.loaded:
+                continue   # Nobody has looked a patient up yet
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning("Patient registry sync failed: %s", e)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.local_misses
+        return {
+            "backend": "compact",
+            "size": len(self),
+            "rows": len(self.ids),
+            "hits": self.local_hits,
+            "misses": self.local_misses,
+            "hit_rate": round(self.local_hits / lookups, 3) if lookups else None,
+            "name_vocabulary": len(self.names),
+            "name_searches": self.name_searches,
+            "fuzzy_hits": self.fuzzy_hits,
+            "loads": self.loads,
+            "syncs": self.syncs,
+            "synced_records": self.synced_records,
+            "cursor": self.cursor,
+            "synced_age_s": round(time.time() - self.synced_at, 1) if self.synced_at else None,
+        }
+
+
+# Global instance
+patient_registry = register_cache("patient_registry", PatientRegistry())
+
+# Full records, fetched only when a tool needs more than the registry fields
+record_cache = make_cache("patient_records", maxsize=1000, ttl=300)
+
+
+@async_cached(record_cache)
+async def patient_record(patient_id: str) -> dict:
+    """Full DBOps record for one patient."""
+    from dependencies import dbops
+    return await dbops.get(f"/patients/{patient_id}")
@@ -0,0 +1,272 @@
+"""
+Plugin Loader: decides which tool families are registered on `mcp` and when.
+
+MCP_TOOL_FAMILIES  Comma list of families to expose, or "all" (default).
+MCP_LAZY_FAMILIES  Comma list of enabled families whose import is deferred until
+                   first use. They stay discoverable through a static manifest
+                   read from source (no import). search_staff_tools loads them
+                   when it routes a request to them; a direct call to one of
+                   their tools or resources loads the owning family first
+                   (LazyFamilyMiddleware).
+MCP_IMPORT_REPORT  "1" to log the per-family import cost table at startup.
+
+Run `python plugins.py` for the import-time report from a cold interpreter.
+"""
+import ast
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastmcp.resources.template import match_uri_template
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+logger = logging.getLogger("dbops-mcp.plugins")
+
+# Family name -> module. Order is the registration order (and report order).
+FAMILIES: Dict[str, str] = {
+    "doctors": "tools.doctors",
+    "patients": "tools.patients",
+    "appointments": "tools.appointments",
+    "medications": "tools.medication_management",
+    "reminders": "tools.reminders",
+    "revenue": "tools.revenue",
+    "clinical": "tools.clinical",
+    "previsit": "tools.previsit",
+    "clinics": "tools.clinic_management",
+    "emergency": "tools.emergency",
+    "insurance": "tools.insurance",
+    "inquiries": "tools.inquiries",
+    "waitlist": "tools.waitlist",
+    "procedures": "tools.procedures",
+    "communication": "tools.communication",
+    "users": "tools.users",
+}
+
+
+class FamilyLoad:
+    """One row of the import report."""
+
+    def __init__(self, family: str, status: str, import_ms: float = 0.0, components: int = 0):
+        self.family = family
+        self.status = status          # "loaded" | "deferred" | "disabled" | "failed"
+        self.import_ms = import_ms
+        self.components = components  # Tools/resources registered by this import
+
+
+# Current state, keyed by family name
+_state: Dict[str, FamilyLoad] = {}
+# Family name -> its static manifest (sources do not change while the server runs)
+_manifests: Dict[str, list] = {}
+
+
+def _parse_family_list(raw: Optional[str], default: List[str]) -> List[str]:
+    if raw is None or not raw.strip() or raw.strip().lower() == "all":
+        return list(default)
+    names = [n.strip().lower() for n in raw.split(",") if n.strip()]
+    unknown = [n for n in names if n not in FAMILIES]
+    if unknown:
+        logger.warning("Ignoring unknown tool families: %s", ", ".join(unknown))
+    return [n for n in names if n in FAMILIES]
+
+
+def enabled_families() -> List[str]:
+    return _parse_family_list(os.getenv("MCP_TOOL_FAMILIES"), list(FAMILIES))
+
+
+def lazy_families() -> List[str]:
+    raw = os.getenv("MCP_LAZY_FAMILIES")
+    if not raw or not raw.strip():
+        return []
+    return _parse_family_list(raw, list(FAMILIES))
+
+
+def family_of_module(module: str) -> Optional[str]:
+    for family, mod in FAMILIES.items():
+        if mod == module:
+            return family
+    return None
+
+
+def load_family(family: str) -> FamilyLoad:
+    """Imports a family module (triggering its @mcp decorators) and records the cost."""
+    from server import mcp
+
+    current = _state.get(family)
+    if current and current.status == "loaded":
+        return current
+
+    module = FAMILIES[family]
+    before = mcp.registry_version
+    t0 = time.perf_counter()
+    try:
+        importlib.import_module(module)
+        status = "loaded"
+    except Exception as e:
+        logger.error("Failed to load tool family '%s' (%s): %s", family, module, e)
+        status = "failed"
+    row = FamilyLoad(family, status, (time.perf_counter() - t0) * 1000, mcp.registry_version - before)
+    _state[family] = row
+    return row
+
+
+def is_loaded(family: str) -> bool:
+    row = _state.get(family)
+    return bool(row and row.status == "loaded")
+
+
+def load_families() -> List[FamilyLoad]:
+    """Startup entry point: loads enabled families, defers lazy ones, skips the rest."""
+    # Shared modules are timed separately so the first family isn't billed for them
+    t0 = time.perf_counter()
+    importlib.import_module("server")
+    importlib.import_module("dependencies")
+    importlib.import_module("tools.models")
+    _state["core"] = FamilyLoad("core", "loaded", (time.perf_counter() - t0) * 1000)
+
+    from server import mcp
+
+    enabled = set(enabled_families())
+    lazy = set(lazy_families()) & enabled
+    mcp.hidden_modules = frozenset(FAMILIES[f] for f in FAMILIES if f not in enabled)
+    for family in FAMILIES:
+        if family not in enabled:
+            _state[family] = FamilyLoad(family, "disabled")
+        elif family in lazy:
+            _state[family] = FamilyLoad(family, "deferred")
+        else:
+            load_family(family)
+    _sync_transitive_imports()
+
+    report = import_report()
+    if os.getenv("MCP_IMPORT_REPORT") == "1":
+        logger.info("Tool family import report:\n%s", format_report(report))
+    return report
+
+
+def _sync_transitive_imports() -> None:
+    """A deferred family imported as a helper of another family is already registered."""
+    for family, row in _state.items():
+        if row.status == "deferred" and FAMILIES[family] in sys.modules:
+            row.status = "loaded"
+
+
+def import_report() -> List[FamilyLoad]:
+    order = ["core"] + list(FAMILIES)
+    return [_state[f] for f in order if f in _state]
+
+
+def format_report(rows: List[FamilyLoad]) -> str:
+    lines = [f"{'Family':<15} {'Status':<9} {'Import ms':>10} {'Components':>11}"]
+    lines += [f"{r.family:<15} {r.status:<9} {r.import_ms:>10.1f} {r.components:>11}" for r in rows]
+    total = sum(r.import_ms for r in rows)
+    lines.append(f"{'total':<15} {'':<9} {total:>10.1f}")
+    return "\n".join(lines)
+
+
+# --- Static manifests for deferred families ---
+
+def _decorator_kind(dec: ast.expr) -> Optional[str]:
+    """Returns 'tool'/'resource' for `@mcp.tool(...)` / `@mcp.resource(...)` decorators."""
+    func = dec.func if isinstance(dec, ast.Call) else dec
+    if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "mcp":
+        return func.attr if func.attr in ("tool", "resource") else None
+    return None
+
+
+def _signature_from_ast(node: ast.AsyncFunctionDef) -> str:
+    args = node.args.args
+    defaults = [None] * (len(args) - len(node.args.defaults)) + list(node.args.defaults)
+    parts = []
+    for arg, default in zip(args, defaults):
+        part = arg.arg
+        if arg.annotation is not None:
+            part += f": {ast.unparse(arg.annotation)}"
+        if default is not None:
+            part += f" = {ast.unparse(default)}"
+        parts.append(part)
+    return f"{node.name}({', '.join(parts)})"
+
+
+def static_manifest(family: str) -> list:
+    """Reads a family's tools/resources from source, without importing it."""
+    if family not in _manifests:
+        _manifests[family] = _read_manifest(family)
+    return list(_manifests[family])
+
+
+def _read_manifest(family: str) -> list:
+    from capabilities import Capability
+
+    spec = importlib.util.find_spec(FAMILIES[family])
+    tree = ast.parse(Path(spec.origin).read_text(encoding="utf-8"))
+    caps = []
+    for node in tree.body:
+        if not isinstance(node, (ast.AsyncFunctionDef, ast.FunctionDef)):
+            continue
+        for dec in node.decorator_list:
+            kind = _decorator_kind(dec)
+            if kind == "tool":
+                caps.append(Capability(key=node.name, kind="tool", family=family,
+                                       signature=_signature_from_ast(node),
+                                       description=ast.get_docstring(node) or "", loaded=False))
+            elif kind == "resource" and isinstance(dec, ast.Call) and dec.args:
+                uri = ast.literal_eval(dec.args[0])
+                caps.append(Capability(key=uri, kind="template" if "{" in uri else "resource",
+                                       family=family, signature=uri,
+                                       description=ast.get_docstring(node) or "", loaded=False))
+    return caps
+
+
+def deferred_capabilities() -> list:
+    """Manifest entries for every family that is deferred and not yet imported."""
+    _sync_transitive_imports()
+    caps = []
+    for family, row in _state.items():
+        if row.status == "deferred":
+            caps.extend(static_manifest(family))
+    return caps
+
+
+def deferred_owner(kind: str, key: str) -> Optional[str]:
+    """The deferred family declaring tool `key` (kind "tool") or a resource/template matching URI `key`."""
+    for cap in deferred_capabilities():
+        if kind == "tool":
+            if cap.kind == "tool" and cap.key == key:
+                return cap.family
+        elif cap.kind == "resource" and cap.key == key:
+            return cap.family
+        elif cap.kind == "template" and match_uri_template(key, cap.key) is not None:
+            return cap.family
+    return None
+
+
+class LazyFamilyMiddleware(Middleware):
+    """Loads a deferred family before a direct call to one of its tools or resources would miss."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        self._load_owner("tool", context.message.name)
+        return await call_next(context)
+
+    async def on_read_resource(self, context: MiddlewareContext, call_next):
+        self._load_owner("resource", str(context.message.uri))
+        return await call_next(context)
+
+    @staticmethod
+    def _load_owner(kind: str, key: str) -> None:
+        if not any(row.status == "deferred" for row in _state.values()):
+            return
+        family = deferred_owner(kind, key)
+        if family is not None:
+            logger.info("Loading deferred family '%s' for %s %s", family, kind, key)
+            load_family(family)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    load_families()
+    print(format_report(import_report()))
@@ -0,0 +1,189 @@
+"""
+Slow-call profiler (opt-in).
+
+MCP_SLOW_CALL_MS     Latency threshold in ms. Unset or 0 disables the hook.
+MCP_PROFILE_DIR      Where profiles are written (default "profiles").
+MCP_PROFILE_KEEP     How many profile files to keep; oldest are deleted (default 50).
+MCP_PROFILE_SAMPLE_MS  Stack sampling interval once a call is over the threshold (default 5).
+
+Each tool call / resource read arms a timer. Calls that finish in time only pay
+for that timer. When it fires the call's task stack (where it is awaiting) is
+sampled until it completes, and the finished call is saved as JSON with the
+samples plus its DBOps request timeline (from the tracing spans). Recent slow
+calls are listed by the `system://slow-calls` resource.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Optional
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from tracing import Span, current_span, start_span
+
+logger = logging.getLogger("dbops-mcp.profiling")
+
+SLOW_CALL_MS = float(os.getenv("MCP_SLOW_CALL_MS", "0") or 0)
+PROFILE_DIR = os.getenv("MCP_PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("MCP_PROFILE_KEEP", "50"))
+SAMPLE_MS = float(os.getenv("MCP_PROFILE_SAMPLE_MS", "5"))
+
+# Summaries of the most recent slow calls, newest last
+recent_slow_calls: deque = deque(maxlen=100)
+
+
+def profiling_enabled() -> bool:
+    return SLOW_CALL_MS > 0
+
+
+def _short_path(filename: str) -> str:
+    path = Path(filename)
+    return f"{path.parent.name}/{path.name}"
+
+
+def _await_chain(coro) -> list:
+    """Frames from the task's outermost coroutine down to the innermost await.
+
+    Task.get_stack() stops at the outermost frame of a suspended coroutine.
+    """
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+class StackSampler:
+    """Periodically records the await chain of one task, driven by the event loop."""
+
+    def __init__(self, task: asyncio.Task, interval_ms: float):
+        self.task = task
+        self.interval = interval_ms / 1000
+        self.samples: Counter = Counter()
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self) -> None:
+        self._sample()
+
+    def _sample(self) -> None:
+        if self.task.done():
+            return
+        stack = tuple(f"{_short_path(f.f_code.co_filename)}:{f.f_lineno} {f.f_code.co_name}"
+                      for f in _await_chain(self.task.get_coro()))
+        if stack:
+            self.samples[stack] += 1
+        self._handle = asyncio.get_running_loop().call_later(self.interval, self._sample)
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+
+
+def _dbops_timeline(root: Span) -> list:
+    timeline = []
+    for child in root.children:
+        if child.kind == "dbops":
+            timeline.append({
+                "offset_ms": round((child.start - root.start) * 1000, 3),
+                "duration_ms": round(child.duration_ms or 0.0, 3),
+                "method": child.attributes.get("method"),
+                "endpoint": child.attributes.get("endpoint"),
+                "status": child.attributes.get("status"),
+                "bytes": child.attributes.get("bytes"),
+            })
+    return sorted(timeline, key=lambda t: t["offset_ms"])
+
+
+def _rotate(directory: Path) -> None:
+    profiles = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for old in profiles[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else profiles:
+        old.unlink(missing_ok=True)
+
+
+def save_profile(span: Span, sampler: StackSampler, duration_ms: float, status: str) -> dict:
+    directory = Path(PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(span.start))
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", span.name)[:80]
+    path = directory / f"{stamp}-{span.span_id[:6]}-{slug}.json"
+
+    summary = {
+        "call": span.name,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(span.start)),
+        "duration_ms": round(duration_ms, 1),
+        "status": status,
+        "dbops_calls": sum(1 for c in span.children if c.kind == "dbops"),
+        "file": str(path),
+    }
+    profile = {
+        **summary,
+        "trace_id": span.trace_id,
+        "threshold_ms": SLOW_CALL_MS,
+        "sample_interval_ms": SAMPLE_MS,
+        "stack_samples": [{"count": n, "stack": list(stack)} for stack, n in sampler.samples.most_common()],
+        "dbops_timeline": _dbops_timeline(span),
+    }
+    path.write_text(json.dumps(profile, indent=2), encoding="utf-8")
+    _rotate(directory)
+    recent_slow_calls.append(summary)
+    return summary
+
+
+class SlowCallMiddleware(Middleware):
+    """Samples and saves tool calls / resource reads that exceed MCP_SLOW_CALL_MS."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        if not profiling_enabled():
+            return await call_next(context)
+        return await self._watch(f"tool {context.message.name}", "tool", context, call_next)
+
+    async def on_read_resource(self, context: MiddlewareContext, call_next):
+        if not profiling_enabled():
+            return await call_next(context)
+        return await self._watch(f"resource {context.message.uri}", "resource", context, call_next)
+
+    async def _watch(self, name: str, kind: str, context: MiddlewareContext, call_next):
+        sampler = StackSampler(asyncio.current_task(), SAMPLE_MS)
+        timer = asyncio.get_running_loop().call_later(SLOW_CALL_MS / 1000, sampler.start)
+        # Reuse the tracing span when there is one; otherwise open a local (unexported) one
+        scope = start_span(name, kind) if current_span.get() is None else None
+        span = scope.__enter__() if scope is not None else current_span.get()
+        t0 = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            return await call_next(context)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            timer.cancel()
+            sampler.stop()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            if scope is not None:
+                scope.__exit__(type(error), error, None)
+            if elapsed_ms >= SLOW_CALL_MS:
+                try:
+                    summary = save_profile(span, sampler, elapsed_ms, "error" if error else span.status)
+                    logger.warning("Slow call %s: %s ms, profile at %s", name, summary['duration_ms'], summary['file'])
+                except OSError as e:
+                    logger.error("Could not save slow-call profile for %s: %s", name, e)
+
+
+def format_slow_calls() -> str:
+    if not profiling_enabled():
+        return "Slow-call profiling is off (set MCP_SLOW_CALL_MS to enable)."
+    if not recent_slow_calls:
+        return f"No calls slower than {SLOW_CALL_MS:g} ms since startup."
+    lines = [f"Calls slower than {SLOW_CALL_MS:g} ms (newest first):"]
+    for s in reversed(recent_slow_calls):
+        lines.append(f"- {s['started']} {s['call']} {s['duration_ms']} ms [{s['status']}] "
+                     f"{s['dbops_calls']} DBOps calls -> {s['file']}")
+    return "\n".join(lines)
@@ -0,0 +1,173 @@
+"""
+Read-replica routing for DBOps GETs.
+
+With DB_OPS_READ_URLS set, GETs are spread over the read replicas (each with
+its own connection pool) while POST/PUT/PATCH, streams and health pings stay
+on the primary. A GET goes to the replica with the lowest expected wait:
+in-flight requests times recent latency.
+
+Replica health is tracked passively. A transport error or a 5xx counts as a
+failure and the GET is retried on the primary. After MCP_REPLICA_EJECT_FAILURES
+failures in a row, the replica is taken out for MCP_REPLICA_EJECT_S seconds.
+It then gets traffic again, but one more failure takes it out at once. A 404 from a
+replica is also retried on the primary (the record may not have replicated
+yet), without counting against the replica.
+
+Read-your-writes: a write that names a patient or an appointment (in its
+path, e.g. PATCH /appointments/{id}/cancel, or as patient_id / appointment_id
+in the body) pins reads of that record to the primary for
+MCP_READ_YOUR_WRITES_S seconds, so the next tool call sees the write. A
+created patient or appointment is pinned by the id DBOps returns.
+Pins live in a make_cache() cache: with MCP_CACHE_BACKEND=sqlite they are
+shared by every worker on the node, so the next call sees the write whichever
+worker serves it. With the default memory backend they hold in the writing
+process only, and across pods they are never shared: a follow-up call that a
+load balancer sends to another worker or pod may read from a replica that has
+not caught up yet (for at most the replica lag).
+
+DB_OPS_READ_URLS            Comma list of replica base URLs (default none: all traffic to DB_OPS_URL).
+MCP_READ_YOUR_WRITES_S      Primary pin after a write touching a patient (default 5, 0 = off).
+MCP_REPLICA_EJECT_FAILURES  Consecutive failures before a replica is taken out (default 3).
+MCP_REPLICA_EJECT_S         How long an ejected replica gets no traffic (default 30).
+"""
+import logging
+import os
+import re
+import time
+from typing import List, Optional, Set
+
+import httpx
+
+from caches import make_cache
+
+logger = logging.getLogger("dbops-mcp.read-routing")
+
+READ_URLS = [u.strip() for u in os.getenv("DB_OPS_READ_URLS", "").split(",") if u.strip()]
+READ_YOUR_WRITES_S = float(os.getenv("MCP_READ_YOUR_WRITES_S", "5"))
+EJECT_FAILURES = int(os.getenv("MCP_REPLICA_EJECT_FAILURES", "3"))
+EJECT_S = float(os.getenv("MCP_REPLICA_EJECT_S", "30"))
+
+# DBOps paths that belong to one patient; group 1 is the patient id
+PATIENT_PATHS = [
+    re.compile(r"/patients/(?!by-phone/)([^/]+)"),
+    re.compile(r"/treatment-plans/patient/([^/]+)"),
+    re.compile(r"/db/reminders/(?:medication|adherence)/([^/]+)"),
+]
+PATIENT_FIELDS = ("patient_id", "patientId")
+
+# Pinned entity -> (DBOps paths naming one record, group 1 = id; body / query fields naming one)
+PIN_ENTITIES = {
+    "patient": (PATIENT_PATHS, PATIENT_FIELDS),
+    "appointment": ([re.compile(r"/appointments/([^/]+)")], ("appointment_id", "appointmentId")),
+}
+# Collection POSTs whose response id is a new record of that entity
+CREATED = {"/patients": "patient", "/appointments": "appointment"}
+
+
+def entity_ids(entity: str, endpoint: str, fields: Optional[dict] = None) -> Set[str]:
+    """Records of `entity` a DBOps call is about, from its path and its body or query parameters."""
+    paths, names = PIN_ENTITIES[entity]
+    ids = set()
+    for pattern in paths:
+        match = pattern.match(endpoint)
+        if match:
+            ids.add(match.group(1))
+    if isinstance(fields, dict):
+        ids.update(str(fields[f]) for f in names if fields.get(f))
+    return ids
+
+
+def patient_ids(endpoint: str, fields: Optional[dict] = None) -> Set[str]:
+    """Patients a DBOps call is about, from its path and its body or query parameters."""
+    return entity_ids("patient", endpoint, fields)
+
+
+def pin_keys(endpoint: str, fields: Optional[dict] = None) -> Set[str]:
+    """"entity:id" for every record a DBOps call is about."""
+    return {f"{entity}:{record_id}" for entity in PIN_ENTITIES for record_id in entity_ids(entity, endpoint, fields)}
+
+
+class Replica:
+    def __init__(self, url: str, client: httpx.AsyncClient):
+        self.url = url
+        self.client = client
+        self.in_flight = 0
+        self.latency_ms = 10.0          # EWMA of successful GETs
+        self.failures = 0               # Consecutive
+        self.ejected_until = 0.0
+        self.served = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def record(self, ok: bool, latency_ms: float, eject_failures: int, eject_s: float) -> None:
+        if ok:
+            self.served += 1
+            self.failures = 0
+            self.latency_ms += 0.2 * (latency_ms - self.latency_ms)
+            return
+        self.errors += 1
+        self.failures += 1
+        if self.failures >= eject_failures:
+            self.ejected_until = time.monotonic() + eject_s
+            logger.warning("Read replica %s ejected for %.0fs after %s failures", self.url, eject_s, self.failures)
+
+
+class ReadRouter:
+    def __init__(self, pin_s: float = READ_YOUR_WRITES_S, eject_failures: int = EJECT_FAILURES,
+                 eject_s: float = EJECT_S):
+        self.replicas: List[Replica] = []
+        self.pin_s = pin_s
+        self.eject_failures = eject_failures
+        self.eject_s = eject_s
+        self.pins = make_cache("read_pins", maxsize=10000, ttl=max(pin_s, 0.001))
+        self.primary_reads = 0
+        self.pinned_reads = 0
+        self.fallbacks = 0
+
+    # --- Read-your-writes ---
+
+    def note_write(self, endpoint: str, data=None, response=None) -> None:
+        if self.pin_s <= 0 or not self.replicas:
+            return
+        keys = pin_keys(endpoint, data)
+        created = CREATED.get(endpoint.rstrip("/"))
+        if created and isinstance(response, dict) and response.get("id"):
+            keys.add(f"{created}:{response['id']}")  # Newly created record
+        for key in keys:
+            self.pins[key] = True
+
+    def pinned(self, endpoint: str, params=None) -> bool:
+        return any(key in self.pins for key in pin_keys(endpoint, params))
+
+    # --- Balancing ---
+
+    def pick(self, endpoint: str, params=None) -> Optional[Replica]:
+        """The replica for this GET, or None to read from the primary."""
+        if not self.replicas:
+            return None
+        if self.pin_s > 0 and self.pinned(endpoint, params):
+            self.pinned_reads += 1
+            return None
+        now = time.monotonic()
+        candidates = [r for r in self.replicas if r.available(now)]
+        if not candidates:
+            self.primary_reads += 1
+            return None
+        return min(candidates, key=lambda r: (r.in_flight + 1) * r.latency_ms)
+
+    def record(self, replica: Replica, ok: bool, latency_ms: float) -> None:
+        replica.record(ok, latency_ms, self.eject_failures, self.eject_s)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": [{"url": r.url, "healthy": r.available(now), "in_flight": r.in_flight,
+                          "latency_ms": round(r.latency_ms, 2), "served": r.served, "errors": r.errors}
+                         for r in self.replicas],
+            "pinned_records": len(self.pins),
+            "pinned_reads": self.pinned_reads,
+            "primary_reads": self.primary_reads,
+            "fallbacks": self.fallbacks,
+        }
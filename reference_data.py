@@ -0,0 +1,284 @@
+"""
+Reference data with a persistent warm-start snapshot.
+
+Slow-changing DBOps lists (doctor registry, clinics, procedures, insurance
+providers, payment methods, visit fees) are kept in memory and served
+stale-while-revalidate: a request never waits on DBOps unless the entry has
+never been fetched. The store is written to disk periodically and on
+shutdown, and loaded at startup so a new pod's first requests hit warm data;
+snapshot entries are then re-fetched in the background and replaced only if
+the SHA-256 digest of their content changed. DBOps sends no ETag, so every
+revalidation is a full GET; the digest only spares rewriting the snapshot
+and logging a change when nothing changed.
+
+Stale data has a limit: an entry fetched more than MCP_REFERENCE_MAX_STALE_S
+ago (snapshot entries included) is not served. The read waits for DBOps, and
+fails if DBOps cannot answer.
+
+MCP_SNAPSHOT_PATH          Snapshot file (default "reference_snapshot.bin").
+MCP_SNAPSHOT_INTERVAL_S    Seconds between refresh checks / snapshot writes (default 300).
+MCP_REFERENCE_MAX_STALE_S  Age past which an entry must be re-fetched before it is served (default 172800).
+
+Snapshot format: MAGIC | format version (u16) | crc32 (u32) | zlib(JSON).
+Files with another magic/version or a bad checksum are ignored.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, Optional
+
+from caches import register_cache
+
+logger = logging.getLogger("dbops-mcp.reference")
+
+SNAPSHOT_PATH = os.getenv("MCP_SNAPSHOT_PATH", "reference_snapshot.bin")
+SNAPSHOT_INTERVAL_S = float(os.getenv("MCP_SNAPSHOT_INTERVAL_S", "300"))
+MAX_STALE_S = float(os.getenv("MCP_REFERENCE_MAX_STALE_S", "172800"))
+
+MAGIC = b"CBRD"
+FORMAT_VERSION = 2   # 2: entries carry "digest" (was "etag")
+_HEADER = struct.Struct(">4sHI")
+
+# name -> (DBOps endpoint, max age in seconds before a background refresh)
+REFERENCE_ENDPOINTS: Dict[str, tuple] = {
+    "doctors": ("/doctors", 7200),
+    "clinics": ("/clinics", 86400),
+    "procedures": ("/procedures", 86400),
+    "insurance_providers": ("/clinics/insurance/providers", 86400),
+    "payment_methods": ("/clinics/payment/methods", 86400),
+    "visit_fees": ("/clinics/visit-fees", 86400),
+}
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:16]
+
+
+class Entry:
+    def __init__(self, value, digest: str, fetched_at: float, from_snapshot: bool = False):
+        self.value = value
+        self.digest = digest
+        self.fetched_at = fetched_at
+        self.from_snapshot = from_snapshot   # Not yet confirmed against DBOps since startup
+
+
+class ReferenceStore:
+    def __init__(self, endpoints: Dict[str, tuple] = None):
+        self.endpoints = endpoints or REFERENCE_ENDPOINTS
+        self.entries: Dict[str, Entry] = {}
+        # name -> async callable replacing the plain GET (e.g. clinics fanned out across shards)
+        self.fetchers: Dict[str, Callable[[], Awaitable]] = {}
+        self.dirty = False
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.expired = 0
+
+    # --- Reads ---
+
+    async def get(self, name: str):
+        entry = self.entries.get(name)
+        if entry is None:
+            self.misses += 1
+            return await self.refresh(name)
+        age = time.time() - entry.fetched_at
+        if age > MAX_STALE_S:
+            self.expired += 1
+            return await self.refresh(name)
+        self.hits += 1
+        if entry.from_snapshot or age > self.endpoints[name][1]:
+            self.stale_served += 1
+            self.refresh_in_background(name)
+        return entry.value
+
+    # --- Refresh ---
+
+    def _start_fetch(self, name: str) -> asyncio.Future:
+        """At most one DBOps request per entry at a time; concurrent readers share it."""
+        task = self._refreshing.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(name))
+            self._refreshing[name] = task
+            task.add_done_callback(lambda t: self._done(name, t))
+        return task
+
+    async def refresh(self, name: str):
+        """Fetches `name` from DBOps and returns the value."""
+        return await asyncio.shield(self._start_fetch(name))
+
+    def refresh_in_background(self, name: str) -> None:
+        self._start_fetch(name)
+
+    def _done(self, name: str, task: asyncio.Task) -> None:
+        self._refreshing.pop(name, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Refresh of %s failed: %s", name, task.exception())
+
+    async def _fetch(self, name: str):
+        fetcher = self.fetchers.get(name)
+        if fetcher is not None:
+            value = await fetcher()
+        else:
+            from dependencies import dbops
+            value = await dbops.get(self.endpoints[name][0])
+        digest = _digest(value)
+        previous = self.entries.get(name)
+        if previous is not None and previous.digest == digest:
+            previous.fetched_at = time.time()
+            previous.from_snapshot = False
+            return previous.value
+        self.entries[name] = Entry(value, digest, time.time())
+        self.dirty = True
+        if previous is not None:
+            logger.info("Reference data %s changed (%s -> %s)", name, previous.digest, digest)
+        return value
+
+    def invalidate(self, name: str) -> None:
+        """Forces the next read of `name` to go to DBOps (e.g. after a write)."""
+        if self.entries.pop(name, None) is not None:
+            self.dirty = True
+
+    def apply_change(self, name: str, op: str, record_id: Optional[str], record: Optional[dict]) -> None:
+        """
+        Applies a DBOps change event (see change_feed.py). With the changed record
+        the cached list is patched in place; otherwise the entry is re-fetched.
+        """
+        entry = self.entries.get(name)
+        if entry is None:
+            return  # Not cached yet: the next read fetches current data
+        if record_id is None or not isinstance(entry.value, list) or (op != "deleted" and record is None):
+            self.invalidate(name)
+            self._refresh_if_running(name)
+            return
+        value = [r for r in entry.value if not (isinstance(r, dict) and str(r.get("id")) == record_id)]
+        if op != "deleted":
+            position = next((i for i, r in enumerate(entry.value)
+                             if isinstance(r, dict) and str(r.get("id")) == record_id), len(value))
+            value.insert(position, record)
+        entry.value = value
+        entry.digest = _digest(value)
+        self.dirty = True
+
+    def _refresh_if_running(self, name: str) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.refresh_in_background(name)
+
+    # --- Snapshot ---
+
+    def dump(self) -> bytes:
+        body = json.dumps({
+            "written_at": time.time(),
+            "entries": {name: {"digest": e.digest, "fetched_at": e.fetched_at, "value": e.value}
+                        for name, e in self.entries.items()},
+        }, separators=(",", ":")).encode()
+        payload = zlib.compress(body, 6)
+        return _HEADER.pack(MAGIC, FORMAT_VERSION, zlib.crc32(payload)) + payload
+
+    def load(self, blob: bytes) -> int:
+        """Loads snapshot bytes. Returns the number of entries restored (0 if rejected)."""
+        if len(blob) < _HEADER.size:
+            return 0
+        magic, version, crc = _HEADER.unpack_from(blob)
+        payload = blob[_HEADER.size:]
+        if magic != MAGIC or version != FORMAT_VERSION or zlib.crc32(payload) != crc:
+            logger.warning("Ignoring reference snapshot (format or checksum mismatch)")
+            return 0
+        data = json.loads(zlib.decompress(payload))
+        restored = 0
+        for name, raw in data["entries"].items():
+            if name in self.endpoints and name not in self.entries:
+                self.entries[name] = Entry(raw["value"], raw["digest"], raw["fetched_at"], from_snapshot=True)
+                restored += 1
+        return restored
+
+    def save(self, path: str = None) -> None:
+        path = path or SNAPSHOT_PATH
+        # A temp file of its own, so workers saving at the same moment never write into each other's
+        fd, tmp = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.dump())
+            os.replace(tmp, path)  # Readers never see a half-written file
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.dirty = False
+
+    def load_file(self, path: str = None) -> int:
+        path = path or SNAPSHOT_PATH
+        try:
+            with open(path, "rb") as f:
+                restored = self.load(f.read())
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, zlib.error) as e:
+            logger.warning("Could not read reference snapshot %s: %s", path, e)
+            return 0
+        logger.info("Warm start: %s reference entries loaded from %s", restored, path)
+        return restored
+
+    # --- Lifecycle ---
+
+    async def start(self) -> None:
+        self.load_file()
+        # Confirm snapshot entries against DBOps without blocking startup
+        for name, entry in list(self.entries.items()):
+            if entry.from_snapshot:
+                self.refresh_in_background(name)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL_S)
+            now = time.time()
+            for name, entry in list(self.entries.items()):
+                if now - entry.fetched_at > self.endpoints[name][1]:
+                    self.refresh_in_background(name)
+            if self.dirty:
+                self._save_quietly()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.entries:
+            self._save_quietly()
+
+    def _save_quietly(self) -> None:
+        try:
+            self.save()
+        except OSError as e:
+            logger.error("Could not write reference snapshot: %s", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "snapshot",
+            "size": len(self.entries),
+            "maxsize": len(self.endpoints),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+# Global instance
+reference_store = register_cache("reference_data", ReferenceStore())
@@ -0,0 +1,221 @@
+"""
+Token-budgeted shaping of list-heavy resource responses.
+
+History resources (SOAP note versions, treatment plans, medication history,
+pre-visit questionnaires) can return hundreds of records, all of which the
+model then has to read. A resource opts in by rendering its DBOps list with
+`shape()` and accepting the `max_tokens`, `max_bytes` and `cursor` query
+parameters, e.g. `clinical://soap/history/appt-1{?max_tokens,max_bytes,cursor}`
+read as `clinical://soap/history/appt-1?max_tokens=800`.
+
+Shaping, in order:
+
+1. Newest first: items are sorted by their first date-like field (RECENCY_FIELDS).
+2. Field elision: empty values are dropped. An item that does not fit gets
+   its long strings clipped to MCP_SHAPE_FIELD_CHARS, then is cut down to the
+   resource's priority fields, then has its strings clipped to a headline.
+3. Truncation: items are added one line each until the budget is spent. The
+   response ends with "N more items" and a cursor; reading again with
+   `?cursor=<cursor>` continues from there. A page always holds at least one
+   item, so paging makes progress under any budget.
+
+The cursor names the last item shown (its sort key and id), not a position,
+so records added or removed between reads do not shift the next page: it
+resumes after that item, or, if it is gone, at the first item not newer.
+
+Sizes are estimated locally: tokens as characters / 4, bytes as UTF-8 length.
+Without max_tokens or max_bytes the default budget applies; 0 lifts the limit.
+
+MCP_RESPONSE_TOKENS    Budget when the caller gives none (default 4000, 0 = unlimited).
+MCP_SHAPE_FIELD_CHARS  Length long text fields are clipped to when an item is elided (default 400).
+"""
+import base64
+import hashlib
+import logging
+import os
+from typing import Any, Iterable, List, Optional
+
+import fast_json
+
+logger = logging.getLogger("dbops-mcp.response-shaping")
+
+DEFAULT_TOKENS = int(os.getenv("MCP_RESPONSE_TOKENS", "4000"))
+FIELD_CHARS = int(os.getenv("MCP_SHAPE_FIELD_CHARS", "400"))
+CHARS_PER_TOKEN = 4
+HEADLINE_CHARS = 60
+
+# Newest first by the first of these present in an item
+RECENCY_FIELDS = ("updated_at", "updatedAt", "created_at", "createdAt", "submitted_at", "submittedAt",
+                  "date", "start_date", "startDate", "version")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class Budget:
+    """What the caller can take: tokens (estimated), bytes, or both. None = unlimited."""
+
+    def __init__(self, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None):
+        if max_tokens is None and max_bytes is None and DEFAULT_TOKENS > 0:
+            max_tokens = DEFAULT_TOKENS
+        self.max_tokens = max_tokens if max_tokens and max_tokens > 0 else None
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self.tokens = 0
+        self.bytes = 0
+
+    def fits(self, text: str) -> bool:
+        if self.max_tokens is not None and self.tokens + estimate_tokens(text) > self.max_tokens:
+            return False
+        return self.max_bytes is None or self.bytes + len(text.encode()) <= self.max_bytes
+
+    def spend(self, text: str) -> None:
+        self.tokens += estimate_tokens(text)
+        if self.max_bytes is not None:
+            self.bytes += len(text.encode())
+
+
+def _recency(item: Any) -> Any:
+    if isinstance(item, dict):
+        for field in RECENCY_FIELDS:
+            if item.get(field) is not None:
+                return item[field]
+    return None
+
+
+def _ranked(items: List[Any]) -> List[tuple]:
+    """(sort key, item) pairs by recency, items without a date-like field last; input order kept among equals."""
+    keyed = [(_recency(item), item) for item in items]
+    present = [key for key, _ in keyed if key is not None]
+    numeric = bool(present) and all(isinstance(key, (int, float)) for key in present)
+    blank = 0 if numeric else ""
+    ranked = [([key is not None, blank if key is None else key if numeric else str(key)], item)
+              for key, item in keyed]
+    return sorted(ranked, key=lambda pair: pair[0], reverse=True)
+
+
+def newest_first(items: List[Any]) -> List[Any]:
+    """Sorted by recency, items without a date-like field last; input order kept among equals."""
+    return [item for _, item in _ranked(items)]
+
+
+def _item_id(item: Any) -> str:
+    """The item's "id", or a digest of its content for records without one."""
+    if isinstance(item, dict) and item.get("id") is not None:
+        return str(item["id"])
+    return hashlib.sha1(fast_json.dumps(item, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _encode_cursor(sort_key: list, item_id: str) -> str:
+    return base64.urlsafe_b64encode(fast_json.dumps([sort_key, item_id]).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Optional[tuple]:
+    """(sort key, id) of the last item shown, or None for a cursor this module did not issue."""
+    try:
+        sort_key, item_id = fast_json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        return None
+    if not (isinstance(sort_key, list) and len(sort_key) == 2 and isinstance(item_id, str)):
+        return None
+    return sort_key, item_id
+
+
+def _resume(ranked: List[tuple], sort_key: list, item_id: str) -> Optional[int]:
+    """Index just after the cursor's item; if it is gone, the first item not newer than it."""
+    for index, (key, item) in enumerate(ranked):
+        if key == sort_key and _item_id(item) == item_id:
+            return index + 1
+    try:
+        return next((index for index, (key, _) in enumerate(ranked) if not key > sort_key), len(ranked))
+    except TypeError:
+        return None    # Sort key of another kind (e.g. a date where versions are numbered)
+
+
+def _compact(value: Any) -> Any:
+    """Without empty values (None, "", [], {})."""
+    if isinstance(value, dict):
+        return {k: _compact(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    return value
+
+
+def _clip(value: Any, chars: int) -> Any:
+    if isinstance(value, str):
+        return value if len(value) <= chars else value[:chars].rstrip() + "…"
+    if isinstance(value, dict):
+        return {k: _clip(v, chars) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clip(v, chars) for v in value]
+    return value
+
+
+def _renderings(item: Any, priority: Iterable[str]):
+    """The item as one line, then progressively shorter; the second value says whether anything was elided."""
+    item = _compact(item)
+    yield fast_json.dumps(item), False
+    clipped = _clip(item, FIELD_CHARS)
+    if clipped != item:
+        yield fast_json.dumps(clipped), True
+    if isinstance(item, dict) and priority:
+        essentials = {k: clipped[k] for k in priority if k in clipped}
+        if essentials and essentials != clipped:
+            clipped = essentials
+            yield fast_json.dumps(essentials), True
+    headline = _clip(clipped, HEADLINE_CHARS)   # Last resort, for a budget smaller than one item
+    if headline != clipped:
+        yield fast_json.dumps(headline), True
+
+
+def shape(title: str, items: Any, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None,
+          cursor: Optional[str] = None, priority: Iterable[str] = ()) -> str:
+    """
+    `title`, then one line per item that fits the budget, newest first.
+    `priority` names the fields kept when an item has to be cut down.
+    """
+    if isinstance(items, dict):
+        items = [items]
+    elif not isinstance(items, list):
+        items = [] if items is None else [items]
+    ranked = _ranked(items)
+    offset = 0
+    if cursor:
+        after = _decode_cursor(cursor)
+        offset = _resume(ranked, *after) if after else None
+        if offset is None:
+            return f"Error: Invalid cursor '{cursor}'."
+    ranked = ranked[offset:]
+    if not ranked:
+        return f"{title}\nNo more items." if cursor else f"{title}\nNo items."
+
+    budget = Budget(max_tokens, max_bytes)
+    budget.spend(title)
+    lines, elided = [title], 0
+    for _, item in ranked:
+        fitting = None
+        for line, shortened in _renderings(item, priority):
+            fitting = (line, shortened)
+            if budget.fits(line):
+                break
+        else:
+            if len(lines) > 1:
+                break    # Next page; the first item of a page is always shown
+        line, shortened = fitting
+        budget.spend(line)
+        lines.append(line)
+        elided += shortened
+
+    shown = len(lines) - 1
+    rest = len(ranked) - shown
+    notes = []
+    if elided:
+        notes.append(f"{elided} item(s) shortened to fit")
+    if rest:
+        last_key, last_item = ranked[shown - 1]
+        next_cursor = _encode_cursor(last_key, _item_id(last_item))
+        notes.append(f"{rest} more items (cursor: {next_cursor}; read again with ?cursor={next_cursor})")
+        logger.debug("Shaped %s: %s items shown, %s left", title, shown, rest)
+    if notes:
+        lines.append("… " + "; ".join(notes))
+    return "\n".join(lines)
@@ -1,4 +1,129 @@
+from contextlib import asynccontextmanager
+from admission import AdmissionMiddleware
+from change_feed import change_feed
 from fastmcp import FastMCP
+from fastmcp.server.context import Context
+from health import health_monitor, livez, readyz
+from idempotency import IdempotencyMiddleware
+from manifests import make_manifest_route, manifest_cache
+from plugins import LazyFamilyMiddleware
+from profiling import SlowCallMiddleware
+from sessions import SessionExposureMiddleware
+from tracing import TracingMiddleware
+
+
+class CareBotMCP(FastMCP):
+    """
+    FastMCP with a registry version counter.
+    Every tool/resource (un)registration bumps `registry_version`, so derived
+    structures (e.g. the capability index) know when they must be rebuilt.
+    """
+    registry_version: int = 0
+    # Modules of families switched off by config (see plugins.py). They can still
+    # be imported as helpers of another family; their components then register disabled.
+    hidden_modules: frozenset = frozenset()
+
+    def _on_register(self, component) -> None:
+        self.registry_version += 1
+        if getattr(getattr(component, "fn", None), "__module__", None) in self.hidden_modules:
+            component.disable()
+
+    def add_tool(self, tool):
+        self._on_register(tool)
+        return super().add_tool(tool)
+
+    def remove_tool(self, name: str) -> None:
+        self.registry_version += 1
+        return super().remove_tool(name)
+
+    def add_resource(self, resource):
+        self._on_register(resource)
+        return super().add_resource(resource)
+
+    def add_template(self, template):
+        self._on_register(template)
+        return super().add_template(template)
+
+    # --- Cached list serialization ---
+    # Converting a component into its MCP schema is pure for a given registry
+    # version: each conversion is done once, and whole lists are served from
+    # precomputed manifests shared by every session (see manifests.py).
+    _sdk_cache: dict = {}
+    _sdk_cache_version: int = -1
+
+    def _sdk_convert(self, kind: str, component, convert):
+        if self._sdk_cache_version != self.registry_version:
+            self._sdk_cache = {}
+            self._sdk_cache_version = self.registry_version
+        sdk = self._sdk_cache.get((kind, component.key))
+        if sdk is None:
+            sdk = convert()
+            self._sdk_cache[(kind, component.key)] = sdk
+        return sdk
+
+    def _sdk_tool(self, tool):
+        return self._sdk_convert("tools", tool, lambda: tool.to_mcp_tool(
+            name=tool.key, include_fastmcp_meta=self.include_fastmcp_meta))
+
+    def _sdk_resource(self, resource):
+        return self._sdk_convert("resources", resource, lambda: resource.to_mcp_resource(
+            uri=resource.key, include_fastmcp_meta=self.include_fastmcp_meta))
+
+    def _sdk_template(self, template):
+        return self._sdk_convert("templates", template, lambda: template.to_mcp_template(
+            uriTemplate=template.key, include_fastmcp_meta=self.include_fastmcp_meta))
+
+    async def _list_tools_mcp(self):
+        async with Context(fastmcp=self):
+            tools = await self._list_tools_middleware()
+            return manifest_cache.get(self, "tools", tools, self._sdk_tool).items
+
+    async def _list_resources_mcp(self):
+        async with Context(fastmcp=self):
+            resources = await self._list_resources_middleware()
+            return manifest_cache.get(self, "resources", resources, self._sdk_resource).items
+
+    async def _list_resource_templates_mcp(self):
+        async with Context(fastmcp=self):
+            templates = await self._list_resource_templates_middleware()
+            return manifest_cache.get(self, "templates", templates, self._sdk_template).items
+
+
+@asynccontextmanager
+async def lifespan(server: CareBotMCP):
+    """Startup/shutdown hook. Imports are local because these modules import `mcp`."""
+    from capabilities import capability_index
+    from manifests import KINDS, full_manifest
+    from reference_data import reference_store
+    await capability_index.refresh(server)
+    for kind in KINDS:
+        await full_manifest(server, kind)
+    from patient_registry import patient_registry
+    from write_behind import communication_logs
+    await reference_store.start()
+    patient_registry.start()
+    communication_logs.start()
+    change_feed.start()
+    health_monitor.start()
+    try:
+        yield {}
+    finally:
+        await health_monitor.stop()
+        await change_feed.stop()
+        await communication_logs.stop()  # Flush queued logs (spilled to disk if DBOps is down)
+        await patient_registry.stop()
+        await reference_store.stop()
+
 
 # Define the server here so everyone can grab it safely
-mcp = FastMCP("CareBot-DBOps-MCP")
\ No newline at end of file
+mcp = CareBotMCP("CareBot-DBOps-MCP", lifespan=lifespan)
+mcp.add_middleware(TracingMiddleware())  # Outermost, so spans cover the other middleware
+mcp.add_middleware(LazyFamilyMiddleware())  # Before admission, which classifies calls by family
+mcp.add_middleware(AdmissionMiddleware())  # Before anything that can reach DBOps
+mcp.add_middleware(SlowCallMiddleware())
+mcp.add_middleware(IdempotencyMiddleware())
+mcp.add_middleware(SessionExposureMiddleware())
+mcp.custom_route("/manifest/{kind}", methods=["GET"])(make_manifest_route(mcp))
+mcp.custom_route("/livez", methods=["GET"])(livez)
+mcp.custom_route("/readyz", methods=["GET"])(readyz)
+mcp.custom_route("/events/dbops", methods=["POST"])(change_feed.webhook)
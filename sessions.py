@@ -0,0 +1,84 @@
+"""
+Session-scoped capability injection.
+
+MCP_TOOL_EXPOSURE  "dynamic" (default): each session starts with CORE_TOOLS only
+                   and unlocks whole families as search_staff_tools routes to
+                   them. "full": every session sees every tool (legacy).
+
+Hidden tools are only omitted from tools/list; calling one by name still works,
+so clients that already know a tool name are not broken.
+
+With MCP_MODE=stateless-http every request may land on a different replica and
+gets a fresh session, so there is nothing to unlock into: every session sees
+every tool, exactly as with MCP_TOOL_EXPOSURE=full.
+"""
+import logging
+import os
+from typing import Iterable, List
+
+from cachetools import TTLCache
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+logger = logging.getLogger("dbops-mcp.sessions")
+
+EXPOSURE_MODE = os.getenv("MCP_TOOL_EXPOSURE", "dynamic").lower()
+STATELESS_HTTP = os.getenv("MCP_MODE", "").lower() == "stateless-http"
+
+# Always listed: enough to diagnose, discover capabilities and identify the patient
+CORE_TOOLS = frozenset({"check_system_health", "search_staff_tools", "resolve_patient_by_phone", "search_patients"})
+
+# session_id -> frozenset of unlocked families. Idle sessions age out after 12 hours.
+session_families: TTLCache = TTLCache(maxsize=10000, ttl=43200)
+
+
+def dynamic_exposure_enabled() -> bool:
+    return EXPOSURE_MODE == "dynamic" and not STATELESS_HTTP
+
+
+def _session_id(ctx) -> str | None:
+    if ctx is None:
+        return None
+    try:
+        return ctx.session_id
+    except RuntimeError:
+        # No MCP session (e.g. direct in-process call)
+        return None
+
+
+def unlocked_families(session_id: str) -> frozenset:
+    return session_families.get(session_id, frozenset())
+
+
+def unlock(session_id: str, families: Iterable[str]) -> List[str]:
+    """Adds families to a session. Returns the ones that were not unlocked yet."""
+    current = unlocked_families(session_id)
+    new = {f for f in families if f != "system"} - current
+    # Re-set even when nothing changed so an active session's TTL is refreshed
+    session_families[session_id] = current | new
+    return sorted(new)
+
+
+async def unlock_for_context(ctx, families: Iterable[str]) -> List[str]:
+    """Unlocks families for the calling session and tells the client its tool list changed."""
+    session_id = _session_id(ctx)
+    if not dynamic_exposure_enabled() or session_id is None:
+        return []
+    new = unlock(session_id, families)
+    if new:
+        logger.info("Session %s unlocked families: %s", session_id[:8], ", ".join(new))
+        await ctx.send_tool_list_changed()
+    return new
+
+
+class SessionExposureMiddleware(Middleware):
+    """Filters tools/list down to the core set plus the session's unlocked families."""
+
+    async def on_list_tools(self, context: MiddlewareContext, call_next):
+        tools = await call_next(context)
+        session_id = _session_id(context.fastmcp_context)
+        if not dynamic_exposure_enabled() or session_id is None:
+            return tools
+
+        from capabilities import family_of
+        families = unlocked_families(session_id)
+        return [t for t in tools if t.key in CORE_TOOLS or family_of(t) in families]
@@ -0,0 +1,231 @@
+"""
+Clinic-aware routing across regional DBOps deployments.
+
+DB_OPS_URL stays the primary deployment: it serves everything that is not
+clinic-scoped, plus any clinic no shard claims. MCP_DBOPS_SHARDS adds regional
+deployments, each with its own connection pool:
+
+MCP_DBOPS_SHARDS   e.g. "ksa=http://dbops-ksa:3000,oman=http://dbops-om:3000".
+MCP_CLINIC_SHARDS  Optional pins, e.g. "clinic-17=ksa". Every other clinic is
+                   routed to the deployment that lists it: the clinic list is
+                   fanned out to every deployment (primary included) whenever
+                   it is fetched, which also builds the clinic -> shard map.
+
+Clinic-scoped calls use `await shard_router.client_for(clinic_id)`.
+Cross-shard reads use `fan_out()` and a merge helper. With no shards
+configured, every call goes to the primary exactly as before.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from dependencies import DBOpsClient, dbops
+from reference_data import reference_store
+
+logger = logging.getLogger("dbops-mcp.sharding")
+
+PRIMARY = "primary"
+
+# Numeric fields with these words in their name are averaged across shards, not summed
+_AVERAGED = ("avg", "average", "rate", "percent", "ratio")
+# An average is weighted by a count beside it (appointmentCount, total_reminders, ...): a field
+# naming one of these words and none of the money words
+_WEIGHTS = ("count", "total", "number")
+_NOT_WEIGHTS = ("revenue", "amount", "value", "price", "fee", "cost", "paid")
+# Row fields that identify a group rather than measure it (besides the group key and *_id / *Id fields)
+_IDENTITY = ("id", "year", "quarter", "month", "week", "day", "date", "hour")
+
+
+def _parse_pairs(raw: Optional[str]) -> Dict[str, str]:
+    pairs = {}
+    for item in (raw or "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+class ShardRouter:
+    def __init__(self, primary: DBOpsClient, shards: Dict[str, str] = None, pins: Dict[str, str] = None):
+        self.clients: Dict[str, DBOpsClient] = {PRIMARY: primary}
+        for name, url in (shards or {}).items():
+            self.add_shard(name, DBOpsClient(base_url=url))
+        self.pins = dict(pins or {})
+        self.clinic_shards: Dict[str, str] = {}
+        self._discovered = False
+
+    def add_shard(self, name: str, client: DBOpsClient) -> None:
+        self.clients[name] = client
+        self._discovered = False
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.clients) > 1
+
+    @property
+    def primary(self) -> DBOpsClient:
+        return self.clients[PRIMARY]
+
+    # --- Routing ---
+
+    def shard_of(self, clinic_id: str) -> str:
+        shard = self.pins.get(clinic_id) or self.clinic_shards.get(clinic_id) or PRIMARY
+        if shard not in self.clients:
+            logger.warning("Clinic %s pinned to unknown shard %s, using the primary", clinic_id, shard)
+            return PRIMARY
+        return shard
+
+    async def client_for(self, clinic_id: Optional[str]) -> DBOpsClient:
+        """The DBOps deployment that owns `clinic_id` (the primary when unknown)."""
+        if not self.sharded or not clinic_id:
+            return self.primary
+        known = clinic_id in self.pins or clinic_id in self.clinic_shards
+        if not known and not self._discovered:
+            await reference_store.refresh("clinics")  # Fans out and learns the map
+        return self.clients[self.shard_of(str(clinic_id))]
+
+    # --- Cross-shard reads ---
+
+    async def fan_out(self, endpoint: str, params: dict = None, allow_partial: bool = False) -> Dict[str, Any]:
+        """GETs `endpoint` from every deployment concurrently. Returns shard name -> response."""
+        names = list(self.clients)
+        results = await asyncio.gather(*[self.clients[n].get(endpoint, params=params) for n in names],
+                                       return_exceptions=True)
+        answered = {n: r for n, r in zip(names, results) if not isinstance(r, BaseException)}
+        failed = {n: r for n, r in zip(names, results) if isinstance(r, BaseException)}
+        if failed:
+            if not allow_partial or not answered:
+                raise next(iter(failed.values()))
+            logger.warning("%s: shards %s did not answer, returning partial results",
+                           endpoint, ", ".join(sorted(failed)))
+        return answered
+
+    async def fetch_clinics(self) -> List[dict]:
+        """Every deployment's clinics, merged; records which shard owns each clinic."""
+        merged, owners = [], {}
+        for shard, clinics in (await self.fan_out("/clinics", allow_partial=True)).items():
+            for clinic in clinics or []:
+                clinic_id = str(clinic.get("id")) if isinstance(clinic, dict) and clinic.get("id") is not None else None
+                if clinic_id is not None:
+                    if clinic_id in owners:
+                        continue  # Listed by two deployments: the first (primary) wins
+                    owners[clinic_id] = shard
+                merged.append(clinic)
+        self.clinic_shards = owners
+        self._discovered = True
+        return merged
+
+    def stats(self) -> dict:
+        return {
+            "shards": {name: {"base_url": client.base_url,
+                              "clinics": sum(1 for s in self.clinic_shards.values() if s == name),
+                              "pool": client.pool_stats()}
+                       for name, client in self.clients.items()},
+            "pinned_clinics": len(self.pins),
+        }
+
+
+# --- Merging cross-shard responses ---
+
+def merge_sum(values: Iterable[Any]) -> Any:
+    """
+    Rolls up report objects: numbers are summed, dicts are merged key by key,
+    lists are concatenated. Avg/rate/percent fields are averaged weighted by a
+    count field in the same object; without one the shards' values cannot be
+    combined, and the field is left out rather than reported wrong.
+    """
+    values = [v for v in values if v is not None]
+    if len(values) <= 1:
+        return values[0] if values else None
+    return _merge(values, "")
+
+
+def _merge(values: List[Any], field: str) -> Any:
+    first = values[0]
+    if isinstance(first, bool) or not isinstance(first, (int, float, dict, list)):
+        return first
+    if isinstance(first, (int, float)):
+        return sum(v for v in values if _is_number(v))
+    if isinstance(first, dict):
+        dicts = [v for v in values if isinstance(v, dict)]
+        merged = {}
+        for k in dict.fromkeys(k for v in dicts for k in v):
+            having = [v for v in dicts if k in v]
+            if _averaged(k) and _is_number(having[0][k]):
+                average = _weighted_average(having, k)
+                if average is not None:
+                    merged[k] = average
+            else:
+                merged[k] = _merge([v[k] for v in having], k)
+        return merged
+    return [item for v in values if isinstance(v, list) for item in v]
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _averaged(field: str) -> bool:
+    return any(word in field.lower() for word in _AVERAGED)
+
+
+def _weighted_average(objects: List[dict], field: str) -> Optional[float]:
+    """`field` averaged over `objects`, weighted by their count field; None when there is none."""
+    for key in objects[0]:
+        name = key.lower()
+        if (key == field or _averaged(key) or not any(w in name for w in _WEIGHTS)
+                or any(w in name for w in _NOT_WEIGHTS)):
+            continue
+        if all(_is_number(o.get(key)) and _is_number(o[field]) for o in objects):
+            total = sum(o[key] for o in objects)
+            return sum(o[field] * o[key] for o in objects) / total if total else None
+    logger.debug("No count field to weight %s by; left out of the merged report", field)
+    return None
+
+
+def _is_measure(field: str, key: str, measures: Optional[Iterable[str]]) -> bool:
+    if measures is not None:
+        return field in measures
+    name = field.lower()
+    return not (field == key or name in _IDENTITY or name.endswith("_id") or field.endswith("Id"))
+
+
+def _merge_rows(rows: List[dict], key: str, measures: Optional[Iterable[str]]) -> dict:
+    """One row for a group: identity fields from the first shard's row, measures rolled up."""
+    identity = {k: v for k, v in rows[0].items() if not _is_measure(k, key, measures)}
+    measured = merge_sum([{k: v for k, v in row.items() if _is_measure(k, key, measures)} for row in rows])
+    return {**identity, **measured}
+
+
+def merge_grouped(values: Iterable[List[dict]], key: str, measures: Optional[Iterable[str]] = None) -> List[dict]:
+    """
+    Concatenates per-shard rows and rolls up rows that share `key` (e.g. the same month).
+    Only `measures` are rolled up; without a list, every field but the key, ids and
+    date parts (year, month, ...), which are taken from the first row.
+    """
+    values = list(values)
+    if len(values) == 1:
+        return values[0]
+    measures = frozenset(measures) if measures is not None else None
+    groups: Dict[Any, List[dict]] = {}
+    for rows in values:
+        for row in rows or []:
+            groups.setdefault(row.get(key), []).append(row)
+    return [_merge_rows(rows, key, measures) if len(rows) > 1 else rows[0] for rows in groups.values()]
+
+
+def merge_ranked(values: Iterable[List[dict]], by: str, key: Optional[str] = None,
+                 measures: Optional[Iterable[str]] = None) -> List[dict]:
+    """Re-ranks per-shard rankings by `by`, highest first (rows sharing `key` are rolled up first)."""
+    values = list(values)
+    if len(values) == 1:
+        return values[0]
+    rows = merge_grouped(values, key, measures) if key else [row for rows in values for row in rows or []]
+    return sorted(rows, key=lambda r: r.get(by) or 0, reverse=True)
+
+
+# Global instance
+shard_router = ShardRouter(dbops, _parse_pairs(os.getenv("MCP_DBOPS_SHARDS")),
+                           _parse_pairs(os.getenv("MCP_CLINIC_SHARDS")))
+reference_store.fetchers["clinics"] = shard_router.fetch_clinics
@@ -1,7 +1,9 @@
 from fastmcp import Context
 from dependencies import dbops
+from reference_data import reference_store
+from sharding import shard_router
 from tools.doctors import resolve_doctor_id
-from tools.patients import _resolve_patient_logic
+from tools.patients import resolve_patient_id
 from tools.models import AppointmentBase
 import logging
 from server import mcp
@@ -14,8 +16,8 @@ logger = logging.getLogger("dbops-mcp.appointments")
 # --- Helpers ---
 
 async def _get_default_clinic_id():
-    """Helper: Fetches the first available clinic ID if not provided."""
-    clinics = await dbops.get("/clinics")
+    """Helper: The first clinic in the network (all shards), from warm reference data."""
+    clinics = await reference_store.get("clinics")
     return clinics[0]['id'] if clinics else None
 
 async def resolve_last_appointment_id(patient_id: str) -> Optional[str]:
@@ -38,7 +40,7 @@ async def resolve_last_appointment_id(patient_id: str) -> Optional[str]:
         )
         return sorted_appts[0]['id']
     except Exception as e:
-        logger.error(f"Error resolving last appointment: {e}")
+        logger.error("Error resolving last appointment: %s", e)
         return None
 # --- MCP Resources (GET) ---
 
@@ -68,21 +70,19 @@ async def book_appointment(
     date: str,
     start_time: str,
     end_time: str,
-    notes: str = ""
+    notes: str = "",
+    clinic_id: Optional[str] = None
 ) -> str:
     """
     Tool: Books a new appointment using human names.
     Example: 'Book John Doe with Dr. Smith on 2025-12-25 at 10:00'
+    If clinic_id is not provided, the default (first) clinic is used.
     """
     # 1. Context Enrichment: Resolve both IDs in parallel
     doc_id = await resolve_doctor_id(doctor_name)
-    
-    pat_res = await _resolve_patient_logic(patient_name)
-    pat_id = None
-    if "Found:" in pat_res:
-        pat_id = pat_res.split("ID: ")[1].rstrip(")")
+    pat_id = await resolve_patient_id(patient_name)
         
-    clinic_id = await _get_default_clinic_id()
+    clinic_id = clinic_id or await _get_default_clinic_id()
 
     if not doc_id or not pat_id:
         return f"Error: Could not resolve IDs for {doctor_name} or {patient_name}."
@@ -99,7 +99,8 @@ async def book_appointment(
     }
 
     try:
-        res = await dbops.post("/appointments", data=payload)
+        client = await shard_router.client_for(clinic_id)
+        res = await client.post("/appointments", data=payload)
         return f" Appointment confirmed for {patient_name} with {doctor_name} on {date} at {start_time}."
     except Exception as e:
         return f" Failed to book appointment: {str(e)}"
@@ -1,6 +1,8 @@
 from fastmcp import Context
-from cachetools import TTLCache, cached
-from dependencies import dbops
+from caches import async_cached, make_cache
+from change_feed import on_change
+from reference_data import reference_store
+from sharding import shard_router
 from tools.models import Clinic
 from typing import List, Optional, Dict, Any
 import logging
@@ -10,12 +12,30 @@ from server import mcp
 logger = logging.getLogger("dbops-mcp.clinics")
 
 # Cache clinic info for 24 hours (very static data)
-clinic_cache = TTLCache(maxsize=10, ttl=86400)
+clinic_cache = make_cache("clinics", maxsize=10, ttl=86400)
+
+async def _fetch_raw_clinics() -> List[dict]:
+    """Internal: All clinics across every DBOps shard, served from warm reference data (see reference_data.py)."""
+    return await reference_store.get("clinics")
+
+@async_cached(clinic_cache)
+async def _fetch_clinic(clinic_id: str) -> dict:
+    """Internal: Raw API call for one clinic, to the DBOps deployment that owns it."""
+    client = await shard_router.client_for(clinic_id)
+    return await client.get(f"/clinics/{clinic_id}")
+
+@on_change("clinic")
+def _clinic_changed(event) -> None:
+    """Drops the changed clinic's details (the clinic list is reference data, patched by the feed)."""
+    if event.entity_id is None:
+        clinic_cache.clear()
+    else:
+        _fetch_clinic.invalidate(event.entity_id)
 
 @mcp.resource("clinics://all")
 async def get_all_clinics_resource() -> str:
     """Resource: List all clinics in the network."""
-    data = await dbops.get("/clinics")
+    data = await _fetch_raw_clinics()
     
     lines = [f"• {c['name']} ({c['city']}) - {c['phone']}" for c in data]
     return "Available Clinics:\n" + "\n".join(lines)
@@ -23,7 +43,7 @@ async def get_all_clinics_resource() -> str:
 @mcp.resource("clinics://details/{clinic_id}")
 async def get_clinic_details(clinic_id: str) -> str:
     """Resource: Get specific details for a clinic ID."""
-    c = await dbops.get(f"/clinics/{clinic_id}")
+    c = await _fetch_clinic(clinic_id)
     return (f"Clinic: {c['name']}\n"
             f"Address: {c['address']}, {c['city']}\n"
             f"Contact: {c['phone']} | {c['email']}")
@@ -37,14 +57,14 @@ async def get_clinic_info(clinic_id: Optional[str] = None) -> str:
     If clinic_id is provided, returns details for that clinic.
     If not, returns the first clinic's info (default).
     """
-    logger.info(f"Fetching clinic info. Clinic ID: {clinic_id if clinic_id else 'default'}")
+    logger.info("Fetching clinic info. Clinic ID: %s", clinic_id or "default")
     try:
         if clinic_id:
-            data = await dbops.get(f"/clinics/{clinic_id}")
+            data = await _fetch_clinic(clinic_id)
             return str(data)
         else:
             # If no clinic_id is provided, fetch the first clinic's info
-            clinics = await dbops.get("/clinics")
+            clinics = await _fetch_raw_clinics()
             if clinics and isinstance(clinics, list) and len(clinics) > 0:
                 return str(clinics[0])
             else:
@@ -57,7 +77,7 @@ async def get_clinic_info(clinic_id: Optional[str] = None) -> str:
 async def get_payment_methods() -> str:
     """Tool: Returns accepted payment methods from the clinic."""
     try:
-        data = await dbops.get("/clinics/payment/methods")
+        data = await reference_store.get("payment_methods")
         return str(data)
     except Exception as e:
         return f"Error fetching payment methods: {str(e)}"
@@ -66,7 +86,7 @@ async def get_payment_methods() -> str:
 async def get_visit_type_fees() -> str:
     """Tool: Get visit type fees from the clinic."""
     try:
-        data = await dbops.get("/clinics/visit-fees")
+        data = await reference_store.get("visit_fees")
         return str(data)
     except Exception as e:
         return f"Error fetching visit fees: {str(e)}"
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastmcp import Context
 from dependencies import dbops
-from tools.patients import resolve_patient_by_phone
+from tools.patients import resolve_patient_id
+from response_shaping import shape
 from tools.models import SoapNoteCreate, SoapNoteUpdate, TreatmentPlanCreate
 from typing import List, Optional, Dict, Any
 import logging
@@ -15,7 +16,7 @@ async def resolve_last_appointment_id(patient_name: str) -> Optional[str]:
     Context Enrichment: Finds the most recent appointment UUID for a patient.
     Essential for 'Add note to John's appointment' commands.
     """
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return None
     
     # Fetch all appointments and sort by date/time
@@ -56,11 +57,13 @@ async def get_latest_soap_note(patient_name: str) -> str:
     except Exception:
         return "No SOAP notes found for the last appointment."
 
-@mcp.resource("clinical://soap/history/{appointment_id}")
-async def get_soap_note_history(appointment_id: str) -> str:
-    """Resource: Get version history of SOAP notes for an appointment."""
+@mcp.resource("clinical://soap/history/{appointment_id}{?max_tokens,max_bytes,cursor}")
+async def get_soap_note_history(appointment_id: str, max_tokens: Optional[int] = None,
+                                max_bytes: Optional[int] = None, cursor: Optional[str] = None) -> str:
+    """Resource: Get version history of SOAP notes for an appointment, newest first, within a token/byte budget."""
     history = await dbops.get(f"/appointments/{appointment_id}/soap-notes/history")
-    return f"Version History:\n{history}"
+    return shape("Version History:", history, max_tokens, max_bytes, cursor,
+                 priority=("version", "updated_at", "assessment", "plan", "subjective"))
 
 # --- Tools ---
 
@@ -145,7 +148,7 @@ async def version_soap_note(
 @mcp.resource("clinical://plans/active/{patient_name}")
 async def get_active_treatment_plans(patient_name: str) -> str:
     """Resource: Get all ACTIVE treatment plans for a patient."""
-    pat_id = await resolve_patient_by_phone(patient_name)
+    pat_id = await resolve_patient_id(patient_name)
     if not pat_id: return f"Error: Patient '{patient_name}' not found."
 
     plans = await dbops.get(f"/treatment-plans/patient/{pat_id}", params={"status": "active"})
@@ -153,13 +156,16 @@ async def get_active_treatment_plans(patient_name: str) -> str:
     
     return f"Active Plans for {patient_name}:\n{plans}"
 
-@mcp.resource("clinical://plans/history/{patient_name}")
-async def get_treatment_plan_history(patient_name: str) -> str:
-    """Resource: Get full history of treatment plans."""
-    pat_id = await resolve_patient_by_phone(patient_name)
+@mcp.resource("clinical://plans/history/{patient_name}{?max_tokens,max_bytes,cursor}")
+async def get_treatment_plan_history(patient_name: str, max_tokens: Optional[int] = None,
+                                     max_bytes: Optional[int] = None, cursor: Optional[str] = None) -> str:
+    """Resource: Get full history of treatment plans, newest first, within a token/byte budget."""
+    pat_id = await resolve_patient_id(patient_name)
     if not pat_id: return f"Error: Patient '{patient_name}' not found."
 
-    return await dbops.get(f"/treatment-plans/patient/{pat_id}/history")
+    plans = await dbops.get(f"/treatment-plans/patient/{pat_id}/history")
+    return shape(f"Treatment Plan History for {patient_name}:", plans, max_tokens, max_bytes, cursor,
+                 priority=("id", "diagnosis", "status", "created_at"))
 
 @mcp.resource("clinical://plans/appointment/{appointment_id}")
 async def get_plan_by_appointment(appointment_id: str) -> str:
@@ -179,7 +185,7 @@ async def create_treatment_plan(
     Tool: Creates a new treatment plan with initial interventions.
     Automatically links to patient's last appointment.
     """
-    pat_id = await resolve_patient_by_phone(patient_name)
+    pat_id = await resolve_patient_id(patient_name)
     appt_id = await resolve_last_appointment_id(patient_name)
     
     if not pat_id or not appt_id:
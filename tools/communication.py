@@ -1,6 +1,7 @@
 from typing import Optional
 from server import mcp
 from dependencies import dbops
+from write_behind import WRITE_BEHIND, communication_logs
 
 @mcp.tool()
 async def add_communication_logs(
@@ -28,6 +29,11 @@ async def add_communication_logs(
         "intent": intent,
     }
     
+    if WRITE_BEHIND:
+        # Off the conversation's critical path: batched and retried in the background (see write_behind.py)
+        communication_logs.enqueue(payload)
+        return "✅ Logged to dashboard."
+
     try:
         # We try the standard v3 endpoint
         await dbops.post("/communication-logs", data=payload)
@@ -1,19 +1,16 @@
 from fastmcp import Context
-from cachetools import TTLCache, cached
+from reference_data import reference_store
 from dependencies import dbops
-from tools.models import DoctorBase, Availability
+from tools.models import DoctorBase, Availability, validate_list, validate_registry
 from typing import List, Optional, Dict, Any
 import logging
 from server import mcp
 
 logger = logging.getLogger("dbops-mcp.doctors")
 
-# 2-hour cache for the full staff registry
-doctors_cache = TTLCache(maxsize=1, ttl=7200)
-
 async def _fetch_raw_doctors() -> List[dict]:
-    """Internal: Raw API call to get all doctors."""
-    return await dbops.get("/doctors")
+    """Internal: Full staff registry. Warm reference data, refreshed every 2 hours (see reference_data.py)."""
+    return await reference_store.get("doctors")
 
 async def resolve_doctor_id(name: str) -> Optional[str]:
     """
@@ -33,7 +30,7 @@ async def resolve_doctor_id(name: str) -> Optional[str]:
 async def _get_doctors_list_logic() -> str:
     """Internal logic helper to avoid calling decorated objects."""
     data = await _fetch_raw_doctors()
-    doctors = [DoctorBase(**d) for d in data]
+    doctors = validate_registry("doctors", DoctorBase, data)
     
     lines = [f"- {d.first_name} {d.last_name} ({d.title}) | Languages: {', '.join(d.languages_spoken)}" for d in doctors]
     return "Clinic Staff Registry:\n" + "\n".join(lines)
@@ -51,7 +48,7 @@ async def get_doctor_availability_resource(doctor_name: str, date: str) -> str:
         return f"Could not find doctor matching '{doctor_name}'"
 
     raw_avail = await dbops.get(f"/doctors/{doc_id}/availability", params={"date": date})
-    slots = [Availability(**a) for a in raw_avail]
+    slots = validate_list(Availability, raw_avail)
     
     if not slots:
         return f"No specific availability slots found for {doctor_name} on {date}."
@@ -1,5 +1,6 @@
 from server import mcp
 from dependencies import dbops
+from sharding import shard_router
 
 @mcp.tool()
 async def report_emergency(
@@ -20,7 +21,8 @@ async def report_emergency(
         "status": "reported"
     }
     try:
-        res = await dbops.post("/emergencies", data=payload)
+        client = await shard_router.client_for(clinic_id)
+        res = await client.post("/emergencies", data=payload)
         return f"🚨 Emergency Reported! ID: {res.get('id')}"
     except Exception as e:
         return f"Failed to report emergency: {e}"
@@ -1,9 +1,10 @@
 from server import mcp
 from dependencies import dbops
+from reference_data import reference_store
 
 async def _get_insurance_providers_logic() -> str:
     """Internal logic to fetch insurance providers."""
-    data = await dbops.get("/clinics/insurance/providers")
+    data = await reference_store.get("insurance_providers")
     return str(data)
 
 @mcp.resource("insurance://providers")
@@ -1,6 +1,7 @@
 from fastmcp import Context
 from dependencies import dbops
-from tools.patients import resolve_patient_by_phone
+from tools.patients import resolve_patient_id
+from response_shaping import shape
 from tools.models import MedicationCreate, MedicationUpdate, MedicationRefill
 from typing import Optional
 import logging
@@ -28,7 +29,7 @@ async def resolve_medication_id(patient_id: str, med_name: str) -> Optional[str]
 @mcp.resource("medications://all/{patient_name}")
 async def get_all_medications(patient_name: str) -> str:
     """Resource: Returns ALL medications (active and past) for a patient."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
 
     # Endpoint: GET /patients/{patientId}/medications
@@ -41,7 +42,7 @@ async def get_all_medications(patient_name: str) -> str:
 @mcp.resource("medications://active/{patient_name}")
 async def get_active_medications(patient_name: str) -> str:
     """Resource: Returns ONLY active medications."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
 
     # Endpoint: GET /patients/{patientId}/medications/active
@@ -51,22 +52,24 @@ async def get_active_medications(patient_name: str) -> str:
     lines = [f"• {m['medicationName']} - {m['dosage']} ({m['frequency']})" for m in meds]
     return f"Active Prescriptions for {patient_name}:\n" + "\n".join(lines)
 
-@mcp.resource("medications://history/{patient_name}/{start_date}/{end_date}")
-async def get_medication_history(patient_name: str, start_date: str, end_date: str) -> str:
-    """Resource: Returns medication history within a specific date range."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+@mcp.resource("medications://history/{patient_name}/{start_date}/{end_date}{?max_tokens,max_bytes,cursor}")
+async def get_medication_history(patient_name: str, start_date: str, end_date: str, max_tokens: Optional[int] = None,
+                                 max_bytes: Optional[int] = None, cursor: Optional[str] = None) -> str:
+    """Resource: Returns medication history within a specific date range, newest first, within a token/byte budget."""
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
 
     # Endpoint: GET /patients/{patientId}/medications/history
     params = {"startDate": start_date, "endDate": end_date}
     meds = await dbops.get(f"/patients/{patient_id}/medications/history", params=params)
     
-    return f"Medication History ({start_date} to {end_date}):\n{meds}"
+    return shape(f"Medication History ({start_date} to {end_date}):", meds, max_tokens, max_bytes, cursor,
+                 priority=("medicationName", "dosage", "frequency", "status", "startDate", "endDate"))
 
 @mcp.resource("medications://statistics/{patient_name}")
 async def get_medication_statistics(patient_name: str) -> str:
     """Resource: Returns adherence and prescription statistics."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
 
     # Endpoint: GET /patients/{patientId}/medications/statistics
@@ -84,7 +87,7 @@ async def prescribe_medication(
     instructions: str
 ) -> str:
     """Tool: Prescribes a NEW medication to a patient."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
 
     payload = {
@@ -110,7 +113,7 @@ async def update_prescription(
     new_frequency: Optional[str] = None
 ) -> str:
     """Tool: Updates dosage or frequency for an existing medication."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
     
     med_id = await resolve_medication_id(patient_id, medication_name)
@@ -134,7 +137,7 @@ async def discontinue_medication(
     reason: str
 ) -> str:
     """Tool: Stops a medication (Discontinue)."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
 
     med_id = await resolve_medication_id(patient_id, medication_name)
@@ -156,7 +159,7 @@ async def add_medication_refill(
     pharmacy: str
 ) -> str:
     """Tool: Logs a refill for a specific medication."""
-    patient_id = await resolve_patient_by_phone(patient_name)
+    patient_id = await resolve_patient_id(patient_name)
     if not patient_id: return f"Error: Patient '{patient_name}' not found."
 
     med_id = await resolve_medication_id(patient_id, medication_name)
@@ -1,6 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Optional, Dict, Any, Type, TypeVar
 from datetime import datetime
+from functools import lru_cache
+
+M = TypeVar("M", bound=BaseModel)
 
 class DoctorBase(BaseModel):
     id: str
@@ -185,4 +188,30 @@ class Clinic(BaseModel):
     address: str
     city: str
     phone: str
-    email: str
\ No newline at end of file
+    email: str
+
+# --- Batch validation ---
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def validate_list(model: Type[M], rows: list) -> List[M]:
+    """Validates a whole DBOps list in one pydantic-core call (instead of `[Model(**r) for r in rows]`)."""
+    return _list_adapter(model).validate_python(rows)
+
+# (registry name, model) -> (the validated list object, its models)
+_trusted: Dict[tuple, tuple] = {}
+
+def validate_registry(name: str, model: Type[M], rows: list) -> List[M]:
+    """
+    Models for a cached registry list (warm reference data). Each version of the
+    list is validated once; while the cache serves the same list object the
+    models are reused without re-validation.
+    """
+    cached = _trusted.get((name, model))
+    if cached is not None and cached[0] is rows:
+        return cached[1]
+    models = validate_list(model, rows)
+    _trusted[(name, model)] = (rows, models)
+    return models
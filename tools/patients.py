@@ -1,6 +1,7 @@
 from fastmcp import Context
-from cachetools import TTLCache, cached
+from change_feed import on_change
 from dependencies import dbops
+from patient_registry import PatientRegistry, patient_record, patient_registry
 from tools.models import PatientBase, PatientCreate
 import logging
 from server import mcp
@@ -9,15 +10,46 @@ from typing import List, Optional, Dict, Any
 
 logger = logging.getLogger("dbops-mcp.patients")
 
-# 10-minute cache for patient registry to ensure quick lookups
-patient_cache = TTLCache(maxsize=100, ttl=600)
-@cached(patient_cache)
-async def _fetch_raw_patients() -> List[dict]:
-    """Internal: Fetches all patients from DBOps."""
-    return await dbops.get("/patients")
+async def _fetch_raw_patients() -> PatientRegistry:
+    """Internal: All patients as a compact registry, re-fetched every 10 minutes (see patient_registry.py)."""
+    return await patient_registry.ensure_loaded()
+
+@on_change("patient")
+def _patient_changed(event) -> None:
+    """
+    Keeps the registry and cached full records current (see change_feed.py).
+    Without the record (or without a signature) the change is re-read with an
+    incremental sync, never a full registry refetch.
+    """
+    if event.entity_id is None:
+        patient_record.cache.clear()
+        patient_registry.sync_soon()
+        return
+    patient_record.invalidate(event.entity_id)
+    if event.op == "deleted" and event.trusted:
+        patient_registry.remove(event.entity_id)
+    elif event.data is not None:
+        patient_registry.upsert(event.data)
+    else:
+        patient_registry.sync_soon()
 
 async def _resolve_patient_logic(phone_number: str) -> str:
-    """Internal logic helper for patient lookup."""
+    """Internal logic helper for patient lookup: local registry index first, DBOps on a miss."""
+    # 0. Local index (phone, email, ID or unique full name), answered in memory
+    if patient_registry.loaded:
+        ref = patient_registry.find(phone_number)
+        if ref is not None:
+            return f"Found: {ref.first_name} (ID: {ref.id})"
+    else:
+        patient_registry.load_in_background()  # Later lookups are local
+
+    res = await _fetch_by_phone(phone_number)
+    if res is not None:
+        return f"Found: {res.get('first_name')} (ID: {res.get('id')})"
+    return f"Patient not found for number: {phone_number}"
+
+async def _fetch_by_phone(phone_number: str) -> Optional[dict]:
+    """Internal: DBOps by-phone lookup over the usual formatting variations; the answer is written back to the registry."""
     # 1. Clean & Generate Variations (Ported from Client)
     clean = ''.join(filter(str.isdigit, phone_number))
     variations = [phone_number, clean, f"+{clean}"]
@@ -32,11 +64,32 @@ async def _resolve_patient_logic(phone_number: str) -> str:
         try:
             res = await dbops.get(f"/patients/by-phone/{var}")
             if res and res.get('id'):
-                return f"Found: {res.get('first_name')} (ID: {res.get('id')})"
+                patient_registry.upsert(res)  # Write back: the next lookup is local
+                return res
         except:
             continue
-            
-    return f"Patient not found for number: {phone_number}"
+    return None
+
+async def resolve_patient_id(patient: str) -> Optional[str]:
+    """
+    Internal: Patient ID for a name, phone number, email or ID; None if unknown or ambiguous.
+    Names are matched against the local registry, allowing for spelling and transliteration
+    variants (see search_patients); phone numbers fall back to DBOps.
+    """
+    if not patient_registry.loaded:
+        try:
+            await patient_registry.ensure_loaded()  # Names can only be resolved locally
+        except Exception as e:
+            logger.warning("Patient registry unavailable for name lookup: %s", e)
+    elif not patient_registry.fresh:
+        patient_registry.load_in_background()
+    ref = patient_registry.resolve(patient)
+    if ref is not None:
+        return ref.id
+    if sum(c.isdigit() for c in patient) >= 7:
+        res = await _fetch_by_phone(patient)
+        return str(res["id"]) if res else None
+    return None
 
 @mcp.tool()
 async def resolve_patient_by_phone(phone_number: str) -> str:
@@ -46,16 +99,29 @@ async def resolve_patient_by_phone(phone_number: str) -> str:
     """
     return await _resolve_patient_logic(phone_number)
 
+@mcp.tool()
+async def search_patients(name: str, limit: int = 5) -> str:
+    """
+    Tool: Finds patients by name, tolerating misspellings and Arabic/English transliteration
+    variants (e.g. Mohammed / Muhammad / محمد, Abdul Rahman / Abdulrahman).
+    Returns ranked candidates with IDs. When a name is ambiguous, pass the chosen ID
+    as patient_name to the other patient tools.
+    """
+    registry = await _fetch_raw_patients()
+    ranked = registry.search(name, limit=max(1, min(limit, 20)))
+    if not ranked:
+        return f"No patients match '{name}'."
+    lines = [f"{i}. {ref.full_name} (ID: {ref.id}) - match {score:.2f}" for i, (ref, score) in enumerate(ranked, 1)]
+    return f"Patients matching '{name}':\n" + "\n".join(lines)
+
 # --- MCP Resources (GET) ---
 @mcp.resource("patients://appointments/{name}")
 async def get_patient_summary_resource(name: str) -> str:
     """Resource: Returns a patient's medical and reliability summary."""
-    res_text = await _resolve_patient_logic(name)
-    if "Found:" not in res_text:
+    patient_id = await resolve_patient_id(name)
+    if not patient_id:
         return f"Error: Patient '{name}' not found."
-    
-    patient_id = res_text.split("ID: ")[1].rstrip(")")
-    p = await dbops.get(f"/patients/{patient_id}")
+    p = await patient_record(patient_id)
     
     return (f"Patient: {p.get('first_name')} {p.get('last_name')}\n"
             f"Reliability Score: {p.get('reliability_score', 'N/A')}\n"
@@ -65,11 +131,9 @@ async def get_patient_summary_resource(name: str) -> str:
 @mcp.resource("patients://appointments/{name}")
 async def get_patient_appointments_resource(name: str) -> str:
     """Resource: Fetches all past and upcoming appointments for a patient."""
-    res_text = await _resolve_patient_logic(name)
-    if "Found:" not in res_text:
+    patient_id = await resolve_patient_id(name)
+    if not patient_id:
         return f"Error: Patient '{name}' not found."
-    
-    patient_id = res_text.split("ID: ")[1].rstrip(")")
     appointments = await dbops.get(f"/patients/{patient_id}/appointments")
     
     if not appointments:
@@ -100,8 +164,8 @@ async def create_patient_tool(
     try:
         # Per docs: POST /patients
         response = await dbops.post("/patients", data=payload)
-        # Clear cache so the new patient can be resolved immediately
-        patient_cache.clear()
+        # Write through so the new patient resolves locally right away
+        patient_registry.upsert({**payload, "id": response["id"]})
         return f"Successfully registered new patient: {first_name} {last_name} (ID: {response['id']})"
     except Exception as e:
         return f"Failed to create patient record: {str(e)}"
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastmcp import Context
 from dependencies import dbops
 from tools.models import PreVisitResponseCreate
+from response_shaping import shape
 import logging
 from server import mcp
 from typing import List, Optional, Dict, Any
@@ -16,12 +17,14 @@ async def get_all_previsit_responses() -> str:
     data = await dbops.get("/previsit-responses")
     return f"Total Responses: {len(data)}\n{data}"
 
-@mcp.resource("previsit://date-range/{start_date}/{end_date}")
-async def get_previsit_by_date(start_date: str, end_date: str) -> str:
-    """resoucre: Get questionnaires submitted within a date range."""
+@mcp.resource("previsit://date-range/{start_date}/{end_date}{?max_tokens,max_bytes,cursor}")
+async def get_previsit_by_date(start_date: str, end_date: str, max_tokens: Optional[int] = None,
+                               max_bytes: Optional[int] = None, cursor: Optional[str] = None) -> str:
+    """resoucre: Get questionnaires submitted within a date range, newest first, within a token/byte budget."""
     params = {"startDate": start_date, "endDate": end_date}
     data = await dbops.get("/previsit-responses/date-range", params=params)
-    return f"Responses ({start_date} to {end_date}):\n{data}"
+    return shape(f"Responses ({start_date} to {end_date}):", data, max_tokens, max_bytes, cursor,
+                 priority=("id", "appointment_id", "is_complete", "responses"))
 
 # --- Tools ---
 
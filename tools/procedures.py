@@ -1,5 +1,6 @@
 from server import mcp
 from dependencies import dbops
+from reference_data import reference_store
 import logging
 from typing import Optional, List, Dict, Any
 
@@ -27,7 +28,7 @@ async def search_procedures(name: str) -> str:
 async def list_procedures() -> str:
     """Tool: Lists all available medical procedures."""
     try:
-        data = await dbops.get("/procedures")
+        data = await reference_store.get("procedures")
         if isinstance(data, list):
              lines = [f"• {p.get('name', 'Unknown')} (ID: {p.get('id', 'N/A')})" for p in data]
              return "Available Procedures:\n" + "\n".join(lines)
@@ -40,7 +41,7 @@ async def get_all_dental_procedures() -> str:
     """Gets a list of all available dental procedures with pricing information."""
     logger.info("Fetching all dental procedures.")
     try:
-        data = await dbops.get("/procedures")
+        data = await reference_store.get("procedures")
         return str(data)
     except Exception as e:
         return f"Failed to fetch dental procedures: {str(e)}"
\ No newline at end of file
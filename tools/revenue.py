@@ -1,17 +1,22 @@
 from fastmcp import Context
-from dependencies import dbops
-from typing import Optional
+from sharding import merge_grouped, merge_ranked, merge_sum, shard_router
+from typing import List, Optional
 import logging
 from server import mcp
 logger = logging.getLogger("dbops-mcp.revenue")
 
 
+async def _from_all_shards(endpoint: str, params: dict) -> List:
+    """Internal: The same report from every DBOps deployment, fetched concurrently."""
+    return list((await shard_router.fan_out(endpoint, params=params)).values())
+
+
 # --- 1. Comprehensive Revenue (GET /analytics/revenue) ---
 @mcp.resource("analytics://revenue/comprehensive/{start_date}/{end_date}")
 async def get_comprehensive_revenue(start_date: str, end_date: str) -> str:
     """Resource: Detailed revenue analytics including breakdown."""
     params = {"startDate": start_date, "endDate": end_date}
-    data = await dbops.get("/analytics/revenue", params=params)
+    data = merge_sum(await _from_all_shards("/analytics/revenue", params))
     # Output formatting only - Logic stays in DBOps
     return f"Comprehensive Report ({start_date}-{end_date}): {data}"
 
@@ -20,7 +25,7 @@ async def get_comprehensive_revenue(start_date: str, end_date: str) -> str:
 async def get_revenue_data_only(start_date: str, end_date: str) -> str:
     """Resource: Get raw revenue figures without metadata."""
     params = {"startDate": start_date, "endDate": end_date}
-    data = await dbops.get("/analytics/revenue/data", params=params)
+    data = merge_sum(await _from_all_shards("/analytics/revenue/data", params))
     return f"Raw Revenue Data: {data}"
 
 # --- 3. Monthly Trend (GET /analytics/revenue/monthly-trend) ---
@@ -28,7 +33,7 @@ async def get_revenue_data_only(start_date: str, end_date: str) -> str:
 async def get_monthly_trend(start_date: str, end_date: str) -> str:
     """Resource: Monthly revenue breakdown for trend analysis."""
     params = {"startDate": start_date, "endDate": end_date}
-    data = await dbops.get("/analytics/revenue/monthly-trend", params=params)
+    data = merge_grouped(await _from_all_shards("/analytics/revenue/monthly-trend", params), "month")
     
     # Format list for LLM readability
     lines = [f"{item['month']}: ${item['revenue']}" for item in data]
@@ -39,7 +44,7 @@ async def get_monthly_trend(start_date: str, end_date: str) -> str:
 async def get_daily_trend(start_date: str, end_date: str) -> str:
     """Resource: Daily revenue breakdown."""
     params = {"startDate": start_date, "endDate": end_date}
-    data = await dbops.get("/analytics/revenue/daily-trend", params=params)
+    data = merge_grouped(await _from_all_shards("/analytics/revenue/daily-trend", params), "date")
     
     lines = [f"{item['date']}: ${item['revenue']}" for item in data]
     return "Daily Trends:\n" + "\n".join(lines)
@@ -49,7 +54,7 @@ async def get_daily_trend(start_date: str, end_date: str) -> str:
 async def get_specialty_performance(start_date: str, end_date: str) -> str:
     """Resource: Revenue performance by dental specialty."""
     params = {"startDate": start_date, "endDate": end_date}
-    data = await dbops.get("/analytics/specialty-performance", params=params)
+    data = merge_grouped(await _from_all_shards("/analytics/specialty-performance", params), "specialty")
     
     lines = [f"• {s['specialty']}: ${s['revenue']} ({s['appointments']} apps)" for s in data]
     return "Specialty Performance:\n" + "\n".join(lines)
@@ -59,7 +64,7 @@ async def get_specialty_performance(start_date: str, end_date: str) -> str:
 async def get_top_doctors(start_date: str, end_date: str) -> str:
     """Resource: Doctor ranking by revenue."""
     params = {"startDate": start_date, "endDate": end_date}
-    data = await dbops.get("/analytics/top-doctors", params=params)
+    data = merge_ranked(await _from_all_shards("/analytics/top-doctors", params), "revenue", key="doctor_id")
     
     lines = [f"#{i+1} {d['name']}: ${d['revenue']} ({d['appointmentCount']} apps)" for i, d in enumerate(data)]
     return "Top Doctors:\n" + "\n".join(lines)
@@ -69,7 +74,7 @@ async def get_top_doctors(start_date: str, end_date: str) -> str:
 async def get_dashboard_summary(start_date: str, end_date: str) -> str:
     """Resource: High-level executive dashboard summary."""
     params = {"startDate": start_date, "endDate": end_date}
-    data = await dbops.get("/analytics/dashboard", params=params)
+    data = merge_sum(await _from_all_shards("/analytics/dashboard", params))
     
     s = data.get('summary', {})
     return (f"Dashboard ({start_date}-{end_date}):\n"
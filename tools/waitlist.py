@@ -1,5 +1,6 @@
 from server import mcp
 from dependencies import dbops
+from sharding import shard_router
 
 @mcp.tool()
 async def join_waitlist(clinic_id: str, patient_id: str, preferred_date: str, notes: str = "") -> str:
@@ -12,7 +13,8 @@ async def join_waitlist(clinic_id: str, patient_id: str, preferred_date: str, no
         "status": "active"
     }
     try:
-        res = await dbops.post("/db/waitlist/add", data=payload)
+        client = await shard_router.client_for(clinic_id)
+        res = await client.post("/db/waitlist/add", data=payload)
         return f" Added to waitlist. ID: {res.get('id')}"
     except Exception as e:
         return f"Failed to join waitlist: {e}"
@@ -0,0 +1,176 @@
+"""
+Lightweight in-process tracing: one span per MCP tool call / resource read,
+with a child span per DBOps request (endpoint, status, bytes, timing).
+
+MCP_TRACE_EXPORT  "off" (default), "console" (log a span tree per trace) or
+                  "file" (one JSON line per trace, see MCP_TRACE_FILE).
+MCP_TRACE_FILE    Path for the file exporter (default "traces.jsonl").
+
+The current span lives in a ContextVar, so it follows `await` chains and is
+copied into tasks created with asyncio.create_task / gather. Every DBOps
+request carries a W3C `traceparent` header so its logs can be joined to ours.
+No collector or SDK is needed.
+"""
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+import httpx
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+
+from logging_setup import Deferred
+
+logger = logging.getLogger("dbops-mcp.tracing")
+
+TRACE_EXPORT = os.getenv("MCP_TRACE_EXPORT", "off").lower()
+TRACE_FILE = os.getenv("MCP_TRACE_FILE", "traces.jsonl")
+
+
+class Span:
+    def __init__(self, name: str, kind: str, trace_id: str, parent: Optional["Span"] = None):
+        self.name = name
+        self.kind = kind                    # "tool" | "resource" | "dbops"
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent = parent
+        self.attributes: dict = {}
+        self.children: List["Span"] = []
+        self.status = "ok"
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "span_id": self.span_id,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def tracing_enabled() -> bool:
+    return TRACE_EXPORT in ("console", "file")
+
+
+# --- Exporters ---
+
+_file_lock = threading.Lock()
+
+
+class _SpanTree(Deferred):
+    """Renders on str(), so the tree is only built by the log writer thread (the trace is finished)."""
+
+    def __init__(self, root: Span):
+        self.root = root
+
+    def __str__(self) -> str:
+        return "\n".join(_render(self.root))
+
+
+def _render(span: Span, depth: int = 0) -> List[str]:
+    attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+    lines = [f"{'  ' * depth}{span.name} {span.duration_ms:.1f}ms [{span.status}] {attrs}".rstrip()]
+    for child in span.children:
+        lines += _render(child, depth + 1)
+    return lines
+
+
+def export(root: Span) -> None:
+    if TRACE_EXPORT == "console":
+        logger.info("trace %s\n%s", root.trace_id, _SpanTree(root))
+    elif TRACE_EXPORT == "file":
+        line = json.dumps({"trace_id": root.trace_id, **root.to_dict()}, separators=(",", ":"))
+        with _file_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+# --- Span creation ---
+
+class start_span:
+    """Context manager opening a span under the current one (or a new trace)."""
+
+    def __init__(self, name: str, kind: str, **attributes):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        parent = current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span = Span(self.name, self.kind, trace_id, parent)
+        self.span.attributes.update(self.attributes)
+        if parent:
+            parent.children.append(self.span)
+        self._token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.finish(exc)
+        current_span.reset(self._token)
+        if self.span.parent is None:
+            export(self.span)
+
+
+class TracingMiddleware(Middleware):
+    """Root span per tool call / resource read."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        if not tracing_enabled():
+            return await call_next(context)
+        with start_span(f"tool {context.message.name}", "tool"):
+            return await call_next(context)
+
+    async def on_read_resource(self, context: MiddlewareContext, call_next):
+        if not tracing_enabled():
+            return await call_next(context)
+        with start_span(f"resource {context.message.uri}", "resource"):
+            return await call_next(context)
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Wraps the DBOps transport: child span per request plus `traceparent` propagation."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if current_span.get() is None:
+            return await self.inner.handle_async_request(request)
+
+        with start_span(f"dbops {request.method} {request.url.path}", "dbops",
+                        method=request.method, endpoint=request.url.path) as span:
+            request.headers["traceparent"] = span.traceparent
+            response = await self.inner.handle_async_request(request)
+            # DBOps replies are small JSON documents read in full anyway
+            content = await response.aread()
+            span.attributes["status"] = response.status_code
+            span.attributes["bytes"] = len(content)
+            if response.status_code >= 400:
+                span.status = "error"
+            return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
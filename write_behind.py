@@ -0,0 +1,275 @@
+"""
+Write-behind queue for high-frequency, fire-and-forget DBOps writes
+(communication logs).
+
+The tool call only appends to an in-memory buffer and returns. A background
+task sends the buffer to DBOps in batches, either as soon as a batch is full
+or every flush interval, whichever comes first. Batches that fail with a
+transport error, a 5xx or 404/405/409/429 go back to the front of the buffer
+and are retried with exponential backoff. Entries DBOps refuses outright
+(any other 4xx, e.g. 400/422) are moved to a dead-letter file
+(`<spill file>.dead`) and counted, so one bad entry cannot block the queue.
+When the buffer is full, new entries spill to a local JSONL file. Spilled
+entries are reloaded once there is room, and whatever is still unsent at
+shutdown is spilled too, so the next start delivers it. Workers sharing a
+spill file each claim it under their own name before reading it, so two of
+them starting together never read (or lose) the same entries.
+
+Batches are POSTed to the batch endpoint as {"logs": [...]}. If DBOps answers
+404/405 there, the queue falls back to one POST per entry (sent concurrently);
+a batch refused with another 4xx is re-sent entry by entry to find the bad
+entries. Each entry gets its own idempotency key when queued, and a batch's
+key is stored on its entries when first sent: a retry (also after a restart)
+re-sends exactly the same batch under the same key, so it is not written
+twice, while two identical messages still make two log entries.
+
+MCP_COMMLOG_WRITE_BEHIND    "1" (default) queue logs; "0" POST each one in the tool call.
+MCP_COMMLOG_BATCH           Entries per batch (default 50).
+MCP_COMMLOG_FLUSH_S         Longest time an entry waits before being sent (default 1).
+MCP_COMMLOG_BUFFER          Entries held in memory before spilling (default 5000).
+MCP_COMMLOG_SPILL           Spill file (default "commlog_spill.jsonl").
+MCP_COMMLOG_BATCH_ENDPOINT  DBOps batch endpoint (default "/communication-logs/batch").
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from typing import List, Optional
+
+import httpx
+
+from idempotency import digest
+
+logger = logging.getLogger("dbops-mcp.write-behind")
+
+WRITE_BEHIND = os.getenv("MCP_COMMLOG_WRITE_BEHIND", "1") != "0"
+BATCH_SIZE = int(os.getenv("MCP_COMMLOG_BATCH", "50"))
+FLUSH_S = float(os.getenv("MCP_COMMLOG_FLUSH_S", "1"))
+BUFFER_SIZE = int(os.getenv("MCP_COMMLOG_BUFFER", "5000"))
+SPILL_PATH = os.getenv("MCP_COMMLOG_SPILL", "commlog_spill.jsonl")
+BATCH_ENDPOINT = os.getenv("MCP_COMMLOG_BATCH_ENDPOINT", "/communication-logs/batch")
+MAX_BACKOFF_S = 60.0
+RETRYABLE_4XX = (404, 405, 408, 409, 429)
+
+
+def _retryable(error: BaseException) -> bool:
+    """Transport errors, 5xx and the 4xx that mean "not now" are retried; other 4xx never succeed."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status in RETRYABLE_4XX or status < 400
+    return True
+
+
+class WriteBehindQueue:
+    def __init__(self, name: str, endpoint: str, batch_endpoint: Optional[str] = None,
+                 batch_size: int = BATCH_SIZE, flush_s: float = FLUSH_S, buffer_size: int = BUFFER_SIZE,
+                 spill_path: str = SPILL_PATH):
+        self.name = name
+        self.endpoint = endpoint
+        self.batch_endpoint = batch_endpoint
+        self.batch_size = batch_size
+        self.flush_s = flush_s
+        self.buffer_size = buffer_size
+        self.spill_path = spill_path
+        self.buffer: deque = deque()
+        self.spilled_pending = 0      # Entries currently in the spill file (this process's count)
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._backoff_s = 0.0
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.spilled = 0
+        self.dead_lettered = 0
+
+    # --- Producer side (tool calls) ---
+
+    def enqueue(self, data: dict) -> None:
+        entry = {"key": uuid.uuid4().hex, "data": data}
+        if len(self.buffer) >= self.buffer_size:
+            self._spill([entry])
+            return
+        self.buffer.append(entry)
+        if len(self.buffer) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    # --- Spill file ---
+
+    def _dead_letter(self, entries: List[dict], error: BaseException) -> None:
+        logger.error("DBOps refused %s %s entries (%s); kept in %s.dead", len(entries), self.name, error,
+                     self.spill_path)
+        self.dead_lettered += len(entries)
+        try:
+            with open(f"{self.spill_path}.dead", "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps({**entry, "error": str(error)}, separators=(",", ":")) + "\n")
+        except OSError as e:
+            logger.error("Dead-letter file for %s not writable: %s", self.name, e)
+
+    def _spill(self, entries: List[dict]) -> None:
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        except OSError as e:
+            logger.error("Dropped %s %s entries, spill file not writable: %s", len(entries), self.name, e)
+            return
+        self.spilled += len(entries)
+        self.spilled_pending += len(entries)
+
+    def _reload_spill(self) -> None:
+        """Moves spilled entries back into the buffer while it has room."""
+        if len(self.buffer) >= self.buffer_size // 2 or not os.path.exists(self.spill_path):
+            return
+        loading = f"{self.spill_path}.{os.getpid()}-{uuid.uuid4().hex[:8]}.loading"   # This worker's claim
+        try:
+            os.replace(self.spill_path, loading)
+            with open(loading, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+            os.remove(loading)
+        except (OSError, ValueError) as e:
+            logger.error("Could not reload %s spill file: %s", self.name, e)
+            return
+        room = self.buffer_size - len(self.buffer)
+        self.buffer.extend(entries[:room])
+        self.spilled_pending = 0
+        if entries[room:]:
+            self._spill(entries[room:])
+        logger.info("Reloaded %s spilled %s entries", min(room, len(entries)), self.name)
+
+    # --- Sending ---
+
+    async def _send(self, batch: List[dict]) -> List[dict]:
+        """Sends a batch. Returns the entries to retry; refused entries are dead-lettered."""
+        from dependencies import dbops
+        if self.batch_endpoint and not batch[0].get("single"):
+            try:
+                await dbops.post(self.batch_endpoint, data={"logs": [entry["data"] for entry in batch]},
+                                 idempotency_key=batch[0]["batch"])
+                return []
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status in (404, 405):
+                    logger.warning("%s has no batch endpoint (%s), sending entries one by one", self.name, status)
+                    self.batch_endpoint = None
+                elif _retryable(e):
+                    raise
+                else:
+                    logger.warning("%s batch refused (%s), sending its entries one by one", self.name, status)
+        results = await asyncio.gather(*[dbops.post(self.endpoint, data=entry["data"], idempotency_key=entry["key"])
+                                         for entry in batch],
+                                       return_exceptions=True)
+        remaining = []
+        for entry, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                if _retryable(result):
+                    entry.pop("batch", None)
+                    entry["single"] = True   # May already be written under its own key: never re-batch it
+                    remaining.append(entry)
+                else:
+                    self._dead_letter([entry], result)
+        return remaining
+
+    def _next_batch(self) -> List[dict]:
+        """
+        A batch that failed before, unchanged (same entries, same key); entries already
+        tried one by one, still one by one; otherwise up to batch_size new entries, keyed now.
+        """
+        first = self.buffer.popleft()
+        batch = [first]
+        if first.get("single"):
+            while self.buffer and len(batch) < self.batch_size and self.buffer[0].get("single"):
+                batch.append(self.buffer.popleft())
+            return batch
+        if first.get("batch"):
+            while self.buffer and self.buffer[0].get("batch") == first["batch"]:
+                batch.append(self.buffer.popleft())
+            return batch
+        while self.buffer and len(batch) < self.batch_size and not (self.buffer[0].get("batch")
+                                                                      or self.buffer[0].get("single")):
+            batch.append(self.buffer.popleft())
+        key = digest(*(entry["key"] for entry in batch))
+        for entry in batch:
+            entry["batch"] = key
+        return batch
+
+    async def flush(self) -> None:
+        """Sends everything buffered; on failure re-queues the rest and backs off."""
+        self._reload_spill()
+        while self.buffer:
+            batch = self._next_batch()
+            dead_before = self.dead_lettered
+            try:
+                remaining = await self._send(batch)
+            except asyncio.CancelledError:
+                self.buffer.extendleft(reversed(batch))
+                raise
+            except Exception as e:
+                remaining = batch
+                logger.warning("%s batch of %s failed: %s", self.name, len(batch), e)
+            self.sent += len(batch) - len(remaining) - (self.dead_lettered - dead_before)
+            self.batches += 1
+            if remaining:
+                self.failures += 1
+                self.buffer.extendleft(reversed(remaining))
+                self._backoff_s = min(MAX_BACKOFF_S, max(self.flush_s, self._backoff_s * 2))
+                return
+            self._backoff_s = 0.0
+            self._reload_spill()
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            if self._backoff_s:
+                await asyncio.sleep(self._backoff_s)  # A full batch does not cut a backoff short
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_s)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            await self.flush()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Final flush; anything DBOps did not take is spilled for the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except Exception as e:
+            logger.warning("Final %s flush incomplete: %s", self.name, e)
+        finally:
+            # Also when shutdown cancels the flush itself
+            if self.buffer:
+                self._spill(list(self.buffer))
+                self.buffer.clear()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.buffer),
+            "spill_pending": self.spilled_pending,
+            "sent": self.sent,
+            "batches": self.batches,
+            "failed_batches": self.failures,
+            "spilled": self.spilled,
+            "dead_lettered": self.dead_lettered,
+            "backoff_s": self._backoff_s,
+            "batch_endpoint": self.batch_endpoint,
+        }
+
+
+# Global instance
+communication_logs = WriteBehindQueue("communication_logs", "/communication-logs", batch_endpoint=BATCH_ENDPOINT)